@@ -11,23 +11,19 @@ import os
 import re
 import sentry_sdk
 import uuid
-import requests
 import zipfile
 
 from flask import g, request
 
 from marshmallow.exceptions import ValidationError
 
-from collections import namedtuple
 from sqlalchemy import inspect, Table
 from sqlalchemy.sql.expression import and_, text
 from sqlalchemy.exc import IntegrityError
 
 from neo4japp.constants import (
     ANNOTATION_STYLES_DICT,
-    FILE_MIME_TYPE_ENRICHMENT_TABLE,
     FILE_MIME_TYPE_MAP,
-    FILE_MIME_TYPE_PDF,
     LogEventType
 )
 from neo4japp.services.annotations.constants import LMDB_DATA_DIR
@@ -198,11 +194,51 @@ def set_role(email, role):
 
 
 @app.cli.command('reset-elastic')
-def reset_elastic():
+@click.option('--processes', '-p', default=os.cpu_count(), type=int,
+              help='Number of worker processes.')
+@click.option('--checkpoint', default='reindex.checkpoint', type=click.Path(dir_okay=False),
+              help='File of the last indexed file, an interrupted run resumes from it.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and index every file.')
+def reset_elastic(processes, checkpoint, restart):
     """Seeds Elastic with all pipelines and indices. Typically should be used when a new Elastic DB
     is first created, but will also update/re-index the entire database if run later."""
-    elastic_service = get_elastic_service()
-    elastic_service.recreate_indices_and_pipelines()
+    from neo4japp.services.elastic.reindex import reindex_files
+
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    # An interrupted run resumes in the indices it created
+    if not os.path.exists(checkpoint):
+        elastic_service = get_elastic_service()
+        elastic_service.recreate_indices_and_pipelines(reindex=False)
+
+    reindex_files(
+        config='config.Config',
+        processes=processes,
+        checkpoint=checkpoint
+    )
+
+
+@app.cli.command('elastic-indexer')
+@click.option('--until-empty', is_flag=True, help='Exit once the outbox is drained.')
+def elastic_indexer(until_empty):
+    """Indexes the files queued in the file index outbox in Elastic, as they are changed.
+    Should be kept running alongside the appserver, otherwise file changes never reach Elastic."""
+    from neo4japp.services.elastic.outbox import run_indexer
+
+    run_indexer(until_empty=until_empty)
+
+
+@app.cli.command('benchmark-query-parser')
+@click.option('--iterations', '-n', default=100, type=int,
+              help='Number of times every query is parsed.')
+def benchmark_query_parser(iterations):
+    """Times the parsing of a set of realistic content search queries, with and without the
+    cached grammars and parsed queries."""
+    from neo4japp.services.elastic.query_parser_benchmark import benchmark_query_parsing
+
+    for name, microseconds in benchmark_query_parsing(iterations).items():
+        print(f'{name}: {microseconds:.1f} us/query')
 
 
 @app.cli.command('recreate-elastic-index')
@@ -223,6 +259,29 @@ def load_lmdb():
     manager.update_all_dates(LMDB_DATA_DIR)
 
 
+@app.cli.command('build-synonym-index')
+def build_lmdb_synonym_index():
+    """ Merges the local LMDB files into the synonym index used to
+    recognize all entity types in one lookup. Should be run again after
+    every `load-lmdb`, a stale index is ignored by the annotation pipeline.
+    """
+    from neo4japp.services.annotations.initializer import get_lmdb_service
+    from neo4japp.services.annotations.synonym_index import build_synonym_index
+
+    build_synonym_index(get_lmdb_service())
+
+
+@app.cli.command('invalidate-graph-cache')
+def invalidate_graph_cache():
+    """ Drops the gene/protein to organism matches cached by the annotation
+    workers. Should be run after the graph is reloaded, otherwise the workers
+    only notice once the cache-invalidator sees the graph statistics change.
+    """
+    from neo4japp.services.annotations.organism_match_cache import bump_graph_version
+
+    bump_graph_version()
+
+
 @app.cli.command('upload-lmdb')
 def upload_lmdb():
     """ Uploads LMDB files from local to Azure cloud storage.
@@ -236,135 +295,47 @@ def upload_lmdb():
     manager.upload_all(LMDB_DATA_DIR)
 
 
-Fallback = namedtuple('Fallback', ['organism_name', 'organism_synonym', 'organism_id'])
-
-
 @app.cli.command('reannotate')
 @click.argument('user')  # the user email
 @click.argument('password')
-def reannotate_files(user, password):
-    from neo4japp.models import FileContent, FallbackOrganism
-    # from neo4japp.exceptions import AnnotationError
-    from neo4japp.schemas.annotations import AnnotationConfigurations
-    from multiprocessing import Process, Queue, cpu_count
-    import time
-
-    def get_token():
-        req = requests.post(
-            'http://localhost:5000/auth/login',
-            data=json.dumps({'email': user, 'password': password}),
-            headers={'Content-type': 'application/json'})
-        return json.loads(req.text)['accessToken']['token']
-
-    def do_work(token, hash_ids, configs, organism: Fallback):
-        resp = requests.post(
-            'http://localhost:5000/filesystem/annotations/generate',
-            data=json.dumps({
-                'hashIds': hash_ids,
-                'organism': {
-                    'organism_name': organism.organism_name,
-                    'synonym': organism.organism_synonym,
-                    'tax_id': organism.organism_id
-                },
-                'annotationConfigs': configs
-            }),
-            headers={'Content-type': 'application/json', 'Authorization': f'Bearer {token}'})
-        print(f'Got response back for files {hash_ids}, status code is {resp.status_code}')
-        # if resp.status_code != 200:
-        #     raise AnnotationError(resp.text)
-        resp.close()
-
-    print('Running reannotate command')
-
-    token = get_token()
-    curr_time = time.time()
+@click.option('--processes', '-p', default=os.cpu_count(), type=int,
+              help='Number of worker processes.')
+@click.option('--nlp-concurrency', default=2, type=int,
+              help='Number of documents sent to the NLP service at once.')
+@click.option('--checkpoint', default='reannotate.checkpoint', type=click.Path(dir_okay=False),
+              help='File of annotated files, an interrupted run resumes from it.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and annotate every file.')
+def reannotate_files(user, password, processes, nlp_concurrency, checkpoint, restart):
+    from neo4japp.services.annotations.reannotation import reannotate_files as reannotate
+
+    # the new annotation versions are attributed to the user, like the API did
+    app_user = db.session.query(AppUser).filter(AppUser.email == user).one_or_none()
+    if app_user is None or not app_user.check_password(password):
+        raise click.BadParameter('Invalid user email or password.', param_hint='user')
+    user_id = app_user.id
+
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    reannotate(
+        user_id=user_id,
+        config='config.Config',
+        processes=processes,
+        nlp_concurrency=nlp_concurrency,
+        checkpoint=checkpoint
+    )
 
-    # NUM_PROCESSES = 2
-    task_queue = Queue()
-    running = {}
 
-    files = db.session.query(
-        Files.id,
-        Files.hash_id,
-        Files.annotation_configs,
-        FallbackOrganism.organism_name,
-        FallbackOrganism.organism_synonym,
-        FallbackOrganism.organism_taxonomy_id
-    ).join(
-        FileContent,
-        FileContent.id == Files.content_id
-    ).join(
-        FallbackOrganism,
-        FallbackOrganism.id == Files.fallback_organism_id
-    ).filter(
-        and_(
-            Files.mime_type.in_([FILE_MIME_TYPE_PDF, FILE_MIME_TYPE_ENRICHMENT_TABLE]),
-            Files.deletion_date.is_(None),
-            and_(
-                Files.annotations.isnot(None),
-                Files.annotations != '[]'
-            )
-        )
-    )
+@app.cli.command('summarize-annotations')
+@click.option('--all', 'summarize_all', is_flag=True,
+              help='Summarize every annotated file, not only those never summarized.')
+def summarize_annotations(summarize_all):
+    """Summarizes the annotation counts of the files annotated before they were summarized.
+    The annotation count exports only read the summaries."""
+    from neo4japp.services.annotations.annotation_summary import summarize_files
 
-    print(f'Total files: {files.count()}')
-
-    for fid, hash, configs, organism, organism_synonym, organism_id in files:
-        task_queue.put((
-            fid, hash,
-            json.loads(AnnotationConfigurations().dumps(configs)),
-            Fallback(organism, organism_synonym, organism_id)
-        ))
-
-    print(f'Total tasks to do: {task_queue.qsize()}')
-
-    while task_queue.qsize() > 0:
-        if time.time() - curr_time > 180:
-            token = get_token()
-            curr_time = time.time()
-
-        file_id, hashes, configs, organism = task_queue.get()
-        do_work(token, [hashes], configs, organism)
-
-    # while True:
-    #     if time.time() - curr_time > 180:
-    #         token = get_token()
-    #         curr_time = time.time()
-
-    #     file_id, hashes, configs, organism = task_queue.get()
-    #     # this is preferred over multiprocessing.pool(...)
-    #     # because it is guaranteed to be in a different process
-    #     p = Process(target=do_work, args=(token, [hashes], configs, organism,))
-    #     p.daemon = True
-    #     p.start()
-    #     # print(f'Process {p.pid} started...')
-    #     running[p.pid] = (hashes, p)
-
-    #     if len(running) == 3:
-    #         while True:
-    #             for k in list(running):
-    #                 v = running[k]
-    #                 if not v[1].is_alive():
-    #                     # if v[1].exitcode:
-    #                     #     raise AnnotationError(f'File with hash_id {v[0]} failed to annotate.')  # noqa
-    #                     running.pop(k)
-
-    #             if len(running) == 0:
-    #                 break
-
-    #     if task_queue.qsize() == 0:
-    #         break
-
-    # while True:
-    #     for k in list(running):
-    #         v = running[k]
-    #         if not v[1].is_alive():
-    #             # if v[1].exitcode:
-    #             #     raise AnnotationError(f'File with hash_id {v[0]} failed to annotate.')
-    #             running.pop(k)
-
-    #     if len(running) == 0:
-    #         break
+    count = summarize_files(db.session, missing_only=not summarize_all)
+    print(f'Summarized the annotations of {count} files.')
 
 
 def add_file(filename: str, description: str, user_id: int, parent_id: int, file_bstr: bytes):
@@ -44,7 +44,37 @@ class Config():
     WTF_CSRF_ENABLED = False
     SUPPORTED_LOCALES = ['en']
 
+    # cache global inclusions/exclusions between annotation runs
+    ANNOTATION_GLOBALS_CACHE = True
+    # cache gene/protein to organism matches from the graph, see organism_match_cache.py
+    ANNOTATION_GRAPH_CACHE = True
+    # cache the snippet counts of the visualizer associations, see services/snippet_counts.py
+    SNIPPET_COUNT_CACHE = True
+    # cache the domain data of enrichment table genes, see enrichment/enrichment_domains.py
+    ENRICHMENT_DOMAIN_CACHE = True
+    # seconds to keep the domain base URLs, see services/domain_urls.py
+    DOMAIN_URLS_CACHE_TTL = 300
+    # max number of files annotated at the same time by background jobs
+    ANNOTATION_JOB_WORKERS = int(os.environ.get('ANNOTATION_JOB_WORKERS', 4))
+    # save a cProfile capture of every annotated file here, see annotations/metrics.py
+    ANNOTATION_PROFILE_DIR = os.environ.get('ANNOTATION_PROFILE_DIR')
+    # max number of outbox rows sent to elastic at once, see services/elastic/outbox.py
+    ELASTIC_INDEXER_BATCH_SIZE = int(os.environ.get('ELASTIC_INDEXER_BATCH_SIZE', 500))
+    # seconds the elastic indexer waits once the outbox is drained
+    ELASTIC_INDEXER_INTERVAL = float(os.environ.get('ELASTIC_INDEXER_INTERVAL', 1))
+    # seconds a failed file is backed off for, doubled on every attempt
+    ELASTIC_INDEXER_RETRY_DELAY = 5
+    ELASTIC_INDEXER_MAX_ATTEMPTS = 10
+
 
 class Testing(Config):
     """Functional test configuration"""
     TESTING = True
+    # tests create globals directly in the databases
+    ANNOTATION_GLOBALS_CACHE = False
+    # tests create genes and proteins directly in the graph
+    ANNOTATION_GRAPH_CACHE = False
+    SNIPPET_COUNT_CACHE = False
+    ENRICHMENT_DOMAIN_CACHE = False
+    # tests create domain URLs directly in the database
+    DOMAIN_URLS_CACHE_TTL = 0
@@ -0,0 +1,48 @@
+"""Enqueue the principals of the files indexed before they were
+
+Revision ID: 3b7e91c4f0a2
+Revises: d41e7b02a6c5
+Create Date: 2026-10-18 15:41:07.218356
+
+"""
+from alembic import context
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3b7e91c4f0a2'
+down_revision = 'd41e7b02a6c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The documents indexed before have no principals, which the search filters on, so this is
+    # not left to data_migrate: the indexer updates them from the outbox
+    op.execute("""
+        INSERT INTO file_index_outbox (hash_id, operation, fields)
+        SELECT hash_id, 'UPDATE', ARRAY['principals']
+        FROM files
+        WHERE deletion_date IS NULL AND recycling_date IS NULL
+    """)
+    if context.get_x_argument(as_dictionary=True).get('data_migrate', None):
+        data_upgrades()
+
+
+def downgrade():
+    # The pending updates of the principals are left to the indexer
+    pass
+    # NOTE: In practice perfect downgrades are difficult and in some cases
+    # impossible! It is more practical to use database backups/snapshots to
+    # "downgrade" the database. Changes to the database that we intend to
+    # push to production should always be added to a NEW migration.
+    # (i.e. "downgrade forward"!)
+
+
+def data_upgrades():
+    """Add optional data upgrade migrations here"""
+    pass
+
+
+def data_downgrades():
+    """Add optional data downgrade migrations here"""
+    pass
@@ -22,7 +22,7 @@ from json import JSONDecodeError
 from marshmallow import validate, fields
 from sqlalchemy import and_
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from webargs.flaskparser import use_args
 
 from .auth import auth
@@ -35,7 +35,7 @@ from ..database import (
     get_excel_export_service,
     get_enrichment_table_service
 )
-from ..exceptions import AnnotationError, ServerException
+from ..exceptions import AnnotationError, RecordNotFound, ServerException
 from ..models import (
     AppUser,
     Files,
@@ -46,6 +46,7 @@ from ..schemas.formats.enrichment_tables import validate_enrichment_table
 from ..models.files import AnnotationChangeCause, FileAnnotationsVersion
 from ..models.files_queries import get_nondeleted_recycled_children_query
 from ..schemas.annotations import (
+    AnnotationGenerationJobResponseSchema,
     AnnotationGenerationRequestSchema,
     GlobalAnnotationTableType,
     MultipleAnnotationGenerationResponseSchema,
@@ -67,6 +68,21 @@ from ..services.annotations.constants import (
     EntityType,
     ManualAnnotationType,
 )
+from ..services.annotations.annotation_jobs import (
+    FAILED_RESULT as ANNOTATION_JOB_FAILED_RESULT,
+    create_job as create_annotation_job,
+    get_job as get_annotation_job,
+    set_job_result as set_annotation_job_result,
+    submit_job_task as submit_annotation_job_task
+)
+from ..services.annotations.annotation_summary import (
+    count_entities,
+    defer_annotations,
+    get_file_annotation_summaries,
+    refresh_file_annotation_summaries
+)
+from ..services.annotations.globals_cache import bump_globals_version
+from ..services.annotations.metrics import profiled, registry as annotation_metrics
 from ..services.annotations.pipeline import Pipeline
 from ..services.annotations.initializer import (
     get_annotation_service,
@@ -232,8 +248,6 @@ class FileAnnotationCountsView(FilesystemBaseView):
     decorators = [auth.login_required]
 
     def get_rows(self, files):
-        manual_annotations_service = get_manual_annotation_service()
-
         yield [
             'entity_id',
             'type',
@@ -242,39 +256,15 @@ class FileAnnotationCountsView(FilesystemBaseView):
             'count',
         ]
 
-        counts = {}
-
-        for file in files:
-            annotations = manual_annotations_service.get_file_annotations(file)
-            for annotation in annotations:
-                key = annotation['meta']['id']
-                if key not in counts:
-                    counts[key] = {
-                        'annotation': annotation,
-                        'count': 1
-                    }
-                else:
-                    counts[key]['count'] += 1
-
-        count_keys = sorted(
-            counts,
-            key=lambda key: counts[key]['count'],
-            reverse=True
-        )
+        counts = count_entities(get_file_annotation_summaries(files))
 
-        for key in count_keys:
-            annotation = counts[key]['annotation']
-            meta = annotation['meta']
-            if annotation.get('keyword', None) is not None:
-                text = annotation['keyword'].strip()
-            else:
-                text = annotation['meta']['allText'].strip()
+        for entity_id, entity in counts.iterrows():
             yield [
-                meta['id'],
-                meta['type'],
-                text,
-                annotation.get('primaryName', '').strip(),
-                counts[key]['count']
+                entity_id,
+                entity['entity_type'],
+                entity['text'],
+                entity['primary_name'],
+                entity['count']
             ]
 
     def post(self, hash_id: str):
@@ -282,11 +272,12 @@ class FileAnnotationCountsView(FilesystemBaseView):
 
         file = self.get_nondeleted_recycled_file(Files.hash_id == hash_id, lazy_load_content=True)
         self.check_file_permissions([file], current_user, ['readable'], permit_recycled=True)
+        # the counts are read from the annotation summaries
         files = get_nondeleted_recycled_children_query(
             Files.id == file.id,
             children_filter=Files.mime_type == 'application/pdf',
             lazy_load_content=True
-        ).all()
+        ).options(*defer_annotations()).all()
 
         buffer = io.StringIO()
         writer = csv.writer(buffer, delimiter="\t", quotechar='"')
@@ -373,7 +364,7 @@ class FileAnnotationSortedView(FilesystemBaseView):
                             Files.recycling_date.is_(None)
                     ),
                     lazy_load_content=True
-            ).all()
+            ).options(*defer_annotations()).all()
 
             annotation_service = get_sorted_annotation_service(sort)
             for row in self.get_rows(files, annotation_service):
@@ -392,7 +383,6 @@ class FileAnnotationSortedView(FilesystemBaseView):
 
 class FileAnnotationGeneCountsView(FileAnnotationCountsView):
     def get_rows(self, files: List[Files]):
-        manual_annotations_service = get_manual_annotation_service()
         annotation_graph_service = get_annotation_graph_service()
 
         yield [
@@ -403,17 +393,10 @@ class FileAnnotationGeneCountsView(FileAnnotationCountsView):
             'gene_annotation_count'
         ]
 
-        gene_ids: Dict[Any, int] = {}
-
-        for file in files:
-            combined_annotations = manual_annotations_service.get_file_annotations(file)
-            for annotation in combined_annotations:
-                if annotation['meta']['type'] == EntityType.GENE.value:
-                    gene_id = annotation['meta']['id']
-                    if gene_ids.get(gene_id, None) is not None:
-                        gene_ids[gene_id] += 1
-                    else:
-                        gene_ids[gene_id] = 1
+        summaries = get_file_annotation_summaries(files)
+        gene_ids: Dict[Any, int] = summaries[
+            summaries['entity_type'] == EntityType.GENE.value
+        ].groupby('entity_id', sort=False)['count'].sum().to_dict()
 
         gene_organism_pairs = annotation_graph_service.get_organisms_from_gene_ids_query(
             gene_ids=list(gene_ids.keys())
@@ -461,100 +444,19 @@ class FileAnnotationsGenerationView(FilesystemBaseView):
         missing = self.get_missing_hash_ids(targets['hash_ids'], files)
 
         for file in files:
-            if override_organism is not None:
-                effective_organism = override_organism
-            else:
-                effective_organism = file.fallback_organism
-
-            if override_annotation_configs is not None:
-                effective_annotation_configs = override_annotation_configs
-            elif file.annotation_configs is not None:
-                effective_annotation_configs = file.annotation_configs
-            else:
-                effective_annotation_configs = DEFAULT_ANNOTATION_CONFIGS
-
-            if file.mime_type == 'application/pdf':
-                try:
-                    annotations, version = self._annotate(
-                        file=file,
-                        cause=AnnotationChangeCause.SYSTEM_REANNOTATION,
-                        configs=effective_annotation_configs,
-                        organism=effective_organism,
-                        user_id=current_user.id,
-                    )
-                except AnnotationError as e:
-                    current_app.logger.error(
-                        'Could not annotate file: %s, %s, %s', file.hash_id, file.filename, e)
-                    results[file.hash_id] = {
-                        'attempted': True,
-                        'success': False,
-                        'error': e.message
-                    }
-                else:
-                    current_app.logger.debug(
-                        'File successfully annotated: %s, %s', file.hash_id, file.filename)
-                    updated_files.append(annotations)
-                    versions.append(version)
-                    results[file.hash_id] = {
-                        'attempted': True,
-                        'success': True,
-                        'error': ''
-                    }
-            elif file.mime_type == 'vnd.lifelike.document/enrichment-table':
-                try:
-                    enrichment = json.loads(file.content.raw_file_utf8)
-                except JSONDecodeError:
-                    current_app.logger.error(
-                        f'Cannot annotate file with invalid content: {file.hash_id}, {file.filename}')  # noqa
-                    results[file.hash_id] = {
-                        'attempted': False,
-                        'success': False,
-                        'error': 'Enrichment table content is not valid JSON.'
-                    }
-                    continue
-                enrich_service = get_enrichment_table_service()
-
-                try:
-                    enriched = enrich_service.create_annotation_mappings(enrichment)
-
-                    annotations, version = self._annotate_enrichment_table(
-                        file=file,
-                        enriched=enriched,
-                        cause=AnnotationChangeCause.SYSTEM_REANNOTATION,
-                        configs=effective_annotation_configs,
-                        organism=effective_organism,
-                        user_id=current_user.id,
-                        enrichment=enrichment
-                    )
-
-                    validate_enrichment_table(annotations['enrichment_annotations'])
-                except AnnotationError as e:
-                    current_app.logger.error(
-                        'Could not annotate file: %s, %s, %s', file.hash_id, file.filename, e)  # noqa
-                    results[file.hash_id] = {
-                        'attempted': True,
-                        'success': False,
-                        'error': e.message
-                    }
-                else:
-                    current_app.logger.debug(
-                        'File successfully annotated: %s, %s', file.hash_id, file.filename)
-                    updated_files.append(annotations)
-                    versions.append(version)
-                    results[file.hash_id] = {
-                        'attempted': True,
-                        'success': True,
-                        'error': ''
-                    }
-            else:
-                results[file.hash_id] = {
-                    'attempted': False,
-                    'success': False,
-                    'error': 'Invalid file type, can only annotate PDFs or Enrichment tables.'
-                }
+            results[file.hash_id], annotations, version = self._annotate_file(
+                file=file,
+                override_organism=override_organism,
+                override_annotation_configs=override_annotation_configs,
+                user_id=current_user.id
+            )
+            if annotations is not None:
+                updated_files.append(annotations)
+                versions.append(version)
 
         db.session.bulk_insert_mappings(FileAnnotationsVersion, versions)
         db.session.bulk_update_mappings(Files, updated_files)
+        refresh_file_annotation_summaries(db.session, [update['id'] for update in updated_files])
         db.session.commit()
 
         return jsonify(MultipleAnnotationGenerationResponseSchema().dump({
@@ -562,6 +464,117 @@ class FileAnnotationsGenerationView(FilesystemBaseView):
             'missing': missing,
         }))
 
+    def _annotate_file(
+        self,
+        file: Files,
+        override_organism: Optional[FallbackOrganism],
+        override_annotation_configs: Optional[dict],
+        user_id: int
+    ) -> Tuple[dict, Optional[dict], Optional[dict]]:
+        """Annotate a single file, returns the result for the response
+        and the file update and version mappings if it was successful."""
+        with profiled(current_app.config.get('ANNOTATION_PROFILE_DIR'), file.hash_id):
+            return self._annotate_file_content(
+                file=file,
+                override_organism=override_organism,
+                override_annotation_configs=override_annotation_configs,
+                user_id=user_id
+            )
+
+    def _annotate_file_content(
+        self,
+        file: Files,
+        override_organism: Optional[FallbackOrganism],
+        override_annotation_configs: Optional[dict],
+        user_id: int
+    ) -> Tuple[dict, Optional[dict], Optional[dict]]:
+        if override_organism is not None:
+            effective_organism = override_organism
+        else:
+            effective_organism = file.fallback_organism
+
+        if override_annotation_configs is not None:
+            effective_annotation_configs = override_annotation_configs
+        elif file.annotation_configs is not None:
+            effective_annotation_configs = file.annotation_configs
+        else:
+            effective_annotation_configs = DEFAULT_ANNOTATION_CONFIGS
+
+        if file.mime_type == 'application/pdf':
+            try:
+                annotations, version = self._annotate(
+                    file=file,
+                    cause=AnnotationChangeCause.SYSTEM_REANNOTATION,
+                    configs=effective_annotation_configs,
+                    organism=effective_organism,
+                    user_id=user_id,
+                )
+            except AnnotationError as e:
+                current_app.logger.error(
+                    'Could not annotate file: %s, %s, %s', file.hash_id, file.filename, e)
+                return {
+                    'attempted': True,
+                    'success': False,
+                    'error': e.message
+                }, None, None
+            else:
+                current_app.logger.debug(
+                    'File successfully annotated: %s, %s', file.hash_id, file.filename)
+                return {
+                    'attempted': True,
+                    'success': True,
+                    'error': ''
+                }, annotations, version
+        elif file.mime_type == 'vnd.lifelike.document/enrichment-table':
+            try:
+                enrichment = json.loads(file.content.raw_file_utf8)
+            except JSONDecodeError:
+                current_app.logger.error(
+                    f'Cannot annotate file with invalid content: {file.hash_id}, {file.filename}')  # noqa
+                return {
+                    'attempted': False,
+                    'success': False,
+                    'error': 'Enrichment table content is not valid JSON.'
+                }, None, None
+            enrich_service = get_enrichment_table_service()
+
+            try:
+                enriched = enrich_service.create_annotation_mappings(enrichment)
+
+                annotations, version = self._annotate_enrichment_table(
+                    file=file,
+                    enriched=enriched,
+                    cause=AnnotationChangeCause.SYSTEM_REANNOTATION,
+                    configs=effective_annotation_configs,
+                    organism=effective_organism,
+                    user_id=user_id,
+                    enrichment=enrichment
+                )
+
+                validate_enrichment_table(annotations['enrichment_annotations'])
+            except AnnotationError as e:
+                current_app.logger.error(
+                    'Could not annotate file: %s, %s, %s', file.hash_id, file.filename, e)  # noqa
+                return {
+                    'attempted': True,
+                    'success': False,
+                    'error': e.message
+                }, None, None
+            else:
+                current_app.logger.debug(
+                    'File successfully annotated: %s, %s', file.hash_id, file.filename)
+                return {
+                    'attempted': True,
+                    'success': True,
+                    'error': ''
+                }, annotations, version
+        else:
+            return {
+                'attempted': False,
+                'success': False,
+                'error': 'Invalid file type, can only annotate PDFs or Enrichment tables.'
+            }, None, None
+
     def _annotate(
         self,
         file: Files,
@@ -660,13 +673,20 @@ class FileAnnotationsGenerationView(FilesystemBaseView):
 
         prev_index = -1
         enriched_gene = ''
+        # the cells are in text order, so each cell takes the
+        # annotations up to its end index from where the last one stopped
+        chunk_start = 0
 
         start = time.time()
         for index, cell_text in enriched.text_index_map:
-            annotation_chunk = [anno for anno in sorted_annotations_list if anno.get(
-                'hiLocationOffset', None) and anno.get('hiLocationOffset') <= index]
-            # it's sorted so we can do this to make the list shorter every iteration
-            sorted_annotations_list = sorted_annotations_list[len(annotation_chunk):]
+            chunk_end = chunk_start
+            while chunk_end < len(sorted_annotations_list):
+                hi_location_offset = sorted_annotations_list[chunk_end].get('hiLocationOffset')
+                if hi_location_offset is None or hi_location_offset > index:
+                    break
+                chunk_end += 1
+            annotation_chunk = sorted_annotations_list[chunk_start:chunk_end]
+            chunk_start = chunk_end
 
             # update JSON to have enrichment row and domain...
             for anno in annotation_chunk:
@@ -740,36 +760,129 @@ class FileAnnotationsGenerationView(FilesystemBaseView):
         # are susceptible to some security vulns, but because this is an internal API,
         # we can accept that it can be janky
 
-        texts = []
+        texts = ['<snippet>']
         prev_ending_index = -1
 
         for annotation in annotations:
             meta = annotation['meta']
-            meta_type = annotation['meta']['type']
-            term = annotation['textInDocument']
             lo_location_offset = annotation['loLocationOffset']
-            hi_location_offset = annotation['hiLocationOffset']
 
-            text = f'<annotation type="{meta_type}" meta="{html.escape(json.dumps(meta))}">{term}</annotation>'  # noqa
-
-            if lo_location_offset == 0:
-                prev_ending_index = hi_location_offset
-                texts.append(text)
-            else:
-                if not texts:
-                    texts.append(original_text[:lo_location_offset])
-                    prev_ending_index = hi_location_offset
-                    texts.append(text)
-                else:
-                    # TODO: would lo_location_offset == prev_ending_index ever happen?
-                    # if yes, need to handle it
-                    texts.append(original_text[prev_ending_index + 1:lo_location_offset])
-                    prev_ending_index = hi_location_offset
-                    texts.append(text)
+            # TODO: would lo_location_offset == prev_ending_index ever happen?
+            # if yes, need to handle it
+            texts.append(original_text[prev_ending_index + 1:lo_location_offset])
+            texts.append(
+                f'<annotation type="{meta["type"]}" meta="{html.escape(json.dumps(meta))}">'
+                f'{annotation["textInDocument"]}</annotation>')
+            prev_ending_index = annotation['hiLocationOffset']
 
         texts.append(original_text[prev_ending_index + 1:])
-        final_text = ''.join(texts)
-        return f'<snippet>{final_text}</snippet>'
+        texts.append('</snippet>')
+        return ''.join(texts)
+
+
+class FileAnnotationsGenerationJobView(FileAnnotationsGenerationView):
+    decorators = [auth.login_required]
+
+    @use_args(lambda request: BulkFileRequestSchema())
+    @use_args(lambda request: AnnotationGenerationRequestSchema())
+    def post(self, targets, params):
+        """Start a background job to generate annotations for one or more files.
+
+        Each file is annotated and committed on its own, the progress is
+        polled with the returned job id.
+        """
+        current_user = g.current_user
+
+        files = self.get_nondeleted_recycled_files(Files.hash_id.in_(targets['hash_ids']),
+                                                   lazy_load_content=True)
+        self.check_file_permissions(files, current_user, ['writable'], permit_recycled=False)
+
+        override_organism_id = None
+        override_annotation_configs = None
+
+        if params.get('organism'):
+            # commit now so the job can load it in its own session
+            db.session.add(params['organism'])
+            db.session.commit()
+            override_organism_id = params['organism'].id
+
+        if params.get('annotation_configs'):
+            override_annotation_configs = params['annotation_configs']
+
+        missing = self.get_missing_hash_ids(targets['hash_ids'], files)
+        job_id = create_annotation_job(
+            [file.hash_id for file in files], missing, user_id=current_user.id)
+
+        for file in files:
+            submit_annotation_job_task(
+                job_id,
+                file.hash_id,
+                self._annotate_job_file,
+                job_id=job_id,
+                file_id=file.id,
+                hash_id=file.hash_id,
+                override_organism_id=override_organism_id,
+                override_annotation_configs=override_annotation_configs,
+                user_id=current_user.id
+            )
+
+        return jsonify(AnnotationGenerationJobResponseSchema().dump(
+            get_annotation_job(job_id)))
+
+    def _annotate_job_file(
+        self,
+        job_id: str,
+        file_id: int,
+        hash_id: str,
+        override_organism_id: Optional[int],
+        override_annotation_configs: Optional[dict],
+        user_id: int
+    ):
+        # runs outside of the request, in a new app context
+        g.current_user = db.session.query(AppUser).get(user_id)
+        files = self.get_nondeleted_recycled_files(Files.id == file_id, lazy_load_content=True)
+        if not files:
+            current_app.logger.error(f'Could not annotate file {hash_id}, it no longer exists.')
+            set_annotation_job_result(job_id, hash_id, {
+                'attempted': False,
+                'success': False,
+                'error': 'The file no longer exists.'
+            })
+            return
+
+        file = files[0]
+        override_organism = None
+        if override_organism_id is not None:
+            override_organism = db.session.query(FallbackOrganism).get(override_organism_id)
+
+        try:
+            result, annotations, version = self._annotate_file(
+                file=file,
+                override_organism=override_organism,
+                override_annotation_configs=override_annotation_configs,
+                user_id=user_id
+            )
+            if annotations is not None:
+                db.session.bulk_insert_mappings(FileAnnotationsVersion, [version])
+                db.session.bulk_update_mappings(Files, [annotations])
+                refresh_file_annotation_summaries(db.session, [file.id])
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(
+                'Could not annotate file: %s, %s, %s', file.hash_id, file.filename, e)
+            result = ANNOTATION_JOB_FAILED_RESULT
+        set_annotation_job_result(job_id, hash_id, result)
+
+    def get(self, job_id: str):
+        """Get the progress of an annotation job."""
+        job = get_annotation_job(job_id)
+        if job is None or job['user_id'] != g.current_user.id:
+            raise RecordNotFound(
+                title='Failed to Get Annotation Job',
+                message='The annotation job does not exist or has expired.',
+                code=404)
+        return jsonify(AnnotationGenerationJobResponseSchema().dump(job))
 
 
 class RefreshEnrichmentAnnotationsView(FilesystemBaseView):
@@ -794,10 +907,32 @@ class RefreshEnrichmentAnnotationsView(FilesystemBaseView):
             }
             updated_files.append(update)
         db.session.bulk_update_mappings(Files, updated_files)
+        refresh_file_annotation_summaries(db.session, [file.id for file in files])
         db.session.commit()
         return jsonify({'results': 'Success'})
 
 
+class AnnotationMetricsView(MethodView):
+    decorators = [auth.login_required, requires_role('admin')]
+
+    @use_args({
+        'format': fields.Str(
+            missing='json',
+            validate=validate.OneOf(['json', 'prometheus'])
+        )
+    })
+    def get(self, params):
+        """Annotation pipeline metrics of the appserver process handling the request."""
+        yield g.current_user
+
+        if params['format'] == 'prometheus':
+            res = make_response(annotation_metrics.to_prometheus())
+            res.headers['Content-Type'] = 'text/plain; version=0.0.4'
+            yield res
+        else:
+            yield jsonify({'results': annotation_metrics.snapshot()})
+
+
 class GlobalAnnotationExportInclusions(MethodView):
     decorators = [auth.login_required, requires_role('admin')]
 
@@ -1024,6 +1159,7 @@ class GlobalAnnotationListView(MethodView):
             try:
                 db.session.execute(query)
                 db.session.commit()
+                bump_globals_version()
 
                 current_app.logger.info(
                     f'Deleted {len(exclusion_pids)} global exclusions',
@@ -1081,6 +1217,9 @@ def get_pdf_to_annotate(file_id):
     return res
 
 
+bp.add_url_rule(
+    '/metrics',
+    view_func=AnnotationMetricsView.as_view('annotation_metrics'))
 bp.add_url_rule(
     '/global-list',
     view_func=GlobalAnnotationListView.as_view('global_annotations_list'))
@@ -1117,6 +1256,12 @@ filesystem_bp.add_url_rule(
 filesystem_bp.add_url_rule(
     'annotations/generate',
     view_func=FileAnnotationsGenerationView.as_view('file_annotation_generation'))
+filesystem_bp.add_url_rule(
+    'annotations/generate/jobs',
+    view_func=FileAnnotationsGenerationJobView.as_view('file_annotation_generation_jobs'))
+filesystem_bp.add_url_rule(
+    'annotations/generate/jobs/<string:job_id>',
+    view_func=FileAnnotationsGenerationJobView.as_view('file_annotation_generation_job'))
 filesystem_bp.add_url_rule(
     'annotations/refresh',
     # TODO: this can potentially become a generic annotations refresh
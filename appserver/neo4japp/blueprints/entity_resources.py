@@ -1,7 +1,9 @@
 from flask import Blueprint, request
 
 from neo4japp.blueprints.auth import auth
-from neo4japp.models import AnnotationStyle, DomainURLsMap
+from neo4japp.database import db
+from neo4japp.models import AnnotationStyle
+from neo4japp.services.domain_urls import domain_url_resolver
 
 bp = Blueprint('entity-resources', __name__, url_prefix='/entity-resources')
 
@@ -35,8 +37,8 @@ def get_uri():
     """
     payload = request.json
 
-    uri = DomainURLsMap.query.filter_by(domain=payload['domain'])[0]
-    return {'uri': uri.base_URL.format(payload['term'])}
+    url_map = domain_url_resolver.get_url_map(db.session)
+    return {'uri': url_map[payload['domain']].format(payload['term'])}
 
 
 @bp.route('/uri/batch', methods=['POST'])
@@ -64,8 +66,8 @@ def get_uri_batch():
         """
     uris = []
     payload = request.json
+    url_map = domain_url_resolver.get_url_map(db.session)
     for entry in payload['batch']:
-        uri = DomainURLsMap.query.filter_by(domain=entry['domain'])[0]
-        uris.append({'uri': uri.base_URL.format(entry['term'])})
+        uris.append({'uri': url_map[entry['domain']].format(entry['term'])})
 
     return {'batch': uris}
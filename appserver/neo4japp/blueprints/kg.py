@@ -1,23 +1,13 @@
-from enum import Enum
-
 from flask import Blueprint, request, jsonify
 
 from neo4japp.blueprints.auth import auth
+from neo4japp.constants import EnrichmentDomain
 from neo4japp.database import get_kg_service
+from neo4japp.services.enrichment.enrichment_domains import get_enrichment_domains
 
 bp = Blueprint('kg-api', __name__, url_prefix='/knowledge-graph')
 
 
-# TODO: move this to a constant.py (not the neo4japp/constants.py)
-class Domain(Enum):
-    REGULON = 'Regulon'
-    UNIPROT = 'UniProt'
-    STRING = 'String'
-    GO = 'GO'
-    BIOCYC = 'BioCyc'
-    KEGG = 'KEGG'
-
-
 @bp.route('/get-ncbi-nodes/enrichment-domains', methods=['POST'])
 @auth.login_required
 def get_ncbi_enrichment_domains():
@@ -36,12 +26,18 @@ def get_ncbi_enrichment_domains():
     if node_ids is not None and tax_id is not None:
         kg = get_kg_service()
 
-        regulon = kg.get_regulon_genes(node_ids) if Domain.REGULON.value in domains else {}
-        biocyc = kg.get_biocyc_genes(node_ids, tax_id) if Domain.BIOCYC.value in domains else {}
-        go = kg.get_go_genes(node_ids) if Domain.GO.value in domains else {}
-        string = kg.get_string_genes(node_ids) if Domain.STRING.value in domains else {}
-        uniprot = kg.get_uniprot_genes(node_ids) if Domain.UNIPROT.value in domains else {}
-        kegg = kg.get_kegg_genes(node_ids) if Domain.KEGG.value in domains else {}
+        results = get_enrichment_domains(
+            kg,
+            node_ids,
+            tax_id,
+            [domain for domain in EnrichmentDomain if domain.value in domains]
+        )
+        regulon = results.get(EnrichmentDomain.REGULON, {})
+        biocyc = results.get(EnrichmentDomain.BIOCYC, {})
+        go = results.get(EnrichmentDomain.GO, {})
+        string = results.get(EnrichmentDomain.STRING, {})
+        uniprot = results.get(EnrichmentDomain.UNIPROT, {})
+        kegg = results.get(EnrichmentDomain.KEGG, {})
 
         nodes = {
             node_id: {
@@ -13,14 +13,15 @@ from neo4japp.constants import FILE_INDEX_ID, FRAGMENT_SIZE, LogEventType
 from neo4japp.blueprints.filesystem import FilesystemBaseView
 from neo4japp.data_transfer_objects.common import ResultQuery
 from neo4japp.database import (
+    get_authorization_service,
     get_search_service_dao,
     get_elastic_service,
     get_file_type_service
 )
 from neo4japp.exceptions import ServerException
 from neo4japp.models import (
+    AppUser,
     Files,
-    Projects,
 )
 from neo4japp.schemas.common import PaginatedRequestSchema
 from neo4japp.schemas.search import (
@@ -31,6 +32,7 @@ from neo4japp.schemas.search import (
     SynonymSearchResponseSchema,
     VizSearchSchema,
 )
+from neo4japp.services.elastic.principals import get_user_principals
 from neo4japp.services.file_types.providers import (
     DirectoryTypeProvider,
 )
@@ -120,51 +122,42 @@ def get_folders_from_params(advanced_args):
         return []
 
 
-def get_filepaths_filter(accessible_folders: List[Files], accessible_projects: List[Projects]):
+def get_principals_filter(user: AppUser) -> Optional[dict]:
     """
-    Generates an elastic boolean query which filters documents based on folder/project access. Takes
-    as input two options:
+    Generates an elastic query which filters documents based on who can read them (see
+    principals.py), or None if the user can read every document.
+    """
+    if get_authorization_service().has_role(user, 'private-data-access'):
+        return None
+    return {'terms': {'principals': get_user_principals(user)}}
+
+
+def get_filepaths_filter(accessible_folders: List[Files]) -> Optional[dict]:
+    """
+    Generates an elastic boolean query which filters documents based on the folders they are in,
+    or None if no folders are given.
         - accessible_folders: a list of Files objects representing folders to be included in the
         query
-        - accessible_projects: a list of Projects objects representing projects to be included in
-        the query
-    Any files present in accessible_folders which are not children of accessible_projects will be
-    ignored, and returned along with the query.
     """
-    accessible_projects_ids = [
-        project.id
-        for project in accessible_projects
-    ]
-
     filepaths = []
     for file in accessible_folders:
         filepaths.append(file.filename_path)
 
-    if len(filepaths):
-        return {
-            'bool': {
-                'should': [
-                    {
-                        "term": {
-                            "file_path.tree": file_path
-                        }
+    if not len(filepaths):
+        return None
+
+    return {
+        'bool': {
+            'should': [
+                {
+                    "term": {
+                        "file_path.tree": file_path
                     }
-                    for file_path in filepaths
-                ]
-            }
-        }
-    else:
-        # If there were no accessible filepaths in the given list, search all accessible projects
-        return {
-            'bool': {
-                'should': [
-                    # If the user has access to the project the document is in...
-                    {'terms': {'project_id': accessible_projects_ids}},
-                    # OR if the document is public.
-                    {'term': {'public': True}}
-                ]
-            }
+                }
+                for file_path in filepaths
+            ]
         }
+    }
 
 # End Search Helpers #
 
@@ -221,26 +214,22 @@ class ContentSearchView(ProjectBaseView, FilesystemBaseView):
         }
 
         EXCLUDE_FIELDS = ['enrichment_annotations', 'annotations']
-        # Gets the full list of projects accessible by the current user.
-        accessible_projects, _ = self.get_nondeleted_projects(None, accessible_only=True)
-        # Gets the full list of folders accessible by the current user.
+        # Gets the list of the given folders accessible by the current user.
         accessible_folders = self.get_nondeleted_recycled_files(
             Files.hash_id.in_(folders),
             attr_excl=EXCLUDE_FIELDS
-        )
+        ) if folders else []
         accessible_folder_hash_ids = [folder.hash_id for folder in accessible_folders]
         dropped_folders = [folder for folder in folders if folder not in accessible_folder_hash_ids]
-        filepaths_filter = get_filepaths_filter(
-            accessible_folders,
-            accessible_projects
-        )
         # These are the document fields that will be returned by elastic
         return_fields = ['id']
 
         filter_ = [
-            # The file must be accessible by the user, and in the specified list of
-            # filepaths or public if no list is given...
-            filepaths_filter,
+            # The file must be readable by the user, which the documents carry the principals
+            # of, so that it's a single terms query whatever the number of projects...
+            get_principals_filter(current_user),
+            # ...And in the specified list of filepaths, if any of them is accessible...
+            get_filepaths_filter(accessible_folders),
             # ...And it shouldn't be a directory. Right now there's not really any helpful info
             # attached to directory type documents (including a filename, for top-level
             # directories), so instead just ignore them.
@@ -252,6 +241,7 @@ class ContentSearchView(ProjectBaseView, FilesystemBaseView):
                 }
             }
         ]
+        filter_ = [clause for clause in filter_ if clause is not None]
 
         elastic_service = get_elastic_service()
         elastic_result, search_phrases = elastic_service.search(
@@ -81,6 +81,7 @@ def get_edge_snippet_data(req: GetSnippetsForEdgeRequest):
         page=req.page,
         limit=req.limit,
         edge=req.edge,
+        cursor=req.cursor,
     )
     return SuccessResponse(edge_snippets_result, status_code=200)
 
@@ -104,6 +105,7 @@ def get_cluster_snippet_data(req: GetSnippetsForClusterRequest):
         page=req.page,
         limit=req.limit,
         edges=req.edges,
+        cursor=req.cursor,
     )
     return SuccessResponse(cluster_snippets_result, status_code=200)
 
@@ -133,14 +135,15 @@ def get_associated_type_snippet_count(source_node, associated_nodes):
 @bp.route('/get-snippets-for-node-pair', methods=['POST'])
 @auth.login_required
 @use_kwargs(GetSnippetsForNodePairRequest)
-def get_snippets_for_node_pair(node_1_id, node_2_id, page, limit):
+def get_snippets_for_node_pair(node_1_id, node_2_id, page, limit, cursor):
     visualizer = get_visualizer_service()
 
     node_pair_snippet_result = visualizer.get_snippets_for_node_pair(
         node_1_id,
         node_2_id,
         page,
-        limit
+        limit,
+        cursor
     )
 
     return jsonify({
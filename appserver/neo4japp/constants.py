@@ -54,6 +54,7 @@ class EnrichmentDomain(Enum):
     STRING = 'String'
     GO = 'GO'
     BIOCYC = 'BioCyc'
+    KEGG = 'KEGG'
 
 
 class LogEventType(Enum):
@@ -157,6 +157,8 @@ class GetSnippetsForEdgeRequest(CamelDictMixin):
     page: int = attr.ib()
     limit: int = attr.ib()
     edge: EdgeConnectionData = attr.ib()
+    # from the previous page, see services/snippet_counts.py
+    cursor: Optional[str] = attr.ib(default=None)
 
 
 @attr.s(frozen=True)
@@ -164,6 +166,8 @@ class GetSnippetsForClusterRequest(CamelDictMixin):
     page: int = attr.ib()
     limit: int = attr.ib()
     edges: List[DuplicateEdgeConnectionData] = attr.ib()
+    # from the previous page, see services/snippet_counts.py
+    cursor: Optional[str] = attr.ib(default=None)
 
 # End Request DTOs #
 
@@ -183,6 +187,7 @@ class GetEdgeSnippetsResult(CamelDictMixin):
     snippet_data: GetSnippetsFromEdgeResult = attr.ib()
     total_results: int = attr.ib()
     query_data: EdgeConnectionData = attr.ib()
+    next_cursor: Optional[str] = attr.ib(default=None)
 
     def to_dict_formatter(self, edge_data_output_dict: dict):
         edge_data_output_dict['query_data']['from'] = edge_data_output_dict['query_data']['from_']
@@ -195,6 +200,7 @@ class GetClusterSnippetsResult(CamelDictMixin):
     snippet_data: List[GetSnippetsFromEdgeResult] = attr.ib()
     total_results: int = attr.ib()
     query_data: List[DuplicateEdgeConnectionData] = attr.ib()
+    next_cursor: Optional[str] = attr.ib(default=None)
 
     def to_dict_formatter(self, edge_data_output_dict: dict):
         for item in edge_data_output_dict['query_data']:
@@ -208,6 +214,7 @@ class GetNodePairSnippetsResult(CamelDictMixin):
     snippet_data: List[GetSnippetsFromEdgeResult] = attr.ib()
     total_results: int = attr.ib()
     query_data: dict = attr.ib()
+    next_cursor: Optional[str] = attr.ib(default=None)
 
 
 @attr.s(frozen=True)
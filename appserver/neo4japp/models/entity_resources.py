@@ -1,3 +1,5 @@
+from sqlalchemy import event
+
 from neo4japp.database import db
 from neo4japp.models.common import RDBMSBase
 
@@ -12,6 +14,15 @@ class DomainURLsMap(RDBMSBase):
     base_URL = db.Column(db.String(256), nullable=False)
 
 
+@event.listens_for(DomainURLsMap, 'after_insert')
+@event.listens_for(DomainURLsMap, 'after_update')
+@event.listens_for(DomainURLsMap, 'after_delete')
+def domain_urls_map_change(mapper, connection, target: DomainURLsMap):
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.domain_urls import domain_url_resolver
+    domain_url_resolver.invalidate()
+
+
 class AnnotationStyle(RDBMSBase):
     """
     This model stores the styles related to each entity type
@@ -11,10 +11,10 @@ from sqlalchemy import and_, text, event, orm
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm.exc import MultipleResultsFound, NoResultFound
 from sqlalchemy.types import TIMESTAMP
-from typing import BinaryIO, Optional, List, Dict
+from typing import BinaryIO, Optional, List, Dict, Set
 
 from neo4japp.constants import LogEventType
-from neo4japp.database import db, get_elastic_service
+from neo4japp.database import db
 from neo4japp.exceptions import ServerException
 from neo4japp.models.projects import Projects
 from neo4japp.models.common import (
@@ -383,128 +383,116 @@ class Files(RDBMSBase, FullTimestampMixin, RecyclableMixin, HashIdMixin):  # typ
 @event.listens_for(Files, 'after_insert')
 def file_insert(mapper, connection, target: Files):
     """
-    Handles creating a new elastic document for the newly inserted file. Note: if this fails, the
-    file insert will be rolled back.
+    Handles queueing the newly inserted file for indexing in elastic. The file is indexed by the
+    elastic indexer once the transaction commits.
     """
-    try:
-        elastic_service = get_elastic_service()
-        current_app.logger.info(
-            f'Attempting to index newly created file with hash_id: {target.hash_id}',
-            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
-        )
-        elastic_service.index_files([target.hash_id])
-    except Exception as e:
-        current_app.logger.error(
-            f'Elastic index failed for file with hash_id: {target.hash_id}',
-            exc_info=e,
-            extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
-        )
-        raise ServerException(
-            title='Failed to Create File',
-            message='Something unexpected occurred while creating your file! Please try again ' +
-                    'later.'
-        )
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.elastic.outbox import enqueue_files
+
+    enqueue_files(connection, [target.hash_id], FileIndexOperation.INDEX)
 
 
 @event.listens_for(Files, 'after_update')
 def file_update(mapper, connection, target: Files):
     """
-    Handles updating this document in elastic. Note: if this fails, the file update will be rolled
-    back.
+    Handles queueing what changed in the document of this file -- and of its children if it is
+    a directory -- for updating in elastic. The files are updated by the elastic indexer once the
+    transaction commits.
     """
     # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from neo4japp.models.files_queries import get_nondeleted_recycled_children_query
+    from neo4japp.services.elastic.outbox import (
+        INHERITED_FIELDS,
+        enqueue_file_family,
+        enqueue_files,
+        get_document_changes
+    )
     from neo4japp.services.file_types.providers import DirectoryTypeProvider
 
-    try:
-        elastic_service = get_elastic_service()
-        files_to_update = [target.hash_id]
-        if target.mime_type == DirectoryTypeProvider.MIME_TYPE:
-            family = get_nondeleted_recycled_children_query(
-                Files.id == target.id,
-                children_filter=and_(
-                    Files.recycling_date.is_(None)
-                ),
-                lazy_load_content=True
-            ).all()
-            files_to_update = [member.hash_id for member in family]
-
-        changes = get_model_changes(target)
-        # Only delete a file when it changes from "not-deleted" to "deleted"
-        if 'deletion_date' in changes and changes['deletion_date'][0] is None and \
-                changes['deletion_date'][1] is not None:  # noqa
-            current_app.logger.info(
-                f'Attempting to delete files in elastic with hash_ids: {files_to_update}',
-                extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
-            )
-            elastic_service.delete_files(files_to_update)
-            # TODO: Should we handle the case where a document's deleted state goes from "deleted"
-            # to "not deleted"? What would that mean for folders? Re-index all children as well?
+    changes = get_model_changes(target)
+    operation: Optional[FileIndexOperation]
+    fields: Optional[Set[str]]
+    # Only delete a file when it changes from "not-deleted" to "deleted"
+    if 'deletion_date' in changes and changes['deletion_date'][0] is None and \
+            changes['deletion_date'][1] is not None:  # noqa
+        operation, fields = FileIndexOperation.DELETE, None
+        # TODO: Should we handle the case where a document's deleted state goes from "deleted"
+        # to "not deleted"? What would that mean for folders? Re-index all children as well?
+    else:
+        # File was not deleted, so update what changed in its document -- and possibly in the
+        # documents of its children if it has any -- instead
+        operation, fields = get_document_changes(changes)
+
+    if operation is None:
+        return
+    enqueue_files(connection, [target.hash_id], operation, fields)
+
+    if target.mime_type == DirectoryTypeProvider.MIME_TYPE:
+        if operation == FileIndexOperation.UPDATE:
+            # Children only change if the path or the permissions of the directory do
+            inherited_fields = fields & INHERITED_FIELDS if fields is not None else set()
+            if inherited_fields:
+                enqueue_file_family(
+                    connection, target.id, operation, inherited_fields, children_only=True)
         else:
-            # File was not deleted, so update it -- and possibly its children if it has any --
-            # instead
-            current_app.logger.info(
-                f'Attempting to update files in elastic with hash_ids: {files_to_update}',
-                extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
-            )
-            # TODO: Change this to an update operation, and only update what has changed
-            # TODO: Only need to update children if the folder name changes (is this true? any
-            # other cases where we would do this? Maybe safer to just always update file path
-            # any time the parent changes...)
-            elastic_service.index_files(files_to_update)
-    except Exception as e:
-        current_app.logger.error(
-            f'Elastic update failed for files with hash_ids: {files_to_update}',
-            exc_info=e,
-            extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
-        )
-        raise ServerException(
-            title='Failed to Update File',
-            message='Something unexpected occurred while updating your file! Please try again ' +
-                    'later.'
-        )
+            enqueue_file_family(connection, target.id, operation, children_only=True)
 
 
 @event.listens_for(Files, 'after_delete')
 def file_delete(mapper, connection, target: Files):
     """
-    Handles deleting this document from elastic. Note: if this fails, the file deletion will be
-    rolled back.
+    Handles queueing this file for deletion from elastic. The file is deleted by the elastic
+    indexer once the transaction commits.
     """
     # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from neo4japp.models.files_queries import get_nondeleted_recycled_children_query
-    from neo4japp.services.file_types.providers import DirectoryTypeProvider
+    from neo4japp.services.elastic.outbox import enqueue_files
 
     # NOTE: This event is rarely triggered, because we're currently flagging files for deletion
-    # rather than removing them outright. See the `after_update` event for Files.
-    try:
-        elastic_service = get_elastic_service()
-        files_to_delete = [target.hash_id]
-        if target.mime_type == DirectoryTypeProvider.MIME_TYPE:
-            family = get_nondeleted_recycled_children_query(
-                Files.id == target.id,
-                children_filter=and_(
-                    Files.recycling_date.is_(None)
-                ),
-                lazy_load_content=True
-            ).all()
-            files_to_delete = [member.hash_id for member in family]
-        current_app.logger.info(
-            f'Attempting to delete files in elastic with hash_ids: {files_to_delete}',
-            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
-        )
-        elastic_service.delete_files(files_to_delete)
-    except Exception as e:
-        current_app.logger.error(
-            f'Elastic search delete failed for file with hash_id: {target.hash_id}',
-            exc_info=e,
-            extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
-        )
-        raise ServerException(
-            title='Failed to Delete File',
-            message='Something unexpected occurred while updating your file! Please try again ' +
-                    'later.'
-        )
+    # rather than removing them outright. See the `after_update` event for Files. A directory
+    # cannot be removed before its children, so there is no family to delete here.
+    enqueue_files(connection, [target.hash_id], FileIndexOperation.DELETE)
+
+
+@event.listens_for(Files, 'after_insert')
+@event.listens_for(Files, 'after_update')
+def file_annotations_update(mapper, connection, target: Files):
+    """
+    Handles refreshing the annotation counts of this file when its annotations, custom
+    annotations or exclusions change. Bulk updates skip this event, and refresh the counts
+    themselves.
+    """
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.annotations.annotation_summary import \
+        refresh_file_annotation_summaries
+
+    changes = get_model_changes(target)
+    if changes.keys() & {'annotations', 'custom_annotations', 'excluded_annotations'}:
+        refresh_file_annotation_summaries(connection, [target.id])
+
+
+class FileIndexOperation(enum.Enum):
+    INDEX = 'index'
+    # only some metadata fields of the document, without re-extracting the content
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+
+class FileIndexOutbox(RDBMSBase):
+    """Files to index in, or delete from, elastic. Rows are written by the Files listeners in
+    the transaction that changes the files, and drained by the elastic indexer, see
+    services/elastic/outbox.py.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    hash_id = db.Column(db.String(36), nullable=False)
+    operation = db.Column(db.Enum(FileIndexOperation), nullable=False)
+    # the document fields to update, for the UPDATE operation
+    fields = db.Column(postgresql.ARRAY(db.Text), nullable=True)
+    creation_date = db.Column(TIMESTAMP(timezone=True), nullable=False,
+                              server_default=db.func.now())
+    # number of times the indexer failed to send the file to elastic
+    attempts = db.Column(db.Integer, nullable=False, server_default='0')
+    # the indexer backs off failed files until then
+    available_date = db.Column(TIMESTAMP(timezone=True), nullable=False,
+                               server_default=db.func.now(), index=True)
 
 
 class AnnotationChangeCause(enum.Enum):
@@ -526,6 +514,29 @@ class FileAnnotationsVersion(RDBMSBase, TimestampMixin, HashIdMixin):
     user = db.relationship('AppUser', foreign_keys=user_id)
 
 
+class FileAnnotationSummary(RDBMSBase):
+    """Number of annotations of each entity in a file, after exclusions
+    and including custom annotations. Kept up to date with the annotation
+    columns of the file, see services/annotations/annotation_summary.py.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id', ondelete='CASCADE'),
+                        nullable=False)
+    entity_id = db.Column(db.Text, nullable=False)
+    entity_type = db.Column(db.Text, nullable=False)
+    # of the first annotation of the entity in the file
+    text = db.Column(db.Text, nullable=False)
+    primary_name = db.Column(db.Text, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    # the distinct enrichment table genes (rows) the entity is annotated in,
+    # null for the files summarized before it was kept
+    enrichment_genes = db.Column(postgresql.ARRAY(db.Text), nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('file_id', 'entity_id', 'entity_type'),
+    )
+
+
 class FallbackOrganism(RDBMSBase):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     organism_name = db.Column(db.String(200), nullable=False)
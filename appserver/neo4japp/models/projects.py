@@ -1,7 +1,6 @@
 import re
 
 from dataclasses import dataclass
-from flask import current_app
 from sqlalchemy import (
     event,
     orm,
@@ -12,9 +11,7 @@ from sqlalchemy.orm import validates
 from sqlalchemy.orm.query import Query
 from typing import Dict
 
-from neo4japp.constants import LogEventType
 from neo4japp.database import db
-from neo4japp.exceptions import ServerException
 from neo4japp.models.auth import (
     AccessActionType,
     AccessControlPolicy,
@@ -23,7 +20,7 @@ from neo4japp.models.auth import (
     AppUser,
 )
 from neo4japp.models.common import RDBMSBase, FullTimestampMixin, HashIdMixin
-from neo4japp.utils import EventLog
+from neo4japp.utils.sqlalchemy import get_model_changes
 
 projects_collaborator_role = db.Table(
     'projects_collaborator_role',
@@ -212,38 +209,16 @@ def init_default_access(mapper, connection, target):
 @event.listens_for(Projects, 'after_update')
 def project_update(mapper, connection, target: Projects):
     # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from neo4japp.database import get_elastic_service
-    from neo4japp.models.files import Files
-    from neo4japp.models.files_queries import get_nondeleted_recycled_children_query
-
-    try:
-        elastic_service = get_elastic_service()
-        family = get_nondeleted_recycled_children_query(
-            Files.id == target.root_id,
-            children_filter=and_(
-                Files.recycling_date.is_(None)
-            ),
-            lazy_load_content=True
-        ).all()
-        files_to_update = [member.hash_id for member in family]
-
-        current_app.logger.info(
-            f'Attempting to update files in elastic with hash_ids: ' +
-            f'{files_to_update}',
-            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
-        )
-        # TODO: Change this to an update operation, and only update file path
-        elastic_service.index_files(files_to_update)
-    except Exception as e:
-        current_app.logger.error(
-            f'Elastic search update failed for project with root_id: {target.root_id}',
-            exc_info=e,
-            extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
-        )
-        raise ServerException(
-            title='Failed to Update Project',
-            message='Something unexpected occurred while updating your file! Please try again ' +
-                    'later.'
+    from neo4japp.models.files import FileIndexOperation
+    from neo4japp.services.elastic.outbox import enqueue_file_family
+
+    # The project name is the only part of the project in the file documents
+    if 'name' in get_model_changes(target):
+        enqueue_file_family(
+            connection,
+            target.root_id,
+            FileIndexOperation.UPDATE,
+            {'file_path', 'project_name'}
         )
 
 # TODO: Need to implment some kind of deletion handler if we ever allow deletion of projects.
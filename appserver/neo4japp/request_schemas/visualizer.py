@@ -13,3 +13,5 @@ class GetSnippetsForNodePairRequest(ma.Schema):
     node_2_id = ma.Integer(required=True)
     page = ma.Integer(required=True)
     limit = ma.Integer(required=True)
+    # from the previous page, see services/snippet_counts.py
+    cursor = ma.String(missing=None)
@@ -67,6 +67,13 @@ class MultipleAnnotationGenerationResponseSchema(CamelCaseSchema):
     missing = fields.List(fields.String)
 
 
+class AnnotationGenerationJobResponseSchema(MultipleAnnotationGenerationResponseSchema):
+    job_id = fields.String()
+    total = fields.Integer()
+    completed = fields.Integer()
+    done = fields.Boolean()
+
+
 # ========================================
 # Annotations Base
 # ========================================
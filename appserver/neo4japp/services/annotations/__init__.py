@@ -1,9 +1,8 @@
-from .annotation_interval_tree import AnnotationInterval, AnnotationIntervalTree
 from .annotation_db_service import AnnotationDBService
 from .annotation_graph_service import AnnotationGraphService
 from .annotation_service import AnnotationService
 from .bioc_service import BiocDocumentService
-from .entity_recognition import EntityRecognitionService
+from .entity_recognition import EntityRecognitionService, IndexedEntityRecognitionService
 from .lmdb_connection import LMDBConnection
 from .lmdb_service import LMDBService
 from .manual_annotation_service import ManualAnnotationService
@@ -7,6 +7,7 @@ from neo4japp.models import GlobalList
 
 from .constants import EntityType, ManualAnnotationType
 from .data_transfer_objects import GlobalExclusions
+from .globals_cache import get_cached_globals
 
 
 class AnnotationDBService(DBConnection):
@@ -44,7 +45,8 @@ class AnnotationDBService(DBConnection):
             EntityType.PROTEIN.value: set()
         }
 
-        global_exclusions = [d.annotation for d in self.get_global_exclusions()]
+        global_exclusions = get_cached_globals(
+            'exclusions', lambda: [d.annotation for d in self.get_global_exclusions()])
         local_exclusions = [exc for exc in exclusions if not exc.get(
             'meta', {}).get('excludeGlobally', False)]  # safe to default to False?
 
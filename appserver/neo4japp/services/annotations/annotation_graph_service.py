@@ -5,6 +5,8 @@ from flask import current_app
 
 from .constants import EntityType
 from .data_transfer_objects import GlobalInclusions, GeneOrProteinToOrganism
+from .globals_cache import get_cached_globals
+from .organism_match_cache import get_organism_matches
 from .utils.lmdb import *
 from .utils.graph_queries import *
 
@@ -81,13 +83,7 @@ class AnnotationGraphService(GraphConnection):
             entity['id_hyperlinks'] = inclusion.get('hyperlinks')
             inclusion_dict[normalized_synonym].append(entity)
 
-    def get_entity_inclusions(self, inclusions: List[dict]) -> GlobalInclusions:
-        """Returns global inclusions for each entity type.
-        For species (taxonomy), also return the local inclusions.
-
-        :param inclusions:  custom annotations relative to file
-            - need to be filtered for local inclusions
-        """
+    def _get_global_inclusions(self) -> Dict[str, dict]:
         inclusion_dicts: Dict[str, dict] = {
             EntityType.ANATOMY.value: defaultdict(list),
             EntityType.CHEMICAL.value: defaultdict(list),
@@ -105,13 +101,27 @@ class AnnotationGraphService(GraphConnection):
             EntityType.LAB_STRAIN.value: defaultdict(list)
         }
 
+        for k, v in inclusion_dicts.items():
+            self._create_entity_inclusion(k, v)
+        return inclusion_dicts
+
+    def get_entity_inclusions(self, inclusions: List[dict]) -> GlobalInclusions:
+        """Returns global inclusions for each entity type.
+        For species (taxonomy), also return the local inclusions.
+
+        :param inclusions:  custom annotations relative to file
+            - need to be filtered for local inclusions
+        """
+        # copy since the cached global inclusions are shared between requests
+        inclusion_dicts: Dict[str, dict] = {
+            k: defaultdict(list, v) for k, v in get_cached_globals(
+                'inclusions', self._get_global_inclusions).items()
+        }
+
         local_inclusion_dicts: Dict[str, dict] = {
             EntityType.SPECIES.value: defaultdict(list)
         }
 
-        for k, v in inclusion_dicts.items():
-            self._create_entity_inclusion(k, v)
-
         local_species_inclusions = [
             local for local in inclusions if local.get(
                 'meta', {}).get('type') == EntityType.SPECIES.value and not local.get(
@@ -181,15 +191,20 @@ class AnnotationGraphService(GraphConnection):
         data_sources: Dict[str, str] = {}
         primary_names: Dict[str, str] = {}
 
-        result = self.exec_read_query_with_params(
-            get_gene_to_organism_query(), {'genes': genes, 'organisms': organisms})
-
-        for row in result:
-            gene_name = row['gene_name']
-            gene_synonym = row['gene_synonym']
-            gene_id = row['gene_id']
-            organism_id = row['organism_id']
-            data_source = row['data_source']
+        def fetch(synonyms):
+            result = self.exec_read_query_with_params(
+                get_gene_to_organism_query(), {'synonyms': synonyms})
+            return [
+                (
+                    row['gene_synonym'],
+                    row['organism_id'],
+                    (row['gene_name'], row['gene_id'], row['data_source'])
+                ) for row in result
+            ]
+
+        matches = get_organism_matches(EntityType.GENE.value, genes, organisms, fetch)
+
+        for gene_synonym, organism_id, (gene_name, gene_id, data_source) in matches:
             data_source_key = f'{gene_synonym}{organism_id}'
 
             primary_names[gene_id] = gene_name
@@ -223,15 +238,16 @@ class AnnotationGraphService(GraphConnection):
         protein_to_organism_map: Dict[str, Dict[str, str]] = {}
         primary_names: Dict[str, str] = {}
 
-        result = self.exec_read_query_with_params(
-            get_protein_to_organism_query(), {'proteins': proteins, 'organisms': organisms})
-
-        for row in result:
-            protein_name: str = row['protein']
-            organism_id: str = row['organism_id']
+        def fetch(synonyms):
+            result = self.exec_read_query_with_params(
+                get_protein_to_organism_query(), {'synonyms': synonyms})
             # For now just get the first protein in the list of matches,
             # no way for us to infer which to use
-            protein_id: str = row['protein_ids'][0]
+            return [(row['protein'], row['organism_id'], row['protein_ids'][0]) for row in result]
+
+        matches = get_organism_matches(EntityType.PROTEIN.value, proteins, organisms, fetch)
+
+        for protein_name, organism_id, protein_id in matches:
 
             primary_names[protein_id] = protein_name
 
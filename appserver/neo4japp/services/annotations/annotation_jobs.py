@@ -0,0 +1,202 @@
+"""Background annotation jobs.
+
+Annotating many files in one request can take longer than the load
+balancer allows, so a job annotates the files in a bounded pool of
+worker threads and commits each file as soon as it is done.
+
+The progress of a job is kept in redis, so the job can be polled from
+any appserver worker, not only the one running it.
+
+The pool is in the appserver process, so the files of a job that were not
+annotated yet are lost if the worker running it restarts. A job that makes
+no progress for JOB_STALL_TIMEOUT is reported done, with the files it did
+not annotate failed, so that clients polling it stop and can try again.
+Every task that starts in the pool also records the progress of the jobs
+queued behind it in the same process, which are still waiting, not lost.
+"""
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional
+from uuid import uuid4
+
+from flask import current_app
+
+from neo4japp.constants import LogEventType
+from neo4japp.services.rcache import redis_server
+from neo4japp.utils.logger import EventLog
+
+
+JOB_KEY_PREFIX = 'annotation_job'
+# how long the job progress is kept after the last update
+JOB_EXPIRATION = 3600 * 24
+# how long a job can go without progress before it is considered interrupted
+JOB_STALL_TIMEOUT = 3600
+
+FAILED_RESULT = {
+    'attempted': True,
+    'success': False,
+    'error': 'An unexpected error occurred while annotating the file.'
+}
+INTERRUPTED_RESULT = {
+    'attempted': False,
+    'success': False,
+    'error': 'The annotation job was interrupted, please try again.'
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+
+# the number of tasks queued or running in the pool of this process, by job id
+_pending_tasks: Dict[str, int] = {}
+_pending_tasks_lock = Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('ANNOTATION_JOB_WORKERS', 4),
+                thread_name_prefix='annotation-job')
+        return _executor
+
+
+def _get_key(job_id: str) -> str:
+    return f'{JOB_KEY_PREFIX}:{job_id}'
+
+
+def create_job(hash_ids: Iterable[str], missing: Iterable[str], user_id: int) -> str:
+    job_id = str(uuid4())
+    key = _get_key(job_id)
+    hash_ids = list(hash_ids)
+
+    pipe = redis_server.pipeline()
+    pipe.hset(key, mapping={
+        'user_id': user_id,
+        'total': len(hash_ids),
+        'hash_ids': json.dumps(hash_ids),
+        'missing': json.dumps(list(missing)),
+        'updated': time.time(),
+    })
+    pipe.expire(key, JOB_EXPIRATION)
+    pipe.execute()
+    return job_id
+
+
+def set_job_result(job_id: str, hash_id: str, result: dict, overwrite: bool = True):
+    """
+    :param overwrite: replace the result of the file if it already has one
+    """
+    key = _get_key(job_id)
+    pipe = redis_server.pipeline()
+    if overwrite:
+        pipe.hset(key, f'result:{hash_id}', json.dumps(result))
+    else:
+        pipe.hsetnx(key, f'result:{hash_id}', json.dumps(result))
+    pipe.hset(key, 'updated', time.time())
+    pipe.expire(key, JOB_EXPIRATION)
+    pipe.execute()
+
+
+def touch_pending_jobs():
+    """Record that the jobs with tasks in the pool of this process are making progress,
+    the tasks waiting behind others included."""
+    with _pending_tasks_lock:
+        job_ids = list(_pending_tasks)
+    now = time.time()
+    pipe = redis_server.pipeline()
+    for job_id in job_ids:
+        key = _get_key(job_id)
+        pipe.hset(key, 'updated', now)
+        pipe.expire(key, JOB_EXPIRATION)
+    pipe.execute()
+
+
+def _add_pending_task(job_id: str, count: int):
+    with _pending_tasks_lock:
+        pending = _pending_tasks.get(job_id, 0) + count
+        if pending:
+            _pending_tasks[job_id] = pending
+        else:
+            _pending_tasks.pop(job_id, None)
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Returns the progress of a job, or None if the job does not exist
+    or has expired.
+    """
+    job = redis_server.hgetall(_get_key(job_id))
+    if not job:
+        return None
+
+    mapping: Dict[str, dict] = {}
+    for field, value in job.items():
+        name = field.decode('utf-8')
+        if name.startswith('result:'):
+            mapping[name[len('result:'):]] = json.loads(value)
+
+    total = int(job[b'total'])
+    done = len(mapping) >= total
+    updated = job.get(b'updated')
+    if not done and updated is not None and time.time() - float(updated) > JOB_STALL_TIMEOUT:
+        # the worker running the job is gone
+        for hash_id in json.loads(job[b'hash_ids']):
+            mapping.setdefault(hash_id, INTERRUPTED_RESULT)
+        done = True
+
+    return {
+        'job_id': job_id,
+        'user_id': int(job[b'user_id']),
+        'total': total,
+        'completed': len(mapping),
+        'done': done,
+        'mapping': mapping,
+        'missing': json.loads(job[b'missing']),
+    }
+
+
+def submit_job_task(job_id: str, hash_id: str, task: Callable, *args, **kwargs):
+    """Run `task`, which annotates the file `hash_id` of the job, in the annotation
+    worker pool, within a new app context since the request context is gone by the
+    time it runs.
+
+    If `task` raises, the file is recorded as failed, unless `task` recorded a
+    result for it before raising.
+    """
+    app = current_app._get_current_object()  # type: ignore
+
+    def run():
+        with app.app_context():
+            touch_pending_jobs()
+            return task(*args, **kwargs)
+
+    def done(future):
+        _add_pending_task(job_id, -1)
+        if future.cancelled() or future.exception() is None:
+            return
+        with app.app_context():
+            current_app.logger.error(
+                f'Annotation job {job_id} failed to annotate file {hash_id}.',
+                exc_info=future.exception(),
+                extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+            )
+            try:
+                set_job_result(job_id, hash_id, FAILED_RESULT, overwrite=False)
+            except Exception as e:
+                current_app.logger.error(
+                    f'Failed to record the result of file {hash_id} of annotation job {job_id}.',
+                    exc_info=e,
+                    extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+                )
+
+    _add_pending_task(job_id, 1)
+    try:
+        future = _get_executor().submit(run)
+    except Exception:
+        _add_pending_task(job_id, -1)
+        raise
+    future.add_done_callback(done)
+    return future
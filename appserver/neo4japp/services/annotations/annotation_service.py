@@ -1,7 +1,6 @@
 import json
 import time
 
-from bisect import bisect_left
 from math import inf, isinf
 from typing import cast, Dict, List, Set, Tuple
 from urllib.parse import quote as uri_encode
@@ -11,7 +10,6 @@ from flask import current_app
 
 from .annotation_db_service import AnnotationDBService
 from .annotation_graph_service import AnnotationGraphService
-from .annotation_interval_tree import AnnotationInterval, AnnotationIntervalTree
 from .constants import (
     DatabaseType,
     EntityIdStr,
@@ -34,7 +32,9 @@ from .data_transfer_objects import (
     PDFWord,
     SpecifiedOrganismStrain
 )
+from .metrics import ANNOTATIONS, observe_size, observe_stage
 from .utils.common import has_center_point
+from .utils.proximity import ProximityIndex
 
 from neo4japp.constants import LogEventType
 from neo4japp.exceptions import AnnotationError
@@ -53,6 +53,7 @@ class AnnotationService:
 
         self.organism_frequency: Dict[str, int] = {}
         self.organism_locations: Dict[str, List[Tuple[int, int]]] = {}
+        self.organism_proximity = ProximityIndex({})
         self.organism_categories: Dict[str, str] = {}
 
     def get_entities_to_annotate(
@@ -334,34 +335,16 @@ class AnnotationService:
             if curr_closest_organism is None:
                 curr_closest_organism = organism
 
-            min_organism_dist = inf
-            new_organism_dist = inf
-
-            if organism not in self.organism_locations:
+            if organism not in self.organism_proximity:
                 current_app.logger.error(
                     f'Organism ID {organism} does not exist in {self.organism_locations}.',
                     extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
                 )
                 continue
 
-            positions_to_check = self.organism_locations[organism]
-            if above_only:
-                cut_idx = bisect_left(positions_to_check, (entity_location_lo, entity_location_hi))
-                positions_to_check = positions_to_check[:cut_idx]
-
             # Get the closest instance of this organism
-            for organism_pos in positions_to_check:
-                organism_location_lo = organism_pos[0]
-                organism_location_hi = organism_pos[1]
-
-                if entity_location_lo > organism_location_hi:
-                    # organism is before entity
-                    new_organism_dist = entity_location_lo - organism_location_hi
-                else:
-                    new_organism_dist = organism_location_lo - entity_location_hi
-
-                if new_organism_dist < min_organism_dist:
-                    min_organism_dist = new_organism_dist
+            min_organism_dist = self.organism_proximity.closest_distance(
+                organism, entity_location_lo, entity_location_hi, above_only=above_only)
 
             # If this organism is closer than the current closest, update
             if min_organism_dist < closest_dist:
@@ -513,8 +496,10 @@ class AnnotationService:
             genes=gene_names_list,
             organisms=organism_ids,
         )
+        elapsed = time.time() - gene_match_time
+        observe_stage('kg_gene_organisms', elapsed)
         current_app.logger.info(
-            f'Gene organism KG query time {time.time() - gene_match_time}',
+            f'Gene organism KG query time {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
 
@@ -532,8 +517,10 @@ class AnnotationService:
                     genes=gene_names_list,
                     organisms=[self.specified_organism.organism_id],
                 )
+            elapsed = time.time() - gene_match_time
+            observe_stage('kg_gene_fallback_organisms', elapsed)
             current_app.logger.info(
-                f'Gene fallback organism KG query time {time.time() - gene_match_time}',
+                f'Gene fallback organism KG query time {elapsed}',
                 extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
             )
             fallback_gene_organism_matches = fallback_graph_results.matches
@@ -635,8 +622,10 @@ class AnnotationService:
             proteins=protein_names_list,
             organisms=list(self.organism_frequency),
         )
+        elapsed = time.time() - protein_match_time
+        observe_stage('kg_protein_organisms', elapsed)
         current_app.logger.info(
-            f'Protein organism KG query time {time.time() - protein_match_time}',
+            f'Protein organism KG query time {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
 
@@ -652,8 +641,10 @@ class AnnotationService:
                     proteins=protein_names_list,
                     organisms=[self.specified_organism.organism_id],
                 )
+            elapsed = time.time() - protein_match_time
+            observe_stage('kg_protein_fallback_organisms', elapsed)
             current_app.logger.info(
-                f'Protein fallback organism KG query time {time.time() - protein_match_time}',
+                f'Protein fallback organism KG query time {elapsed}',
                 extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
             )
 
@@ -786,8 +777,9 @@ class AnnotationService:
         if local_inclusions:
             species_annotations_with_local += filtered_local_species_annotations
 
-        self.organism_frequency, self.organism_locations, self.organism_categories = \
-            self._get_entity_frequency_location_and_category(species_annotations_with_local)
+        self.organism_frequency, self.organism_locations, self.organism_categories, \
+            self.organism_proximity = self._get_entity_frequency_location_and_category(
+                species_annotations_with_local)
 
         return species_annotations
 
@@ -797,10 +789,12 @@ class AnnotationService:
     ) -> Tuple[
             Dict[str, int],
             Dict[str, List[Tuple[int, int]]],
-            Dict[str, str]]:
+            Dict[str, str],
+            ProximityIndex]:
         """Takes as input a list of annotation objects (intended to be of a single entity type).
 
-        Returns the frequency of the annotation entities, and their locations within the document.
+        Returns the frequency of the annotation entities, their locations within the document,
+        and an index of the locations to find the closest entity to a token.
         """
         matched_entity_locations: Dict[str, List[Tuple[int, int]]] = {}
         entity_frequency: Dict[str, int] = {}
@@ -840,7 +834,8 @@ class AnnotationService:
         for k, v in locations.items():
             matched_entity_locations[k] = sorted(v)
 
-        return entity_frequency, matched_entity_locations, entity_categories
+        return entity_frequency, matched_entity_locations, entity_categories, \
+            ProximityIndex(matched_entity_locations)
 
     def _get_fixed_false_positive_unified_annotations(
         self,
@@ -959,8 +954,11 @@ class AnnotationService:
         start = time.time()
         cleaned = self._clean_annotations(annotations=annotations)
 
+        elapsed = time.time() - start
+        observe_stage('clean_annotations', elapsed)
+        observe_size(ANNOTATIONS, len(cleaned))
         current_app.logger.info(
-            f'Time to clean and run annotation interval tree {time.time() - start}',
+            f'Time to clean and run annotation interval tree {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
         return cleaned
@@ -999,37 +997,33 @@ class AnnotationService:
             else:
                 annotation_interval_dict[interval_pair] = [unified]
 
-        # it's faster to create an interval tree with just
-        # intervals, rather than a tree with intervals and data
-        # because the data are viewed as unique, so the tree is bigger
-        tree = AnnotationIntervalTree(
-            AnnotationInterval(
-                begin=lo,
-                end=hi
-            ) for (lo, hi) in annotation_interval_dict)
-
-        overlap_ranges = tree.merge_overlaps()
+        # sweep the intervals in offset order, every interval that overlaps
+        # the current group (sharing an offset counts) joins it, and only one
+        # annotation is chosen for each group of overlapping intervals
+        annotations_to_fix: List[Annotation] = []
+        group_hi = -1
 
-        for lo, hi in overlap_ranges:
-            overlaps = tree.overlap(lo, hi)
+        for lo, hi in sorted(annotation_interval_dict):
+            if annotations_to_fix and lo > group_hi:
+                updated_unified_annotations.append(
+                    self._choose_annotation(annotations_to_fix))
+                annotations_to_fix = []
+                group_hi = -1
 
-            annotations_to_fix: List[Annotation] = []
-
-            for overlap in overlaps:
-                annotations_to_fix += [anno for anno in annotation_interval_dict[(overlap.begin, overlap.end)]]  # noqa
-
-            chosen_annotation = None
-
-            for annotation in annotations_to_fix:
-                if chosen_annotation:
-                    chosen_annotation = self.determine_entity_precedence(
-                        anno1=chosen_annotation, anno2=annotation)
-                else:
-                    chosen_annotation = annotation
-            updated_unified_annotations.append(chosen_annotation)  # type: ignore
+            annotations_to_fix += annotation_interval_dict[(lo, hi)]
+            group_hi = max(group_hi, hi)
 
+        if annotations_to_fix:
+            updated_unified_annotations.append(self._choose_annotation(annotations_to_fix))
         return updated_unified_annotations
 
+    def _choose_annotation(self, annotations: List[Annotation]) -> Annotation:
+        chosen_annotation = annotations[0]
+        for annotation in annotations[1:]:
+            chosen_annotation = self.determine_entity_precedence(
+                anno1=chosen_annotation, anno2=annotation)
+        return chosen_annotation
+
     def determine_entity_precedence(
         self,
         anno1: Annotation,
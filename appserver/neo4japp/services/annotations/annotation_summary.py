@@ -0,0 +1,274 @@
+"""Per file annotation counts.
+
+The annotation count and sorted annotation exports used to load the
+annotations of every file in a folder, a few MBs of JSON per PDF. Instead,
+the number of annotations of each (entity id, entity type) in a file is
+stored in the `file_annotation_summary` table, and refreshed in the same
+transaction as any change to the annotations, custom annotations or
+exclusions of the file:
+    - ORM changes to a file are handled by a Files event listener
+    - bulk updates (annotation generation) call
+      `refresh_file_annotation_summaries` with the ids of the updated files
+
+The exports only read the table. Files annotated before it existed, or
+summarized before it kept the enrichment table genes, are summarized by the
+data migration or the `summarize-annotations` command.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+from pandas import DataFrame, Series
+from sqlalchemy import and_, or_, Text
+from sqlalchemy.orm import defer, Session
+
+from neo4japp.database import db
+from neo4japp.models import Files
+from neo4japp.models.files import FileAnnotationSummary
+
+
+SUMMARY_COLUMNS = [
+    'file_id', 'entity_id', 'entity_type', 'text', 'primary_name', 'count', 'enrichment_genes'
+]
+
+# files per query when refreshing the summaries
+REFRESH_CHUNK_SIZE = 100
+
+
+def filter_excluded_annotations(annotations: List[dict], exclusions: List[dict]) -> List[dict]:
+    """Removes the annotations matching an exclusion (same type and text).
+
+    The exclusions are looked up by (type, text) instead of comparing each
+    annotation to every exclusion.
+    """
+    case_sensitive = set()
+    case_insensitive = set()
+    for exclusion in exclusions:
+        text = exclusion.get('text', 'True').strip()
+        if exclusion.get('isCaseInsensitive'):
+            case_insensitive.add((exclusion.get('type'), text.lower()))
+        else:
+            case_sensitive.add((exclusion.get('type'), text))
+
+    if not case_sensitive and not case_insensitive:
+        return list(annotations)
+
+    filtered = []
+    for annotation in annotations:
+        entity_type = annotation['meta']['type']
+        text = annotation.get('textInDocument', 'False').strip()
+        if (entity_type, text) in case_sensitive or \
+                (entity_type, text.lower()) in case_insensitive:
+            continue
+        filtered.append(annotation)
+    return filtered
+
+
+def get_combined_annotations(
+    annotations,
+    custom_annotations: List[dict],
+    excluded_annotations: List[dict]
+) -> List[dict]:
+    """Returns the annotations of a file that were not excluded,
+    followed by the custom annotations.
+    """
+    custom_annotations = custom_annotations or []
+    if not annotations:
+        return custom_annotations
+    # for some reason enrichment table returns list in here
+    # should no longer trigger JIRA LL-2820
+    # leaving for backward compatibility
+    # new tables or re-annotated tables will not have a list
+    if isinstance(annotations, list):
+        annotations = annotations[0]
+    annotations = annotations['documents'][0]['passages'][0]['annotations']
+    return filter_excluded_annotations(
+        annotations, excluded_annotations or []) + custom_annotations
+
+
+def summarize_annotations(annotations: List[dict]) -> List[dict]:
+    """Counts the annotations of each (entity id, entity type),
+    in the order they first appear.
+
+    The enrichment table annotations also keep the genes (rows) of
+    the table the entity is annotated in.
+    """
+    summary: Dict[Tuple[str, str], dict] = {}
+    # the genes of each entity, in the order they first appear
+    genes: Dict[Tuple[str, str], Dict[str, None]] = {}
+    for annotation in annotations:
+        meta = annotation['meta']
+        key = (meta['id'] or '', meta['type'])
+        row = summary.get(key)
+        if row is not None:
+            row['count'] += 1
+        else:
+            if annotation.get('keyword', None) is not None:
+                text = annotation['keyword']
+            else:
+                text = meta['allText']
+            summary[key] = {
+                'entity_id': key[0],
+                'entity_type': key[1],
+                'text': text.strip(),
+                'primary_name': (annotation.get('primaryName') or '').strip(),
+                'count': 1
+            }
+            genes[key] = {}
+
+        if annotation.get('enrichmentGene', None) is not None:
+            genes[key][annotation['enrichmentGene']] = None
+
+    for key, row in summary.items():
+        row['enrichment_genes'] = list(genes[key])
+    return list(summary.values())
+
+
+def refresh_file_annotation_summaries(executor, file_ids: Sequence[int]):
+    """Recomputes the summaries of the files from their annotation columns.
+
+    :param executor: a session or connection, the summaries are
+        written in its transaction
+    """
+    t_files = Files.__table__
+    t_summary = FileAnnotationSummary.__table__
+
+    file_ids = list(file_ids)
+    for i in range(0, len(file_ids), REFRESH_CHUNK_SIZE):
+        chunk = file_ids[i:i + REFRESH_CHUNK_SIZE]
+        files = executor.execute(
+            t_files.select().with_only_columns([
+                t_files.c.id,
+                t_files.c.annotations,
+                t_files.c.custom_annotations,
+                t_files.c.excluded_annotations
+            ]).where(t_files.c.id.in_(chunk))
+        ).fetchall()
+
+        rows = []
+        for file_id, annotations, custom_annotations, excluded_annotations in files:
+            combined = get_combined_annotations(
+                annotations, custom_annotations, excluded_annotations)
+            rows += [{'file_id': file_id, **row} for row in summarize_annotations(combined)]
+
+        executor.execute(t_summary.delete().where(t_summary.c.file_id.in_(chunk)))
+        if rows:
+            executor.execute(t_summary.insert(), rows)
+
+
+def defer_annotations():
+    """Query options to not load the annotation columns of the files."""
+    return [
+        defer(Files.annotations),
+        defer(Files.custom_annotations),
+        defer(Files.excluded_annotations),
+        defer(Files.enrichment_annotations)
+    ]
+
+
+def summarize_files(session: Session, missing_only: bool = True) -> int:
+    """Summarizes the annotated files, committing every chunk of files.
+
+    :param missing_only: only the files that were never summarized, or were
+        summarized before the summaries kept the enrichment table genes
+    :return: the number of files summarized
+    """
+    query = session.query(Files.id).filter(
+        and_(
+            Files.deletion_date.is_(None),
+            # files with no annotations left after exclusions have no summary,
+            # and are summarized again every time, but are rare and cheap
+            or_(
+                Files.annotations.cast(Text) != '[]',
+                Files.custom_annotations.cast(Text) != '[]'
+            )
+        )
+    )
+    if missing_only:
+        summarized = session.query(FileAnnotationSummary.file_id).filter(
+            FileAnnotationSummary.enrichment_genes.isnot(None))
+        query = query.filter(Files.id.notin_(summarized))
+    file_ids = [file_id for file_id, in query.order_by(Files.id)]
+
+    for i in range(0, len(file_ids), REFRESH_CHUNK_SIZE):
+        try:
+            refresh_file_annotation_summaries(session, file_ids[i:i + REFRESH_CHUNK_SIZE])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+    return len(file_ids)
+
+
+def get_file_annotation_summaries(files: List[Files]) -> DataFrame:
+    """Returns the summary rows of the files, ordered like `files` and in the
+    order the entities first appear in each file.
+
+    The annotation columns of `files` are not used, and can be deferred.
+    """
+    file_ids = [file.id for file in files]
+    if not file_ids:
+        return DataFrame(columns=SUMMARY_COLUMNS)
+
+    rows = db.session.query(
+        FileAnnotationSummary.file_id,
+        FileAnnotationSummary.entity_id,
+        FileAnnotationSummary.entity_type,
+        FileAnnotationSummary.text,
+        FileAnnotationSummary.primary_name,
+        FileAnnotationSummary.count,
+        FileAnnotationSummary.enrichment_genes
+    ).filter(
+        FileAnnotationSummary.file_id.in_(file_ids)
+    ).order_by(
+        FileAnnotationSummary.id
+    ).all()
+
+    summaries = DataFrame(rows, columns=SUMMARY_COLUMNS)
+    file_order = {file_id: i for i, file_id in enumerate(file_ids)}
+    return summaries \
+        .assign(file_order=summaries['file_id'].map(file_order)) \
+        .sort_values('file_order', kind='mergesort') \
+        .drop(columns='file_order') \
+        .reset_index(drop=True)
+
+
+def count_entities(summaries: DataFrame) -> DataFrame:
+    """Total annotations per entity id, most annotated first.
+
+    The type, text and primary name are those of the first annotation of the
+    entity, like counting the annotations of the files one by one.
+    """
+    counts = summaries.groupby('entity_id', sort=False).agg(
+        entity_type=('entity_type', 'first'),
+        text=('text', 'first'),
+        primary_name=('primary_name', 'first'),
+        count=('count', 'sum')
+    )
+    return counts.sort_values('count', ascending=False, kind='mergesort')
+
+
+def count_entities_per_file(summaries: DataFrame) -> DataFrame:
+    """Annotations per (file, entity id), summed over the entity types."""
+    return summaries.groupby(['file_id', 'entity_id'], sort=False)['count'].sum().reset_index()
+
+
+def count_enrichment_genes(summaries: DataFrame) -> Series:
+    """Number of distinct enrichment table genes each entity id is annotated
+    in, over all the files. Entities without genes are left out.
+    """
+    genes = summaries[['entity_id', 'enrichment_genes']] \
+        .explode('enrichment_genes') \
+        .dropna(subset=['enrichment_genes'])
+    return genes.groupby('entity_id', sort=False)['enrichment_genes'].nunique()
+
+
+def to_annotation(entity_id: str, entity) -> dict:
+    """The annotation fields used by the exports, from a row of `count_entities`."""
+    return {
+        'meta': {
+            'id': entity_id,
+            'type': entity['entity_type'],
+            'allText': entity['text']
+        },
+        'keyword': entity['text'],
+        'primaryName': entity['primary_name']
+    }
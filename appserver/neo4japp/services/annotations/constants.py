@@ -1,4 +1,5 @@
 import os
+import tempfile
 from enum import Enum
 from typing import Dict, Union
 
@@ -17,6 +18,8 @@ PHENOMENAS_LMDB = 'phenomenas_lmdb'
 PHENOTYPES_LMDB = 'phenotypes_lmdb'
 PROTEINS_LMDB = 'proteins_lmdb'
 SPECIES_LMDB = 'species_lmdb'
+# all of the above merged into one, see synonym_index.py
+SYNONYM_INDEX_LMDB = 'synonym_index_lmdb'
 
 HOMO_SAPIENS_TAX_ID = '9606'
 
@@ -33,8 +36,25 @@ MAX_FOOD_WORD_LENGTH = 4
 REQUEST_TIMEOUT = 60
 
 NLP_URL = os.getenv('NLP_URL')
+# documents are sent to the NLP service in chunks of about this many characters
+NLP_CHUNK_SIZE = 10000
+NLP_MAX_WORKERS = 8
+NLP_CACHE_EXPIRATION = 3600 * 24 * 7
 PDFPARSER_URL = os.getenv('PDFPARSER_URL', 'http://localhost:7600')
 
+# parsed PDFs are cached on local disk, see parsed_content_cache.py
+PARSED_CONTENT_CACHE_DIR = os.getenv('PARSED_CONTENT_CACHE_DIR', '').strip() or \
+                           os.path.join(tempfile.gettempdir(), 'lifelike-parsed-content')
+# in bytes, 0 disables the cache
+PARSED_CONTENT_CACHE_SIZE = int(os.getenv('PARSED_CONTENT_CACHE_SIZE', 1024 ** 3))
+
+# gene/protein to organism matches, see organism_match_cache.py
+# in synonyms per graph query
+ORGANISM_MATCH_BATCH_SIZE = 2000
+# in synonym/organism pairs
+ORGANISM_MATCH_CACHE_SIZE = int(os.getenv('ORGANISM_MATCH_CACHE_SIZE', 200000))
+ORGANISM_MATCH_CACHE_TTL = 3600 * 24
+
 COMMON_TWO_LETTER_WORDS = {
     'of', 'to', 'in', 'it', 'is', 'be', 'as', 'at',
     'so', 'we', 'he', 'by', 'or', 'on', 'do', 'if',
@@ -21,6 +21,7 @@ from .data_transfer_objects import (
     LMDBMatch,
     SpecifiedOrganismStrain
 )
+from .metrics import ANNOTATIONS, observe_size, observe_stage
 
 
 class EnrichmentAnnotationService(AnnotationService):
@@ -59,8 +60,10 @@ class EnrichmentAnnotationService(AnnotationService):
                 genes=gene_names_list,
                 organisms=[self.specified_organism.organism_id],
             )
+        elapsed = time.time() - gene_match_time
+        observe_stage('kg_gene_fallback_organisms', elapsed)
         current_app.logger.info(
-            f'Gene fallback organism KG query time {time.time() - gene_match_time}',
+            f'Gene fallback organism KG query time {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
         fallback_gene_organism_matches = fallback_graph_results.matches
@@ -132,8 +135,10 @@ class EnrichmentAnnotationService(AnnotationService):
                 proteins=protein_names_list,
                 organisms=[self.specified_organism.organism_id],
             )
+        elapsed = time.time() - protein_match_time
+        observe_stage('kg_protein_fallback_organisms', elapsed)
         current_app.logger.info(
-            f'Protein fallback organism KG query time {time.time() - protein_match_time}',
+            f'Protein fallback organism KG query time {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
         fallback_protein_organism_matches = fallback_graph_results.matches
@@ -183,8 +188,11 @@ class EnrichmentAnnotationService(AnnotationService):
         start = time.time()
         cleaned = self._clean_annotations(annotations=annotations)
 
+        elapsed = time.time() - start
+        observe_stage('clean_annotations', elapsed)
+        observe_size(ANNOTATIONS, len(cleaned))
         current_app.logger.info(
-            f'Time to clean and run annotation interval tree {time.time() - start}',
+            f'Time to clean and run annotation interval tree {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
         return cleaned
@@ -1,6 +1,6 @@
 import json
 
-from typing import Dict, List
+from typing import Dict, List, Set
 
 from .constants import (
     EntityType,
@@ -14,6 +14,7 @@ from .constants import (
     PHENOTYPES_LMDB,
     PROTEINS_LMDB,
     SPECIES_LMDB,
+    SYNONYM_INDEX_LMDB,
     MAX_GENE_WORD_LENGTH,
     MAX_FOOD_WORD_LENGTH
 )
@@ -26,6 +27,7 @@ from .data_transfer_objects import (
     GlobalInclusions
 )
 from .lmdb_service import LMDBService
+from .metrics import timed
 
 
 class EntityRecognitionService:
@@ -39,16 +41,10 @@ class EntityRecognitionService:
         self.entity_exclusions = exclusions
         self.entity_inclusions = inclusions
 
-    def _check_lmdb_genes(self, nlp_results: NLPResults, tokens: List[PDFWord]):
-        keys = {token.normalized_keyword for token in tokens}
-
-        global_inclusion = self.entity_inclusions.included_genes
-        global_exclusion = self.entity_exclusions.excluded_genes
-        global_exclusion_case_insensitive = self.entity_exclusions.excluded_genes_case_insensitive
-
+    def _get_lmdb_results(self, dbname: str, keys: Set[str]) -> Dict[str, List[dict]]:
         key_results: Dict[str, List[dict]] = {}
 
-        with self.lmdb.begin(dbname=GENES_LMDB) as txn:
+        with timed(f'lookup_{dbname}'), self.lmdb.begin(dbname=dbname) as txn:
             cursor = txn.cursor()
             matched_results = cursor.getmulti([k.encode('utf-8') for k in keys], dupdata=True)
 
@@ -57,6 +53,16 @@ class EntityRecognitionService:
                 match_list = key_results.get(decoded_key, [])
                 match_list.append(json.loads(value))
                 key_results[decoded_key] = match_list
+        return key_results
+
+    def _check_lmdb_genes(self, nlp_results: NLPResults, tokens: List[PDFWord]):
+        keys = {token.normalized_keyword for token in tokens}
+
+        global_inclusion = self.entity_inclusions.included_genes
+        global_exclusion = self.entity_exclusions.excluded_genes
+        global_exclusion_case_insensitive = self.entity_exclusions.excluded_genes_case_insensitive
+
+        key_results = self._get_lmdb_results(GENES_LMDB, keys)
 
         # gene is a bit different
         # we want both from lmdb and inclusions
@@ -104,19 +110,9 @@ class EntityRecognitionService:
         local_inclusion = self.entity_inclusions.included_local_species
         global_exclusion = self.entity_exclusions.excluded_species
 
-        key_results: Dict[str, List[dict]] = {}
+        key_results = self._get_lmdb_results(SPECIES_LMDB, keys)
         key_results_local: Dict[str, List[dict]] = {}
 
-        with self.lmdb.begin(dbname=SPECIES_LMDB) as txn:
-            cursor = txn.cursor()
-            matched_results = cursor.getmulti([k.encode('utf-8') for k in keys], dupdata=True)
-
-            for key, value in matched_results:
-                decoded_key = key.decode('utf-8')
-                match_list = key_results.get(decoded_key, [])
-                match_list.append(json.loads(value))
-                key_results[decoded_key] = match_list
-
         unmatched_keys = keys - set(key_results)
 
         # for species, check both global and local inclusions
@@ -276,17 +272,7 @@ class EntityRecognitionService:
                 continue
 
             if dbname is not None and global_inclusion is not None and global_exclusion is not None:  # noqa
-                key_results: Dict[str, List[dict]] = {}
-
-                with self.lmdb.begin(dbname=dbname) as txn:
-                    cursor = txn.cursor()
-                    matched_results = cursor.getmulti([k.encode('utf-8') for k in keys], dupdata=True)  # noqa
-
-                    for key, value in matched_results:
-                        decoded_key = key.decode('utf-8')
-                        match_list = key_results.get(decoded_key, [])
-                        match_list.append(json.loads(value))
-                        key_results[decoded_key] = match_list
+                key_results = self._get_lmdb_results(dbname, keys)
 
                 unmatched_keys = keys - set(key_results)
 
@@ -356,3 +342,45 @@ class EntityRecognitionService:
 
     def identify(self, tokens: List[PDFWord], nlp_results: NLPResults) -> RecognizedEntities:
         return self.check_lmdb(nlp_results=nlp_results, tokens=tokens)
+
+
+class IndexedEntityRecognitionService(EntityRecognitionService):
+    """Looks up every entity type with a single pass over the synonym index
+    (see synonym_index.py) instead of one LMDB lookup per entity type.
+
+    The per entity type rules (exclusions, inclusions, NLP veto) are the same,
+    so the recognized entities are identical to EntityRecognitionService.
+    """
+    def __init__(
+        self,
+        exclusions: GlobalExclusions,
+        inclusions: GlobalInclusions,
+        lmdb: LMDBService
+    ):
+        super().__init__(exclusions=exclusions, inclusions=inclusions, lmdb=lmdb)
+        self.index_results: Dict[str, Dict[str, List[dict]]] = {}
+
+    def _get_lmdb_results(self, dbname: str, keys: Set[str]) -> Dict[str, List[dict]]:
+        key_results: Dict[str, List[dict]] = {}
+        for key in keys:
+            found = self.index_results.get(key, {}).get(dbname)
+            if found:
+                # copy since the genes lookup appends inclusions to the list
+                key_results[key] = list(found)
+        return key_results
+
+    def check_lmdb(self, nlp_results: NLPResults, tokens: List[PDFWord]):
+        keys = {token.normalized_keyword for token in tokens}
+
+        with timed(f'lookup_{SYNONYM_INDEX_LMDB}'), \
+                self.lmdb.begin(dbname=SYNONYM_INDEX_LMDB, dupsort=False) as txn:
+            cursor = txn.cursor()
+            self.index_results = {
+                key.decode('utf-8'): json.loads(value)
+                for key, value in cursor.getmulti([k.encode('utf-8') for k in keys])
+            }
+
+        try:
+            return super().check_lmdb(nlp_results=nlp_results, tokens=tokens)
+        finally:
+            self.index_results = {}
@@ -0,0 +1,77 @@
+"""Process-wide cache of the global inclusions and exclusions.
+
+Building the globals takes two graph queries per entity type plus a
+postgres query, but they only change when a curator adds or removes
+a global. Every change bumps a version number in redis, and each worker
+rebuilds its copy of the globals only when that version changed.
+"""
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from neo4japp.constants import LogEventType
+from neo4japp.services.rcache import redis_server
+from neo4japp.utils.logger import EventLog
+
+
+GLOBALS_VERSION_KEY = 'annotation_globals_version'
+
+# {name: (version, value)}
+_globals: Dict[str, Tuple[int, Any]] = {}
+_globals_lock = Lock()
+
+
+def get_globals_version() -> Optional[int]:
+    """Returns None if the version is unknown, e.g redis is down,
+    in which case the globals should not be cached.
+    """
+    try:
+        version = redis_server.get(GLOBALS_VERSION_KEY)
+    except RedisError:
+        current_app.logger.warning(
+            'Failed to get the global annotations version, globals will not be cached.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+        return None
+    return int(version) if version else 0
+
+
+def bump_globals_version():
+    """Should be called after any global inclusion or exclusion is added or removed."""
+    try:
+        redis_server.incr(GLOBALS_VERSION_KEY)
+    except RedisError:
+        # not much we can do, clear this process at least
+        current_app.logger.error(
+            'Failed to bump the global annotations version, '
+            'workers may use stale global inclusions/exclusions.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+        with _globals_lock:
+            _globals.clear()
+
+
+def get_cached_globals(name: str, builder: Callable[[], Any]):
+    """Returns the cached value of `name`, calling `builder` to
+    create it if the globals version changed since it was cached.
+
+    The cached value is shared, callers must not modify it.
+    """
+    if not current_app.config.get('ANNOTATION_GLOBALS_CACHE', True):
+        return builder()
+
+    version = get_globals_version()
+    if version is None:
+        return builder()
+
+    with _globals_lock:
+        cached = _globals.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    value = builder()
+    with _globals_lock:
+        _globals[name] = (version, value)
+    return value
@@ -5,9 +5,10 @@ from .annotation_db_service import AnnotationDBService
 from .annotation_graph_service import AnnotationGraphService
 from .bioc_service import BiocDocumentService
 from .enrichment_annotation_service import EnrichmentAnnotationService
-from .entity_recognition import EntityRecognitionService
+from .entity_recognition import EntityRecognitionService, IndexedEntityRecognitionService
 from .manual_annotation_service import ManualAnnotationService
 from .lmdb_service import LMDBService
+from .synonym_index import is_synonym_index_current
 from .sorted_annotation_service import (
     sorted_annotations_dict,
     sorted_annotations_per_file_type_dict
@@ -27,6 +28,7 @@ from .constants import (
     PHENOTYPES_LMDB,
     PROTEINS_LMDB,
     SPECIES_LMDB,
+    SYNONYM_INDEX_LMDB,
     LMDB_DATA_DIR,
 )
 
@@ -44,7 +46,8 @@ configs = {
     PHENOMENAS_LMDB: 'phenomenas',
     PHENOTYPES_LMDB: 'phenotypes',
     PROTEINS_LMDB: 'proteins',
-    SPECIES_LMDB: 'species'
+    SPECIES_LMDB: 'species',
+    SYNONYM_INDEX_LMDB: 'synonym_index'
 }
 
 
@@ -90,10 +93,19 @@ def get_lmdb_service():
 
 
 def get_recognition_service(exclusions, inclusions):
+    lmdb = get_lmdb_service()
+    # the synonym index is optional, only use it if it was
+    # built from the LMDB files currently on disk
+    if is_synonym_index_current(lmdb):
+        return IndexedEntityRecognitionService(
+            exclusions=exclusions,
+            inclusions=inclusions,
+            lmdb=lmdb
+        )
     return EntityRecognitionService(
         exclusions=exclusions,
         inclusions=inclusions,
-        lmdb=get_lmdb_service()
+        lmdb=lmdb
     )
 
 
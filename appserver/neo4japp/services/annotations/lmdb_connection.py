@@ -1,7 +1,8 @@
 import os
 import lmdb
 
-from typing import Any, Dict
+from threading import Lock
+from typing import Any, Dict, Tuple
 from flask import current_app
 from lmdb import Environment
 
@@ -12,41 +13,106 @@ from neo4japp.utils.logger import EventLog
 from neo4japp.exceptions import LMDBError
 
 
+class _PooledEnvironment:
+    """An environment of the pool, with the number of transactions using it.
+
+    Other threads may still read from an environment when a new version of
+    its data is swapped in, so a replaced environment is only closed once the
+    last transaction using it is released.
+    """
+    def __init__(self, env: Environment, db: Any, pid: int, signature: Tuple[int, int, int]):
+        self.env = env
+        self.db = db
+        self.pid = pid
+        self.signature = signature
+        self.users = 0
+        self.retired = False
+
+    def acquire(self):
+        """Must be called holding _environments_lock."""
+        self.users += 1
+
+    def release(self):
+        with _environments_lock:
+            self.users -= 1
+            close = self.retired and not self.users
+        if close:
+            self.env.close()
+
+    def retire(self):
+        """Must be called holding _environments_lock."""
+        self.retired = True
+        if not self.users:
+            self.env.close()
+
+
+# process-wide pool of read-only environments keyed by LMDB path
+# each gunicorn/multiprocessing worker ends up with its own pool because
+# the pid is checked before reuse (LMDB environments are not fork safe)
+_environments: Dict[str, _PooledEnvironment] = {}
+_environments_lock = Lock()
+
+
+def _get_signature(dbpath: str) -> Tuple[int, int, int]:
+    """Identifies the version of the data file on disk, LMDBManager
+    replaces `data.mdb` when a new version is loaded, so any change
+    here means the environment needs to be reopened.
+    """
+    stat = os.stat(os.path.join(dbpath, 'data.mdb'))
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def close_environments():
+    """Close every pooled environment in this process, the ones still in use
+    are closed when their last transaction is released."""
+    with _environments_lock:
+        for pooled in _environments.values():
+            if pooled.pid == os.getpid():
+                pooled.retire()
+        _environments.clear()
+
+
 class LMDBConnection(DatabaseConnection):
     def __init__(self, dirpath: str, **kwargs):
         self.dirpath = dirpath
-        self.dbs: Dict[str, Any] = {}
         self.configs = kwargs
 
     class _context(TransactionContext):
-        def __init__(self, env, db):
-            self.db = db
-            self.env: Environment = env
+        def __init__(self, pooled: _PooledEnvironment):
+            # the environment was acquired by begin(), so it stays open
+            # until this context exits even if a new version is swapped in
+            self.pooled = pooled
+            self.db = pooled.db
+            self.env: Environment = pooled.env
 
         def __enter__(self):
-            self.session = self.env.begin(self.db)
+            try:
+                self.session = self.env.begin(db=self.db)
+            except Exception:
+                self.pooled.release()
+                raise
             return self.session
 
         def __exit__(self, exc_type, exc_val, exc_traceback):
-            self.env.close()
-
-    def begin(self, **kwargs):
-        dbname = kwargs.get('dbname', '')
-        create = kwargs.get('create', True)
-        readonly = kwargs.get('readonly', False)
-
-        if not dbname:
-            current_app.logger.error(
-                f'LMDB database name is invalid, cannot connect to {dbname}.',
-                extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
-            )
-            raise LMDBError(
-                title='Cannot Connect to LMDB',
-                message='Unable to connect to LMDB, database name is invalid.')
+            # only the read transaction is released, the environment
+            # stays open in the pool for the next lookup
+            try:
+                self.session.abort()
+            finally:
+                self.pooled.release()
 
-        dbpath = os.path.join(self.dirpath, self.configs[dbname])
+    def _open(
+        self,
+        dbname: str,
+        dbpath: str,
+        signature: Tuple[int, int, int],
+        dupsort: bool
+    ):
         try:
-            env: Environment = lmdb.open(path=dbpath, create=create, readonly=readonly, max_dbs=2)
+            # lock=False since the data is never written to while being served
+            # and readers do not need to register in lock.mdb
+            env: Environment = lmdb.open(
+                path=dbpath, readonly=True, lock=False, readahead=False, max_dbs=2)
         except Exception:
             current_app.logger.error(
                 f'Failed to open LMDB environment in path {dbpath}.',
@@ -68,13 +134,9 @@ class LMDBConnection(DatabaseConnection):
             and the transaction and cursor will point to the wrong address in
             memory and retrieve whatever is there.
             """
-            if dbname not in self.dbs:
-                db = env.open_db(key=dbname.encode('utf-8'), create=create, dupsort=True)
-                self.dbs[dbname] = db
-            else:
-                db = self.dbs[dbname]
-            return self._context(env, db)
+            db = env.open_db(key=dbname.encode('utf-8'), create=False, dupsort=dupsort)
         except Exception:
+            env.close()
             current_app.logger.error(
                 f'Failed to open LMDB database named {dbname}.',
                 extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
@@ -82,3 +144,42 @@ class LMDBConnection(DatabaseConnection):
             raise LMDBError(
                 title='Cannot Connect to LMDB',
                 message=f'Encountered unexpected error connecting to LMDB.')
+        return _PooledEnvironment(env=env, db=db, pid=os.getpid(), signature=signature)
+
+    def begin(self, **kwargs):
+        dbname = kwargs.get('dbname', '')
+        dupsort = kwargs.get('dupsort', True)
+
+        if not dbname:
+            current_app.logger.error(
+                f'LMDB database name is invalid, cannot connect to {dbname}.',
+                extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+            )
+            raise LMDBError(
+                title='Cannot Connect to LMDB',
+                message='Unable to connect to LMDB, database name is invalid.')
+
+        dbpath = os.path.join(self.dirpath, self.configs[dbname])
+        try:
+            signature = _get_signature(dbpath)
+        except OSError:
+            current_app.logger.error(
+                f'Failed to find LMDB data file in path {dbpath}.',
+                extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+            )
+            raise LMDBError(
+                title='Cannot Connect to LMDB',
+                message=f'Encountered unexpected error connecting to LMDB.')
+
+        with _environments_lock:
+            pooled = _environments.get(dbpath)
+            if pooled is None or pooled.pid != os.getpid() or pooled.signature != signature:
+                if pooled is not None and pooled.pid == os.getpid():
+                    # a new version was swapped in, the transactions still
+                    # reading the previous version keep it open
+                    pooled.retire()
+                pooled = self._open(dbname, dbpath, signature, dupsort)
+                _environments[dbpath] = pooled
+            pooled.acquire()
+        # must be used in a `with` block, which releases the environment
+        return self._context(pooled)
@@ -15,6 +15,7 @@ from neo4japp.util import standardize_str
 from neo4japp.utils.logger import EventLog
 
 from .annotation_graph_service import AnnotationGraphService
+from .annotation_summary import get_combined_annotations
 from .tokenizer import Tokenizer
 from .constants import (
     EntityType,
@@ -24,6 +25,7 @@ from .constants import (
     MAX_FOOD_WORD_LENGTH
 )
 from .data_transfer_objects.dto import PDFWord
+from .globals_cache import bump_globals_version
 from .utils.common import has_center_point
 from .utils.parsing import parse_content
 from .utils.graph_queries import *
@@ -320,6 +322,10 @@ class ManualAnnotationService:
                 message='A system error occurred while creating the annotation, '
                         'we are working on a solution. Please try again later.',
                 code=500)
+        finally:
+            # only once the labels are cleaned up, a cache of the globals
+            # built before would keep the stale inclusions
+            bump_globals_version()
 
     def add_exclusion(self, file: Files, user: AppUser, exclusion):
         """ Adds exclusion of automatic annotation to a given file.
@@ -396,30 +402,8 @@ class ManualAnnotationService:
 
     # TODO: does this belong here?
     def get_file_annotations(self, file):
-        def isExcluded(exclusions, annotation):
-            for exclusion in exclusions:
-                if (exclusion.get('type') == annotation['meta']['type'] and
-                        self._terms_match(
-                            exclusion.get('text', 'True'),
-                            annotation.get('textInDocument', 'False'),
-                            exclusion['isCaseInsensitive'])):
-                    return True
-            return False
-        if len(file.annotations) == 0:
-            return file.custom_annotations
-        annotations = file.annotations
-        # for some reason enrichment table returns list in here
-        # should no longer trigger JIRA LL-2820
-        # leaving for backward compatibility
-        # new tables or re-annotated tables will not have a list
-        if isinstance(file.annotations, list):
-            annotations = annotations[0]
-        annotations = annotations['documents'][0]['passages'][0]['annotations']
-        filtered_annotations = [
-            annotation for annotation in annotations
-            if not isExcluded(file.excluded_annotations, annotation)
-        ]
-        return filtered_annotations + file.custom_annotations
+        return get_combined_annotations(
+            file.annotations, file.custom_annotations, file.excluded_annotations)
 
     def save_global(
         self,
@@ -528,6 +512,7 @@ class ManualAnnotationService:
                         f'Failed to create global inclusion, knowledge graph failed with query: {query}.',  # noqa
                         extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
                     )
+            bump_globals_version()
         else:
             if not self._global_annotation_exists(annotation, inclusion_type):
                 # global exclusion
@@ -548,6 +533,7 @@ class ManualAnnotationService:
                         message='A system error occurred while creating the annotation, '
                                 'we are working on a solution. Please try again later.',
                         code=500)
+                bump_globals_version()
 
     def _global_annotation_exists_in_kg(self, values: dict):
         queries = {
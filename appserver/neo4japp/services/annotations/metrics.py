@@ -0,0 +1,142 @@
+"""In-process metrics of the annotation pipeline.
+
+Every stage of the pipeline (parsing, NLP, tokenizing, the LMDB lookups,
+the organism KG queries, creating annotations and the BioC document) records
+its duration in a histogram, along with the size of the documents and the
+number of tokens and matches. The registry is per process, and can be
+dumped as JSON or in the Prometheus text format (see the
+`/annotations/metrics` endpoint).
+
+Setting `ANNOTATION_PROFILE_DIR` also saves a cProfile capture of every
+annotated file to that directory.
+"""
+import cProfile
+import os
+import time
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from math import inf
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, inf)
+SIZE_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000, 10000000, inf)
+
+STAGE_SECONDS = 'annotation_stage_seconds'
+DOCUMENT_CHARACTERS = 'annotation_document_characters'
+DOCUMENT_TOKENS = 'annotation_document_tokens'
+ENTITY_MATCHES = 'annotation_entity_matches'
+ANNOTATIONS = 'annotation_annotations'
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        # cumulative like prometheus, le is the inclusive upper bound
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets.append(['+Inf' if bound == inf else bound, cumulative])
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._lock = Lock()
+
+    def observe(self, name: str, value: float, buckets=DURATION_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        metrics: Dict[str, List[dict]] = {}
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metrics.setdefault(name, []).append(
+                    {'labels': dict(labels), **histogram.to_dict()})
+        return metrics
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, histograms in self.snapshot().items():
+            lines.append(f'# TYPE {name} histogram')
+            for histogram in histograms:
+                labels = [f'{k}="{v}"' for k, v in histogram['labels'].items()]
+                for bound, count in histogram['buckets']:
+                    bucket_labels = ','.join(labels + [f'le="{bound}"'])
+                    lines.append(f'{name}_bucket{{{bucket_labels}}} {count}')
+                label_str = '{' + ','.join(labels) + '}' if labels else ''
+                lines.append(f'{name}_sum{label_str} {histogram["sum"]}')
+                lines.append(f'{name}_count{label_str} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+def observe_stage(stage: str, seconds: float):
+    registry.observe(STAGE_SECONDS, seconds, stage=stage)
+
+
+def get_stage_seconds() -> Dict[str, float]:
+    """Returns the total seconds spent in each stage so far, keyed by the stage name."""
+    return {
+        histogram['labels']['stage']: histogram['sum']
+        for histogram in registry.snapshot().get(STAGE_SECONDS, [])
+    }
+
+
+def observe_size(name: str, value: int, **labels):
+    registry.observe(name, value, buckets=SIZE_BUCKETS, **labels)
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.time()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.time() - start)
+
+
+@contextmanager
+def profiled(directory: Optional[str], name: str):
+    """Save a cProfile capture of the block to `directory`,
+    does nothing if `directory` is not set.
+    """
+    if not directory:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        os.makedirs(directory, exist_ok=True)
+        profile.dump_stats(
+            os.path.join(directory, f'{datetime.now().isoformat()}-{name}.prof'))
@@ -0,0 +1,168 @@
+"""Process-wide cache of the gene/protein to organism matches from the graph.
+
+Matching the genes and proteins of a document to its organisms queries the
+graph with every gene/protein synonym in the document, but most documents
+share the same synonyms and organisms. The matches are cached per
+(synonym, organism) pair, including the pairs without a match, so only the
+pairs that were not seen before are sent to the graph, in batches of
+synonyms with the organisms each synonym was not seen with.
+
+The cache is a bounded LRU, entries expire after `ORGANISM_MATCH_CACHE_TTL`
+seconds and every process drops its copy when the graph version in redis is
+bumped, which the cache-invalidator does when the graph changed (or run
+`flask invalidate-graph-cache` after reloading the graph).
+"""
+import time
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from .constants import (
+    ORGANISM_MATCH_BATCH_SIZE,
+    ORGANISM_MATCH_CACHE_SIZE,
+    ORGANISM_MATCH_CACHE_TTL
+)
+
+from neo4japp.constants import LogEventType
+from neo4japp.services.rcache import redis_server
+from neo4japp.utils.logger import EventLog
+
+
+# shared with the cache-invalidator
+GRAPH_VERSION_KEY = 'annotation_graph_version'
+
+# (entity type, synonym, organism id)
+CacheKey = Tuple[str, str, str]
+
+
+class OrganismMatchCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # {key: (expiration time, matches)}
+        self._entries: Dict[CacheKey, Tuple[float, Tuple[Any, ...]]] = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = Lock()
+
+    def get_many(self, keys: Iterable[CacheKey], version: int) -> Dict[CacheKey, tuple]:
+        """Returns the cached matches of the keys that are in the cache."""
+        now = time.monotonic()
+        hits = {}
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires, matches = entry
+                if expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)  # type: ignore
+                hits[key] = matches
+        return hits
+
+    def set_many(self, entries: Dict[CacheKey, tuple], version: int):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if version != self._version:
+                # the graph changed while the matches were queried
+                return
+
+            for key, matches in entries.items():
+                self._entries[key] = (expires, matches)
+                self._entries.move_to_end(key)  # type: ignore
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)  # type: ignore
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = OrganismMatchCache(ORGANISM_MATCH_CACHE_SIZE, ORGANISM_MATCH_CACHE_TTL)
+
+
+def get_graph_version() -> Optional[int]:
+    """Returns None if the version is unknown, e.g redis is down,
+    in which case the matches should not be cached.
+    """
+    try:
+        version = redis_server.get(GRAPH_VERSION_KEY)
+    except RedisError:
+        current_app.logger.warning(
+            'Failed to get the graph version, graph query results will not be cached.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+        return None
+    return int(version) if version else 0
+
+
+def bump_graph_version():
+    """Should be called after the graph is reloaded."""
+    try:
+        redis_server.incr(GRAPH_VERSION_KEY)
+    except RedisError:
+        current_app.logger.error(
+            'Failed to bump the graph version, workers may use stale organism matches.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+    _cache.clear()
+
+
+def get_organism_matches(
+    entity_type: str,
+    synonyms: List[str],
+    organisms: List[str],
+    fetch: Callable[[List[Dict[str, Any]]], Iterable[Tuple[str, str, Any]]]
+) -> List[Tuple[str, str, Any]]:
+    """Returns the (synonym, organism id, match) of every synonym/organism pair.
+
+    :param fetch: queries the graph with a batch of {'synonym', 'organisms'}
+        rows, one per synonym, and returns the (synonym, organism id, match) it found
+    """
+    pairs = list(dict.fromkeys((s, o) for s in synonyms for o in organisms))
+
+    version = None
+    if current_app.config.get('ANNOTATION_GRAPH_CACHE', True):
+        version = get_graph_version()
+
+    hits: Dict[CacheKey, tuple] = {}
+    if version is not None:
+        hits = _cache.get_many(((entity_type, s, o) for s, o in pairs), version)
+
+    results: List[Tuple[str, str, Any]] = []
+    fetched: Dict[CacheKey, List[Any]] = {}
+    for synonym, organism in pairs:
+        key = (entity_type, synonym, organism)
+        if key in hits:
+            results += [(synonym, organism, match) for match in hits[key]]
+        else:
+            fetched[key] = []
+
+    # one row per synonym, so the graph is only traversed once per synonym
+    missed_organisms: Dict[str, List[str]] = {}
+    for _, synonym, organism in fetched:
+        missed_organisms.setdefault(synonym, []).append(organism)
+    misses: List[Dict[str, Any]] = [
+        {'synonym': synonym, 'organisms': organisms}
+        for synonym, organisms in missed_organisms.items()]
+    for i in range(0, len(misses), ORGANISM_MATCH_BATCH_SIZE):
+        for synonym, organism, match in fetch(misses[i:i + ORGANISM_MATCH_BATCH_SIZE]):
+            fetched[(entity_type, synonym, organism)].append(match)
+            results.append((synonym, organism, match))
+
+    if version is not None and fetched:
+        _cache.set_many({key: tuple(matches) for key, matches in fetched.items()}, version)
+    return results
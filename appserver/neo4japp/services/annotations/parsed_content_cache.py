@@ -0,0 +1,152 @@
+"""Local disk cache of parsed PDFs.
+
+Parsing a PDF means the pdfparser downloads the file from the appserver,
+and the token/rect response is turned into `PDFWord`s again, every time
+the file is annotated. The parsed result only depends on the content and
+whether references are excluded, so it is cached by the content checksum.
+
+Entries are compressed JSON files, and the least recently used entries are
+removed once the cache grows over `PARSED_CONTENT_CACHE_SIZE` bytes.
+"""
+import json
+import os
+import zlib
+
+from tempfile import NamedTemporaryFile
+from typing import List, Optional, Tuple
+
+from flask import current_app
+
+from .constants import PARSED_CONTENT_CACHE_DIR, PARSED_CONTENT_CACHE_SIZE
+from .data_transfer_objects import PDFWord
+
+from neo4japp.constants import LogEventType
+from neo4japp.utils.logger import EventLog
+
+
+# bump when the serialized format or the parsing changes
+CACHE_VERSION = 1
+
+
+def _get_path(checksum: bytes, exclude_references: bool) -> str:
+    return os.path.join(
+        PARSED_CONTENT_CACHE_DIR,
+        f'{checksum.hex()}-{int(exclude_references)}-v{CACHE_VERSION}.json.z')
+
+
+def serialize(pdf_text: str, parsed: List[PDFWord]) -> bytes:
+    # normalized_keyword is not stored, it is the same as
+    # the keyword until the tokenizer normalizes it
+    words = [[
+        word.keyword,
+        word.page_number,
+        word.lo_location_offset,
+        word.hi_location_offset,
+        word.previous_words,
+        word.heights,
+        word.widths,
+        word.coordinates
+    ] for word in parsed]
+    return zlib.compress(
+        json.dumps([pdf_text, words], separators=(',', ':')).encode('utf-8'))
+
+
+def deserialize(data: bytes) -> Tuple[str, List[PDFWord]]:
+    pdf_text, words = json.loads(zlib.decompress(data))
+    return pdf_text, [
+        PDFWord(
+            keyword=keyword,
+            normalized_keyword=keyword,
+            page_number=page_number,
+            lo_location_offset=lo_location_offset,
+            hi_location_offset=hi_location_offset,
+            previous_words=previous_words,
+            heights=heights,
+            widths=widths,
+            coordinates=coordinates
+        ) for (
+            keyword,
+            page_number,
+            lo_location_offset,
+            hi_location_offset,
+            previous_words,
+            heights,
+            widths,
+            coordinates
+        ) in words
+    ]
+
+
+def get_parsed_content(
+    checksum: bytes,
+    exclude_references: bool
+) -> Optional[Tuple[str, List[PDFWord]]]:
+    if not PARSED_CONTENT_CACHE_SIZE:
+        return None
+
+    path = _get_path(checksum, exclude_references)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # mark as recently used for the eviction
+        os.utime(path)
+        return deserialize(data)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        current_app.logger.warning(
+            f'Failed to read the parsed content cache entry {path}.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+        return None
+
+
+def set_parsed_content(
+    checksum: bytes,
+    exclude_references: bool,
+    pdf_text: str,
+    parsed: List[PDFWord]
+):
+    if not PARSED_CONTENT_CACHE_SIZE:
+        return
+
+    try:
+        os.makedirs(PARSED_CONTENT_CACHE_DIR, exist_ok=True)
+        # write to a temporary file first so other workers
+        # never read a partially written entry
+        with NamedTemporaryFile(dir=PARSED_CONTENT_CACHE_DIR, suffix='.tmp', delete=False) as f:
+            f.write(serialize(pdf_text, parsed))
+        os.replace(f.name, _get_path(checksum, exclude_references))
+        evict(PARSED_CONTENT_CACHE_SIZE)
+    except OSError:
+        current_app.logger.warning(
+            'Failed to write the parsed content cache entry.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+
+
+def evict(max_size: int):
+    """Remove the least recently used entries until the cache fits in `max_size` bytes."""
+    entries = []
+    total = 0
+    for entry in os.scandir(PARSED_CONTENT_CACHE_DIR):
+        if not entry.name.endswith('.json.z'):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    if total <= max_size:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= max_size:
+            break
@@ -1,11 +1,19 @@
+import attr
 import json
 import time
 
 from flask import current_app
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from .constants import SPECIES_LMDB
 from .data_transfer_objects import PDFWord, SpecifiedOrganismStrain
+from .metrics import (
+    DOCUMENT_CHARACTERS,
+    DOCUMENT_TOKENS,
+    ENTITY_MATCHES,
+    observe_size,
+    observe_stage
+)
 from .utils.nlp import predict
 from .utils.parsing import parse_content
 
@@ -68,7 +76,16 @@ class Pipeline:
                 'Unable to Annotate',
                 'Cannot annotate the PDF file, the file id is missing or data is corrupted.')
 
-        return parse_content(content_type, **params)
+        start = time.time()
+        parsed = parse_content(content_type, **params)
+        self._record_timing('parse', start)
+        return parsed
+
+    @classmethod
+    def _record_timing(cls, stage: str, start: float) -> float:
+        elapsed = time.time() - start
+        observe_stage(stage, elapsed)
+        return elapsed
 
     def get_globals(
         self,
@@ -81,8 +98,9 @@ class Pipeline:
         start = time.time()
         self.global_exclusions = db_service.get_entity_exclusions(excluded_annotations)
         self.global_inclusions = graph_service.get_entity_inclusions(custom_annotations)
+        elapsed = self._record_timing('globals', start)
         current_app.logger.info(
-            f'Time to process entity exclusions/inclusions {time.time() - start}',
+            f'Time to process entity exclusions/inclusions {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
         return self
@@ -96,24 +114,31 @@ class Pipeline:
         entities_to_run_nlp = set(k for k, v in annotation_methods.items() if v['nlp'])
         start = time.time()
         nlp_results = predict(text=self.text, entities=entities_to_run_nlp)
+        elapsed = self._record_timing('nlp', start)
         current_app.logger.info(
-            f'Total NLP processing time for entities {entities_to_run_nlp} {time.time() - start}',
+            f'Total NLP processing time for entities {entities_to_run_nlp} {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
 
         start = time.time()
         tokens = tokenizer.create(self.parsed)
+        elapsed = self._record_timing('tokenize', start)
+        observe_size(DOCUMENT_CHARACTERS, len(self.text))
+        observe_size(DOCUMENT_TOKENS, len(tokens))
         current_app.logger.info(
-            f'Time to tokenize PDF words {time.time() - start}',
+            f'Time to tokenize PDF words {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
 
         start = time.time()
         self.entities = self.er_service.identify(tokens=tokens, nlp_results=nlp_results)
+        elapsed = self._record_timing('recognition', start)
         current_app.logger.info(
-            f'Total LMDB lookup time {time.time() - start}',
+            f'Total LMDB lookup time {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
+        for name, matches in attr.asdict(self.entities, recurse=False).items():
+            observe_size(ENTITY_MATCHES, len(matches), entity_type=name[len('recognized_'):])
         return self
 
     def annotate(
@@ -141,13 +166,17 @@ class Pipeline:
             enrichment_mappings=enrichment_mappings
         )
 
+        elapsed = self._record_timing('annotate', start)
         current_app.logger.info(
-            f'Time to create annotations {time.time() - start}',
+            f'Time to create annotations {elapsed}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
         )
 
+        start = time.time()
         bioc = bioc_service.read(text=self.text, file_uri=filename)
-        return bioc_service.generate_bioc_json(annotations=annotations, bioc=bioc)
+        bioc_json = bioc_service.generate_bioc_json(annotations=annotations, bioc=bioc)
+        self._record_timing('bioc', start)
+        return bioc_json
 
     def create_fallback_organism(
         self,
@@ -162,7 +191,7 @@ class Pipeline:
             entity_synonym = normalize_str(specified_organism_synonym)
             entity_id = specified_organism_tax_id
             try:
-                with self.er_service.lmdb.begin(SPECIES_LMDB) as txn:
+                with self.er_service.lmdb.begin(dbname=SPECIES_LMDB) as txn:
                     entity_category = json.loads(
                         txn.get(entity_synonym.encode('utf-8')))['category']
             except (KeyError, TypeError, Exception):
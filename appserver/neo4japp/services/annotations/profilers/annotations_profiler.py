@@ -1,17 +1,12 @@
-import contextlib
-import cProfile
-import io
-import pstats
 import os
 import requests
 import json
 
-from datetime import datetime
-
 from neo4japp.database import db
 from neo4japp.factory import create_app
 from neo4japp.models import Files
 from neo4japp.services.annotations.constants import DEFAULT_ANNOTATION_CONFIGS
+from neo4japp.services.annotations.metrics import profiled, registry
 from neo4japp.services.annotations.pipeline import Pipeline
 from neo4japp.services.annotations.initializer import (
     get_annotation_db_service,
@@ -31,30 +26,6 @@ ORGANISM_SYNONYM = ''
 ORGANISM_TAX_ID = ''
 
 
-@contextlib.contextmanager
-def cprofiled():
-    """Used to generate cProfile report of function calls.
-    """
-    pr = cProfile.Profile()
-    pr.enable()
-    yield
-    pr.disable()
-    s = io.StringIO()
-
-    try:
-        log_path = os.path.join(directory, 'results')
-        os.makedirs(log_path)
-    except FileExistsError:
-        pass
-    file_name = f'{log_path}/{datetime.now().isoformat()}-annotations.dmp'
-    # ps = pstats.Stats(pr, stream=s).sort_stats('cumulative')
-    ps = pstats.Stats(pr, stream=s).dump_stats(file_name)
-    # ps.print_stats()
-    # uncomment this to see who's calling what
-    # ps.print_callers()
-    # print(s.getvalue())
-
-
 def main():
     app = create_app('Functional Test Flask App', config='config.Testing')
     with app.app_context():
@@ -83,7 +54,7 @@ def main():
             hash_id = json.loads(upload_req.text)['result']['hashId']
 
         f = db.session.query(Files).filter(Files.hash_id == hash_id).one()
-        with cprofiled():
+        with profiled(os.path.join(directory, 'results'), 'annotations'):
             text, parsed = Pipeline.parse(
               f.mime_type, file_id=f.id,
               exclude_references=DEFAULT_ANNOTATION_CONFIGS['exclude_references'])
@@ -110,6 +81,8 @@ def main():
                 custom_annotations=f.custom_annotations or [],
                 filename=f.filename)
 
+        print(registry.to_prometheus())
+
 
 if __name__ == '__main__':
     main()
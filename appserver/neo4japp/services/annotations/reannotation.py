@@ -0,0 +1,254 @@
+"""Batch reannotation of the annotated files, used by the `reannotate` command.
+
+The files are annotated in place by worker processes instead of through the
+HTTP API. Each worker creates the app once and annotates many files, so its
+LMDB environments, cached globals and graph driver stay warm between files.
+
+Every annotated file is appended to a checkpoint file, so an interrupted run
+can be resumed without annotating the same files again.
+"""
+import multiprocessing as mp
+import os
+import queue
+import time
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from flask import current_app
+from sqlalchemy import and_
+
+from .annotation_summary import refresh_file_annotation_summaries
+from .metrics import get_stage_seconds
+from .utils.nlp import set_nlp_throttle
+
+from neo4japp.constants import (
+    FILE_MIME_TYPE_ENRICHMENT_TABLE,
+    FILE_MIME_TYPE_PDF,
+    LogEventType
+)
+from neo4japp.database import db
+from neo4japp.models import FallbackOrganism, Files
+from neo4japp.models.files import FileAnnotationsVersion
+from neo4japp.utils.logger import EventLog
+
+
+# seconds between progress reports
+REPORT_INTERVAL = 30
+
+
+class ReannotationProgress:
+    """Keeps track of the throughput of a reannotation run."""
+    def __init__(self, total: int):
+        self.total = total
+        self.annotated = 0
+        self.failed = 0
+        self.stage_timings: Dict[str, float] = {}
+        self.start = time.time()
+
+    def add(self, success: bool, stage_timings: Dict[str, float]):
+        if success:
+            self.annotated += 1
+        else:
+            self.failed += 1
+        for stage, elapsed in stage_timings.items():
+            self.stage_timings[stage] = self.stage_timings.get(stage, 0) + elapsed
+
+    @property
+    def done(self) -> int:
+        return self.annotated + self.failed
+
+    def report(self) -> str:
+        minutes = (time.time() - self.start) / 60
+        rate = self.done / minutes if minutes else 0
+        stages = ', '.join(
+            f'{stage} {elapsed / self.done:.2f}s'
+            for stage, elapsed in sorted(self.stage_timings.items())
+        ) if self.done else ''
+        return f'Reannotated {self.done}/{self.total} files ({self.failed} failed), ' \
+            f'{rate:.1f} files/min. Average per file: {stages or "n/a"}'
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    """Returns the hash ids of the files a previous run already annotated."""
+    try:
+        with open(path) as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def get_files_to_reannotate() -> List[Tuple[int, str]]:
+    # like the API based command, only the files with a fallback organism
+    query = db.session.query(
+        Files.id,
+        Files.hash_id
+    ).join(
+        FallbackOrganism,
+        FallbackOrganism.id == Files.fallback_organism_id
+    ).filter(
+        and_(
+            Files.mime_type.in_([FILE_MIME_TYPE_PDF, FILE_MIME_TYPE_ENRICHMENT_TABLE]),
+            Files.deletion_date.is_(None),
+            and_(
+                Files.annotations.isnot(None),
+                Files.annotations != '[]'
+            )
+        )
+    ).order_by(Files.id)
+    return [(file_id, hash_id) for file_id, hash_id in query]
+
+
+def _annotate_file(view, file_id: int, user_id: int) -> Tuple[bool, str]:
+    file = db.session.query(Files).filter(
+        Files.id == file_id,
+        Files.deletion_date.is_(None)
+    ).one_or_none()
+    if file is None:
+        return False, 'The file no longer exists.'
+
+    try:
+        result, update, version = view._annotate_file(
+            file=file,
+            override_organism=None,
+            override_annotation_configs=None,
+            user_id=user_id
+        )
+        if update is not None:
+            db.session.bulk_insert_mappings(FileAnnotationsVersion, [version])
+            db.session.bulk_update_mappings(Files, [update])
+            refresh_file_annotation_summaries(db.session, [file.id])
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return False, str(e)
+    finally:
+        db.session.close()
+    return result['success'], result['error']
+
+
+def _reannotate_worker(
+    config: str,
+    user_id: int,
+    nlp_throttle,
+    tasks: mp.Queue,
+    results: mp.Queue
+):
+    # imported here since the blueprints import this package
+    from neo4japp.blueprints.annotations import FileAnnotationsGenerationView
+    from neo4japp.factory import create_app
+
+    app = create_app(config=config)
+    set_nlp_throttle(nlp_throttle)
+    view = FileAnnotationsGenerationView()
+
+    with app.app_context():
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            file_id, hash_id = task
+            before = get_stage_seconds()
+            success, error = _annotate_file(view, file_id, user_id)
+            stage_timings = {
+                stage: elapsed - before.get(stage, 0)
+                for stage, elapsed in get_stage_seconds().items()
+                if elapsed != before.get(stage, 0)
+            }
+            if not success:
+                current_app.logger.error(
+                    f'Could not reannotate file {hash_id}: {error}',
+                    extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+                )
+            results.put((hash_id, success, stage_timings))
+
+
+def reannotate_files(
+    user_id: int,
+    config: str,
+    processes: int,
+    nlp_concurrency: int,
+    checkpoint: Optional[str] = None
+) -> ReannotationProgress:
+    """Reannotate the annotated files with a fallback organism, with `processes` workers.
+
+    :param user_id: the user the new annotation versions are attributed to
+    :param config: the app config the workers are created with
+    :param nlp_concurrency: how many documents the workers can send to
+        the NLP service at once
+    :param checkpoint: file that keeps the hash ids of the annotated files,
+        files in it are skipped
+    """
+    completed = read_checkpoint(checkpoint) if checkpoint else set()
+    files = [(file_id, hash_id) for file_id, hash_id in get_files_to_reannotate()
+             if hash_id not in completed]
+    # the workers use their own connections
+    db.session.close()
+
+    current_app.logger.info(
+        f'Reannotating {len(files)} files, {len(completed)} already done.',
+        extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+    )
+    progress = ReannotationProgress(len(files))
+    if not files:
+        return progress
+
+    # spawn so the workers do not inherit the database connections
+    ctx = mp.get_context('spawn')
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    nlp_throttle = ctx.BoundedSemaphore(nlp_concurrency)
+
+    for task in files:
+        tasks.put(task)
+
+    workers = [
+        ctx.Process(
+            target=_reannotate_worker,
+            args=(config, user_id, nlp_throttle, tasks, results))
+        for _ in range(min(processes, len(files)))
+    ]
+    for worker in workers:
+        tasks.put(None)
+        worker.start()
+
+    last_report = time.time()
+    checkpoint_file = open(checkpoint, 'a') if checkpoint else None
+    try:
+        while progress.done < len(files):
+            try:
+                hash_id, success, stage_timings = results.get(timeout=REPORT_INTERVAL)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    current_app.logger.error(
+                        'The reannotate workers exited before all files were annotated.',
+                        extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+                    )
+                    break
+            else:
+                progress.add(success, stage_timings)
+                if success and checkpoint_file:
+                    checkpoint_file.write(f'{hash_id}\n')
+                    checkpoint_file.flush()
+                    os.fsync(checkpoint_file.fileno())
+
+            if time.time() - last_report >= REPORT_INTERVAL:
+                last_report = time.time()
+                current_app.logger.info(
+                    progress.report(),
+                    extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+                )
+    finally:
+        if checkpoint_file:
+            checkpoint_file.close()
+        for worker in workers:
+            # interrupted, the checkpoint has what was done so far
+            if progress.done < len(files):
+                worker.terminate()
+            worker.join()
+
+    current_app.logger.info(
+        progress.report(),
+        extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+    )
+    return progress
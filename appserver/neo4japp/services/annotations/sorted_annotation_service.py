@@ -3,8 +3,15 @@ from typing import Dict, Tuple, Union, TypedDict, List
 import numpy as np
 from neo4japp.models import Files
 from neo4japp.services.annotations import ManualAnnotationService
+from neo4japp.services.annotations.annotation_summary import (
+    count_enrichment_genes,
+    count_entities,
+    count_entities_per_file,
+    get_file_annotation_summaries,
+    to_annotation
+)
 from pandas import DataFrame, MultiIndex
-from scipy.stats import mannwhitneyu
+from scipy.stats import mannwhitneyu, norm
 import pandas as pd
 
 
@@ -23,7 +30,6 @@ class SortedAnnotationResult(TypedDict):
 
 
 SortedAnnotationResults = Dict[str, SortedAnnotationResult]
-FileAnnotationTable = List[Tuple[str, str]]
 AnnotationLookupTable = Dict[str, Annotation]
 # endregion
 
@@ -37,16 +43,16 @@ class SortedAnnotation:
     ) -> None:
         self.annotation_service = annotation_service
 
-    def get_annotations_per_file(self, files) -> Tuple[FileAnnotationTable, AnnotationLookupTable]:
-        files_annotations: FileAnnotationTable = []
-        key_map: AnnotationLookupTable = {}
-        for file in files:
-            annotations = self.annotation_service.get_file_annotations(file)
-            for annotation in annotations:
-                key = annotation['meta']['id']
-                key_map[key] = annotation
-                files_annotations.append((file.hash_id, key))
-        return files_annotations, key_map
+    def get_annotation_counts(self, files) -> Tuple[DataFrame, Dict[str, dict]]:
+        """Returns the number of annotations per (file_id, entity_id),
+        and the first annotation of every entity."""
+        summaries = get_file_annotation_summaries(files)
+        # the annotation fields used by the exports, see to_annotation
+        key_map: Dict[str, dict] = {
+            key: to_annotation(key, entity)
+            for key, entity in count_entities(summaries).iterrows()
+        }
+        return count_entities_per_file(summaries), key_map
 
     def get_annotations(self, project_id: List[Files]) -> SortedAnnotationResults:
         raise NotImplemented
@@ -56,14 +62,10 @@ class SumLogCountSA(SortedAnnotation):
     id = 'sum_log_count'
 
     def get_annotations(self, files):
-        files_annotations, key_map = self.get_annotations_per_file(files)
-        df = DataFrame(
-                files_annotations,
-                columns=['file_id', 'key']
-        )
-        gdf = df.groupby(["key", "file_id"])
+        counts, key_map = self.get_annotation_counts(files)
+        values = np.log(counts['count']).groupby(counts['entity_id'], sort=False).sum()
         distinct_annotations = dict()
-        for key, value in np.log(gdf.size()).sum(level="key").items():
+        for key, value in values.items():
             distinct_annotations[key] = {
                 'annotation': key_map[key],
                 'value': float(value)
@@ -77,55 +79,83 @@ class FrequencySA(SortedAnnotation):
     def get_annotations(self, files):
         distinct_annotations = dict()
 
-        for file in files:
-            annotations = self.annotation_service.get_file_annotations(file)
-            for annotation in annotations:
-                key = annotation['meta']['id']
-                if key in distinct_annotations:
-                    distinct_annotations[key]['value'] += 1
-                else:
-                    distinct_annotations[key] = {
-                        'annotation': annotation,
-                        'value': 1
-                    }
+        counts = count_entities(get_file_annotation_summaries(files))
+        for key, entity in counts.iterrows():
+            distinct_annotations[key] = {
+                'annotation': to_annotation(key, entity),
+                'value': int(entity['count'])
+            }
 
         return distinct_annotations
 
 
+def mann_whitney_u_greater(counts: DataFrame) -> pd.Series:
+    """-log p-values of the one-sided Mann-Whitney U test of every key, comparing
+    the counts of the key in each file to the counts of all the other keys.
+
+    `counts` has the non zero (file_id, key, count), the files x keys matrix is
+    never built. Every test ranks the same pooled counts (the whole matrix), so
+    the ranks, averaged over ties, are computed once from the distinct counts
+    and the rank sum of each key is a group by. Like scipy's `mannwhitneyu`,
+    the p-values use the normal approximation with tie and continuity
+    correction, unless there are no ties and one of the samples has at most
+    8 values, in which case scipy computes the exact p-values.
+    """
+    keys = counts['key'].unique()
+    n1 = counts['file_id'].nunique()
+    n2 = n1 * (len(keys) - 1)
+    n = n1 + n2
+    n_zeros = n - len(counts)
+    if not n2:
+        # a single key, nothing to compare it to
+        return pd.Series(np.nan, index=keys)
+
+    # the distinct pooled counts, with the number of times each appears
+    distinct, ties = np.unique(counts['count'].to_numpy(), return_counts=True)
+    distinct = np.concatenate([[0], distinct])
+    ties = np.concatenate([[n_zeros], ties])
+
+    if (n1 <= 8 or n2 <= 8) and ties.max() <= 1:
+        matrix = counts.pivot(index='file_id', columns='key', values='count') \
+            .reindex(columns=keys).fillna(0).to_numpy()
+        return pd.Series([
+            -np.log(mannwhitneyu(
+                matrix[:, i],
+                np.delete(matrix, i, axis=1).ravel(),
+                alternative='greater'
+            ).pvalue) for i in range(len(keys))
+        ], index=keys)
+
+    ends = np.cumsum(ties)
+    average_ranks = ends - (ties - 1) / 2
+    ranks = average_ranks[np.searchsorted(distinct, counts['count'].to_numpy())]
+
+    rank_sums = pd.Series(ranks).groupby(counts['key'].to_numpy(), sort=False).agg(['sum', 'size'])
+    rank_sums = rank_sums.reindex(keys)
+    # files without the key add the rank of zero
+    r1 = rank_sums['sum'] + (n1 - rank_sums['size']) * average_ranks[0]
+
+    u1 = r1 - n1 * (n1 + 1) / 2
+    mu = n1 * n2 / 2
+    tie_term = (ties.astype(float) ** 3 - ties).sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        z = (u1 - mu - 0.5) / sigma
+    return -pd.Series(norm.logsf(z), index=keys)
+
+
 class MannWhitneyUSA(SortedAnnotation):
     id = 'mwu'
 
     def get_annotations(self, files):
-        files_annotations, key_map = self.get_annotations_per_file(files)
+        counts, key_map = self.get_annotation_counts(files)
+        values = mann_whitney_u_greater(counts.rename(columns={'entity_id': 'key'}))
 
-        ds = DataFrame(
-                files_annotations,
-                columns=['file_id', 'key']
-        ) \
-            .groupby(['file_id', 'key']) \
-            .size()
-
-        # Calc before exploding the array
-        keys = ds.index.get_level_values('key')
-        unique_keys = keys.unique()
-        unique_file_ids = ds.index.get_level_values('file_id').unique()
-
-        idx = pd.MultiIndex.from_product([unique_file_ids, unique_keys], names=['file_id', 'key'])
-        ds = ds.reindex(idx, fill_value=0, copy=False)
-
-        key_index_values = idx.get_level_values('key')
         distinct_annotations = dict()
-        for key in unique_keys:
-            mask = key_index_values == key
+        for key, value in values.items():
             distinct_annotations[key] = {
                 'annotation': key_map[key],
-                'value': -np.log(
-                        mannwhitneyu(
-                                ds[mask],
-                                ds[~mask],
-                                alternative='greater'
-                        ).pvalue
-                )
+                'value': float(value)
             }
 
         return distinct_annotations
@@ -205,24 +235,15 @@ class CountPerRowUSA(SortedAnnotation):
     id = 'count_per_row'
 
     def get_annotations(self, files):
-        distinct_annotations = dict()
-        for file in files:
-            annotations = self.annotation_service.get_file_annotations(file)
-            filtered_annotations = filter(
-                    lambda d: d['enrichmentDomain'] != 'Imported',
-                    annotations
-            )
-            for annotation in filtered_annotations:
-                annotation_id = annotation['meta']['id']
-                distinct_annotation = distinct_annotations.get(annotation_id, {
-                    'annotation': annotation,
-                    'value': set()
-                })
-                distinct_annotation['value'].add(annotation['enrichmentGene'])
-                distinct_annotations[annotation_id] = distinct_annotation
+        summaries = get_file_annotation_summaries(files)
+        counts = count_entities(summaries)
 
-        for distinct_annotation in distinct_annotations.values():
-            distinct_annotation['value'] = len(distinct_annotation['value'])
+        distinct_annotations = dict()
+        for key, value in count_enrichment_genes(summaries).items():
+            distinct_annotations[key] = {
+                'annotation': to_annotation(key, counts.loc[key]),
+                'value': int(value)
+            }
 
         return distinct_annotations
 
@@ -0,0 +1,115 @@
+"""Combined synonym index.
+
+The recognition step normally runs one `getmulti` per entity type against
+ten separate LMDB environments. The synonym index merges every entity type
+into one LMDB keyed by normalized synonym, where each value is a JSON object
+of {dbname: [entity, ...]}, so all entity types are matched with a single
+lookup per document.
+
+The index is built offline from the same LMDB files (see the
+`build-synonym-index` command), and like the other LMDB files it is
+memory mapped read-only so the pages are shared by all workers.
+"""
+import heapq
+import json
+import lmdb
+import os
+import shutil
+
+from itertools import groupby
+from typing import Dict, Iterator, List, Tuple
+
+from .constants import SYNONYM_INDEX_LMDB
+from .lmdb_service import LMDBService
+
+
+# reserved key, normalized synonyms never start with a null byte
+SOURCES_KEY = b'\x00sources'
+
+
+def get_source_signatures(lmdb_service: LMDBService) -> Dict[str, List[int]]:
+    """Size and modified time of each LMDB the index is built from,
+    used to tell if the index is stale after a LMDB data refresh.
+    """
+    signatures = {}
+    for dbname, subdir in lmdb_service.configs.items():
+        if dbname == SYNONYM_INDEX_LMDB:
+            continue
+        stat = os.stat(os.path.join(lmdb_service.dirpath, subdir, 'data.mdb'))
+        signatures[dbname] = [stat.st_size, stat.st_mtime_ns]
+    return signatures
+
+
+def is_synonym_index_current(lmdb_service: LMDBService) -> bool:
+    subdir = lmdb_service.configs.get(SYNONYM_INDEX_LMDB)
+    if not subdir or not os.path.exists(
+            os.path.join(lmdb_service.dirpath, subdir, 'data.mdb')):
+        return False
+
+    try:
+        with lmdb_service.begin(dbname=SYNONYM_INDEX_LMDB, dupsort=False) as txn:
+            sources = txn.get(SOURCES_KEY)
+        return sources is not None and json.loads(sources) == get_source_signatures(lmdb_service)  # noqa
+    except Exception:
+        return False
+
+
+def _iterate_source(env, dbname: str) -> Iterator[Tuple[bytes, str, bytes]]:
+    db = env.open_db(key=dbname.encode('utf-8'), create=False, dupsort=True)
+    with env.begin(db=db) as txn:
+        for key, value in txn.cursor().iternext(keys=True, values=True):
+            yield key, dbname, value
+
+
+def build_synonym_index(lmdb_service: LMDBService):
+    """Merge every LMDB into the synonym index.
+
+    The source cursors are already sorted by key, so they are merged
+    in one pass and the index is written in append mode. Duplicate values
+    keep the same order `getmulti(dupdata=True)` returns them in.
+    """
+    signatures = get_source_signatures(lmdb_service)
+    index_path = os.path.join(lmdb_service.dirpath, lmdb_service.configs[SYNONYM_INDEX_LMDB])
+    build_path = f'{index_path}.build'
+    shutil.rmtree(build_path, ignore_errors=True)
+
+    sources = {
+        dbname: lmdb.open(
+            path=os.path.join(lmdb_service.dirpath, lmdb_service.configs[dbname]),
+            readonly=True, lock=False, max_dbs=2)
+        for dbname in signatures
+    }
+    map_size = sum(size for size, _ in signatures.values()) * 2 + 10485760
+    env = lmdb.open(path=build_path, map_size=map_size, max_dbs=2)
+    db = env.open_db(key=SYNONYM_INDEX_LMDB.encode('utf-8'), dupsort=False)
+
+    try:
+        merged = heapq.merge(
+            *[_iterate_source(source_env, dbname) for dbname, source_env in sources.items()],
+            key=lambda row: row[0])
+
+        def entries():
+            for key, rows in groupby(merged, key=lambda row: row[0]):
+                values: Dict[str, List[bytes]] = {}
+                for _, dbname, value in rows:
+                    values.setdefault(dbname, []).append(value)
+                # values are JSON already, so concatenate instead of
+                # decoding and encoding every entity again
+                yield key, b'{' + b','.join(
+                    json.dumps(dbname).encode('utf-8') + b':[' + b','.join(entities) + b']'
+                    for dbname, entities in values.items()
+                ) + b'}'
+
+        with env.begin(db=db, write=True) as txn:
+            txn.cursor().putmulti(entries(), append=True)
+            txn.put(SOURCES_KEY, json.dumps(signatures).encode('utf-8'))
+    finally:
+        env.close()
+        for source_env in sources.values():
+            source_env.close()
+
+    # swap in the new data file, the pooled environments reopen
+    # since the file signature changes
+    os.makedirs(index_path, exist_ok=True)
+    os.replace(os.path.join(build_path, 'data.mdb'), os.path.join(index_path, 'data.mdb'))
+    shutil.rmtree(build_path, ignore_errors=True)
@@ -12,6 +12,9 @@ from .constants import (
 from .data_transfer_objects import PDFWord
 
 
+NORMALIZE_TRANSLATION = str.maketrans('', '', punctuation + whitespace)
+
+
 class Tokenizer:
     def __init__(self) -> None:
         self.abbreviations: Set[str] = set()
@@ -62,134 +65,128 @@ class Tokenizer:
             return True
         return False
 
-    def _create(self, words: List[PDFWord]) -> List[PDFWord]:
-        prev_token = None
-        new_tokens = []
-
-        for word in words:
-            if prev_token is None:
-                # copied from def normalize_str
-                # to avoid function calls, ~7-10 sec faster
-                normalized = word.keyword.lower()
-                normalized = normalized.translate(str.maketrans('', '', punctuation))
-                normalized_keyword = normalized.translate(str.maketrans('', '', whitespace))
-                new_token = PDFWord(
-                    keyword=word.keyword,
-                    normalized_keyword=normalized_keyword,
-                    page_number=word.page_number,
-                    lo_location_offset=word.lo_location_offset,
-                    hi_location_offset=word.hi_location_offset,
-                    coordinates=word.coordinates,
-                    heights=word.heights,
-                    widths=word.widths,
-                    previous_words=word.previous_words
-                )
-                new_tokens.append(new_token)
-                prev_token = new_token
-            else:
-                words_subset = [prev_token, word]
-                curr_keyword = ' '.join([word.keyword for word in words_subset])
-                coordinates = []
-                heights = []
-                widths = []
-
-                start_lower_x = 0.0
-                start_lower_y = 0.0
-                end_upper_x = 0.0
-                end_upper_y = 0.0
-                prev_height = 0.0
-                for word in words_subset:
-                    # when combining sequential words
-                    # need to merge their coordinates together
-                    # while also keeping in mind words on new lines
-                    for j, coords in enumerate(word.coordinates):
-                        lower_x, lower_y, upper_x, upper_y = coords
-
-                        if (start_lower_x == 0.0 and
-                                start_lower_y == 0.0 and
-                                end_upper_x == 0.0 and
-                                end_upper_y == 0.0):
+    def _is_removable(self, token: PDFWord) -> bool:
+        # remove any keywords that fit the removal
+        # criteria, e.g common words, digits, ascii_letters etc
+        # this is done after the n-grams are merged
+        # because a term could start with them
+        # had we removed earlier, then some terms may possibly
+        # have been missed
+        return bool(
+            token.keyword.lower() in COMMON_WORDS or
+            self.token_word_check_regex.match(token.keyword) or
+            token.keyword in ascii_letters or
+            token.keyword in digits or
+            len(token.normalized_keyword) <= 2 or
+            self._is_abbrev(token)
+        )
+
+    def _merge_coordinates(
+        self,
+        prev_coordinates: List[List[float]],
+        prev_heights: List[float],
+        word: PDFWord
+    ) -> List[List[float]]:
+        """Merge the coordinates of the previous n-gram with the next word,
+        while also keeping in mind words on new lines.
+        """
+        coordinates = []
+        start_lower_x = 0.0
+        start_lower_y = 0.0
+        end_upper_x = 0.0
+        end_upper_y = 0.0
+        prev_height = 0.0
+
+        for coords_list, heights in [
+            (prev_coordinates, prev_heights),
+            (word.coordinates, word.heights)
+        ]:
+            for j, coords in enumerate(coords_list):
+                lower_x, lower_y, upper_x, upper_y = coords
+
+                if (start_lower_x == 0.0 and
+                        start_lower_y == 0.0 and
+                        end_upper_x == 0.0 and
+                        end_upper_y == 0.0):
+                    start_lower_x = lower_x
+                    start_lower_y = lower_y
+                    end_upper_x = upper_x
+                    end_upper_y = upper_y
+                    prev_height = heights[j]
+                else:
+                    if lower_y != start_lower_y:
+                        diff = abs(lower_y - start_lower_y)
+
+                        # if diff is greater than height ratio
+                        # then part of keyword is on a new line
+                        if diff > prev_height * PDF_NEW_LINE_THRESHOLD:
+                            coordinates.append(
+                                [start_lower_x, start_lower_y, end_upper_x, end_upper_y])
+
                             start_lower_x = lower_x
                             start_lower_y = lower_y
                             end_upper_x = upper_x
                             end_upper_y = upper_y
-                            prev_height = word.heights[j]
+                            prev_height = heights[j]
                         else:
-                            if lower_y != start_lower_y:
-                                diff = abs(lower_y - start_lower_y)
-
-                                # if diff is greater than height ratio
-                                # then part of keyword is on a new line
-                                if diff > prev_height * PDF_NEW_LINE_THRESHOLD:
-                                    coordinates.append(
-                                        [start_lower_x, start_lower_y, end_upper_x, end_upper_y])
-
-                                    start_lower_x = lower_x
-                                    start_lower_y = lower_y
-                                    end_upper_x = upper_x
-                                    end_upper_y = upper_y
-                                    prev_height = word.heights[j]
-                                else:
-                                    if upper_y > end_upper_y:
-                                        end_upper_y = upper_y
-
-                                    if upper_x > end_upper_x:
-                                        end_upper_x = upper_x
-                            else:
-                                if upper_y > end_upper_y:
-                                    end_upper_y = upper_y
-
-                                if upper_x > end_upper_x:
-                                    end_upper_x = upper_x
-
-                    heights += word.heights
-                    widths += word.widths
-                coordinates.append([start_lower_x, start_lower_y, end_upper_x, end_upper_y])
-
-                # copied from def normalize_str
-                # to avoid function calls, ~7-10 sec faster
-                normalized = curr_keyword.lower()
-                normalized = normalized.translate(str.maketrans('', '', punctuation))
-                normalized_keyword = normalized.translate(str.maketrans('', '', whitespace))
-                new_token = PDFWord(
-                    keyword=curr_keyword,
+                            if upper_y > end_upper_y:
+                                end_upper_y = upper_y
+
+                            if upper_x > end_upper_x:
+                                end_upper_x = upper_x
+                    else:
+                        if upper_y > end_upper_y:
+                            end_upper_y = upper_y
+
+                        if upper_x > end_upper_x:
+                            end_upper_x = upper_x
+        coordinates.append([start_lower_x, start_lower_y, end_upper_x, end_upper_y])
+        return coordinates
+
+    def create(self, words: List[PDFWord]) -> List[PDFWord]:
+        """Create the n-grams (up to MAX_ENTITY_WORD_LENGTH words) starting at
+        every word in the document.
+
+        Each n-gram is built from the previous one, e.g the keyword,
+        normalized keyword and coordinates of "a b c" extend those of "a b",
+        and every word is only normalized once.
+        """
+        # copied from def normalize_str
+        # to avoid function calls, ~7-10 sec faster
+        normalized_words = [
+            word.keyword.lower().translate(NORMALIZE_TRANSLATION) for word in words]
+
+        tokens = []
+        for idx, first in enumerate(words):
+            keyword = first.keyword
+            normalized_keyword = normalized_words[idx]
+            coordinates = first.coordinates
+            heights = first.heights
+            widths = first.widths
+
+            for offset in range(idx, min(idx + MAX_ENTITY_WORD_LENGTH, len(words))):
+                word = words[offset]
+                if offset != idx:
+                    keyword = f'{keyword} {word.keyword}'
+                    normalized_keyword += normalized_words[offset]
+                    coordinates = self._merge_coordinates(coordinates, heights, word)
+                    heights = heights + word.heights
+                    widths = widths + word.widths
+
+                token = PDFWord(
+                    keyword=keyword,
                     normalized_keyword=normalized_keyword,
                     # take the page of the first word
                     # if multi-word, consider it as part
                     # of page of first word
-                    page_number=words_subset[0].page_number,
-                    lo_location_offset=words_subset[0].lo_location_offset,
-                    hi_location_offset=words_subset[-1].hi_location_offset,
+                    page_number=first.page_number,
+                    lo_location_offset=first.lo_location_offset,
+                    hi_location_offset=word.hi_location_offset,
                     coordinates=coordinates,
                     heights=heights,
                     widths=widths,
-                    previous_words=words_subset[0].previous_words,
+                    previous_words=first.previous_words
                 )
-
-                new_tokens.append(new_token)
-                prev_token = new_token
-
-        # remove any keywords that fit the removal
-        # criteria at the end here, e.g common words, digits, ascii_letters etc
-        # because a term could start with them
-        # had we removed earlier, then some terms may possibly
-        # have been missed
-        tokens_to_use = []
-        for token in new_tokens:
-            if (token.keyword.lower() in COMMON_WORDS or
-                self.token_word_check_regex.match(token.keyword) or
-                token.keyword in ascii_letters or
-                token.keyword in digits or
-                len(token.normalized_keyword) <= 2 or
-                self._is_abbrev(token)
-            ):  # noqa
-                continue
-            else:
-                tokens_to_use.append(token)
-        return tokens_to_use
-
-    def create(self, words: List[PDFWord]) -> List[PDFWord]:
-        return [
-            current_token for idx, token in enumerate(words)
-                for current_token in self._create(
-                    words[idx:MAX_ENTITY_WORD_LENGTH + idx])]  # noqa
+                if not self._is_removable(token):
+                    tokens.append(token)
+        return tokens
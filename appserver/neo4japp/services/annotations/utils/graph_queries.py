@@ -49,10 +49,10 @@ def get_organisms_from_gene_ids_query():
 
 def get_gene_to_organism_query():
     return """
-    MATCH (s:Synonym)-[]-(g:Gene)
-    WHERE s.name IN $genes
-    WITH s, g MATCH (g)-[:HAS_TAXONOMY]-(t:Taxonomy)-[:HAS_PARENT*0..2]->(p:Taxonomy)
-    WHERE p.eid IN $organisms
+    UNWIND $synonyms AS row
+    MATCH (s:Synonym {name: row.synonym})-[]-(g:Gene)
+    WITH s, g, row MATCH (g)-[:HAS_TAXONOMY]-(t:Taxonomy)-[:HAS_PARENT*0..2]->(p:Taxonomy)
+    WHERE p.eid IN row.organisms
     RETURN g.name AS gene_name, s.name AS gene_synonym, g.eid AS gene_id,
         p.eid AS organism_id, g.data_source AS data_source
     """
@@ -60,10 +60,10 @@ def get_gene_to_organism_query():
 
 def get_protein_to_organism_query():
     return """
-    MATCH (s:Synonym)-[]-(g:db_UniProt)
-    WHERE s.name IN $proteins
-    WITH s, g MATCH (g)-[:HAS_TAXONOMY]-(t:Taxonomy)-[:HAS_PARENT*0..2]->(p:Taxonomy)
-    WHERE p.eid IN $organisms
+    UNWIND $synonyms AS row
+    MATCH (s:Synonym {name: row.synonym})-[]-(g:db_UniProt)
+    WITH s, g, row MATCH (g)-[:HAS_TAXONOMY]-(t:Taxonomy)-[:HAS_PARENT*0..2]->(p:Taxonomy)
+    WHERE p.eid IN row.organisms
     RETURN s.name AS protein, collect(g.eid) AS protein_ids, p.eid AS organism_id
     """
 
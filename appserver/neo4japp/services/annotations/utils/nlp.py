@@ -1,46 +1,147 @@
+import hashlib
 import json
-import multiprocessing as mp
 import os
 import requests
 
-from typing import Dict, Set
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from flask import current_app
+from redis.exceptions import RedisError
+from requests.adapters import HTTPAdapter
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
 
-from ..constants import NLP_URL, REQUEST_TIMEOUT, EntityType
+from ..constants import (
+    NLP_CACHE_EXPIRATION,
+    NLP_CHUNK_SIZE,
+    NLP_MAX_WORKERS,
+    NLP_URL,
+    REQUEST_TIMEOUT,
+    EntityType
+)
 from ..data_transfer_objects import NLPResults
 
-from neo4japp.exceptions import ServerException
+from neo4japp.constants import LogEventType
+from neo4japp.services.rcache import redis_server
+from neo4japp.utils.logger import EventLog
 
 
-def call_nlp_service(model: str, text: str) -> dict:
-    try:
-        req = requests.post(
-            NLP_URL,
-            data=json.dumps({'model': model, 'sentence': text}),
-            headers={
+NLP_CACHE_KEY_PREFIX = 'nlp'
+
+# optional semaphore that bounds how many documents are sent
+# to the NLP service at once, shared by the reannotate workers
+_throttle = None
+
+# the session and executor are created once per process, so the
+# connections to the NLP service are kept alive between documents
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pid: Optional[int] = None
+_lock = Lock()
+
+
+def set_nlp_throttle(semaphore):
+    global _throttle
+    _throttle = semaphore
+
+
+def _get_client() -> Tuple[requests.Session, ThreadPoolExecutor]:
+    global _session, _executor, _pid
+    with _lock:
+        # a forked worker cannot use the connections or threads of its parent
+        if _pid != os.getpid():
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_maxsize=NLP_MAX_WORKERS))
+            session.mount('https://', HTTPAdapter(pool_maxsize=NLP_MAX_WORKERS))
+            session.headers.update({
                 'Content-type': 'application/json',
-                'secret': os.environ.get('NLP_SECRET')},
-            timeout=REQUEST_TIMEOUT)
-
-        resp = req.json()
-        req.close()
-    except requests.exceptions.ConnectTimeout:
-        raise ServerException(
-            'Service Error',
-            'The request timed out while trying to connect to the NLP service.')
-    except requests.exceptions.Timeout:
-        raise ServerException(
-            'Service Error',
-            'The request to the NLP service timed out.')
-    except (requests.exceptions.RequestException, Exception):
-        raise ServerException(
-            'Service Error',
-            'An unexpected error occurred with the NLP service.')
+                'secret': os.environ.get('NLP_SECRET', '')})
+            _session = session
+            _executor = ThreadPoolExecutor(
+                max_workers=NLP_MAX_WORKERS, thread_name_prefix='nlp')
+            _pid = os.getpid()
+        return _session, _executor  # type: ignore
+
+
+def split_text(text: str, chunk_size: int = NLP_CHUNK_SIZE) -> List[Tuple[int, str]]:
+    """Split the text into chunks of at most `chunk_size` characters,
+    ending at a sentence or line break where possible.
+
+    Returns (offset of the chunk in text, chunk) pairs.
+    """
+    chunks = []
+    offset = 0
+    while len(text) - offset > chunk_size:
+        end = offset + chunk_size
+        split = max(text.rfind('. ', offset, end), text.rfind('\n', offset, end))
+        if split == -1:
+            split = text.rfind(' ', offset, end)
+        # keep the separator in the chunk it ends
+        split = end if split == -1 else split + 1
+        chunks.append((offset, text[offset:split]))
+        offset = split
+    chunks.append((offset, text[offset:]))
+    return chunks
+
+
+def _post(model: str, text: str) -> dict:
+    session, _ = _get_client()
+    with session.post(
+        NLP_URL,
+        data=json.dumps({'model': model, 'sentence': text}),
+        timeout=REQUEST_TIMEOUT
+    ) as resp:
+        resp.raise_for_status()
+        return resp.json()
+
+
+def _get_cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return f'{NLP_CACHE_KEY_PREFIX}:{model}:{digest}'
+
+
+def _is_well_formed(resp) -> bool:
+    return isinstance(resp, dict) and isinstance(resp.get('results'), list) and all(
+        isinstance(results, dict) and 'model' in results and
+        isinstance(results.get('annotations'), list)
+        for results in resp['results'])
+
+
+def _get_cached_results(model: str, text: str) -> dict:
+    """Results of the NLP service for the text, the same text is
+    only sent once per model until the cache expires.
+
+    Only well-formed results are cached, an error of the NLP service
+    raises and is sent again the next time."""
+    key = _get_cache_key(model, text)
+    try:
+        cached = redis_server.get(key)
+    except RedisError:
+        cached = None
+    if cached:
+        resp = json.loads(cached)
+        if _is_well_formed(resp):
+            return resp
+
+    resp = _post(model, text)
+    if not _is_well_formed(resp):
+        raise ValueError(f'Malformed response of the NLP service for model {model}')
+    try:
+        redis_server.set(key, json.dumps(resp), ex=NLP_CACHE_EXPIRATION)
+    except RedisError:
+        pass
     return resp
 
 
 def predict(text: str, entities: Set[str]):
     """Makes a call to the NLP service.
     Returns the set of entity types in which the token was found.
+
+    Long texts are split into chunks, and every chunk is sent for every
+    model concurrently, each request with its own timeout. If a request
+    of a model fails or times out, none of the results of the model are
+    used: partial results would veto the LMDB matches in the chunks that
+    failed, so the annotation continues with the LMDB results only.
     """
     if not entities:
         return NLPResults()
@@ -73,29 +174,49 @@ def predict(text: str, entities: Set[str]):
         EntityType.SPECIES.value: set()
     }
 
-    models = []
-    # start = time.time()
     if all([model in entities for model in nlp_models]):
-        req = call_nlp_service(model='all', text=text)
-        models = [req]
+        models = ['all']
     else:
-        with mp.Pool(processes=4) as pool:
-            models = pool.starmap(
-                call_nlp_service, [(
-                    nlp_models[model],
-                    text
-                ) for model in entities if nlp_models.get(model, None)])
-
-    # current_app.logger.info(
-    #     f'Total NLP time {time.time() - start}',
-    #     extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
-    # )
-
-    for model in models:
-        for results in model['results']:
-            for token in results['annotations']:
-                token_offset = (token['start_pos'], token['end_pos']-1)
-                entity_results[nlp_model_types[results['model']]].add(token_offset)
+        models = [nlp_models[model] for model in entities if nlp_models.get(model, None)]
+
+    _, executor = _get_client()
+    with _throttle or nullcontext():
+        futures = {
+            executor.submit(_get_cached_results, model, chunk): (model, offset)
+            for offset, chunk in split_text(text, NLP_CHUNK_SIZE) for model in models
+        }
+        # every request times out on its own, see _post
+        wait(futures)
+
+    model_results: Dict[str, List[Tuple[str, Tuple[int, int]]]] = {model: [] for model in models}
+    failed: Dict[str, Exception] = {}
+    for future, (model, offset) in futures.items():
+        try:
+            resp = future.result()
+            model_results[model].extend(
+                (
+                    nlp_model_types[results['model']],
+                    (offset + token['start_pos'], offset + token['end_pos'] - 1)
+                )
+                for results in resp['results'] for token in results['annotations']
+            )
+        except Exception as e:
+            error = e
+            failed.setdefault(model, error)
+
+    for model, error in failed.items():
+        current_app.logger.warning(
+            f'A request to the NLP service failed for model {model}, '
+            'continuing without the results of the model.',
+            exc_info=error,
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict()
+        )
+
+    for model, tokens in model_results.items():
+        if model in failed:
+            continue
+        for entity_type, token_offset in tokens:
+            entity_results[entity_type].add(token_offset)
 
     return NLPResults(
         anatomy=entity_results[EntityType.ANATOMY.value],
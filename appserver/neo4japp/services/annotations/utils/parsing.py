@@ -3,7 +3,9 @@ from typing import List, Tuple
 
 import requests
 from neo4japp.constants import FILE_MIME_TYPE_PDF
+from neo4japp.database import db
 from neo4japp.exceptions import ServerException
+from neo4japp.models import Files, FileContent
 
 from ....constants import APPSERVER_URL
 from ..constants import (
@@ -12,6 +14,7 @@ from ..constants import (
     REQUEST_TIMEOUT
 )
 from ..data_transfer_objects import PDFWord
+from ..parsed_content_cache import get_parsed_content, set_parsed_content
 
 
 def process_parsed_content(resp: dict) -> Tuple[str, List[PDFWord]]:
@@ -67,7 +70,21 @@ def parse_content(content_type=FILE_MIME_TYPE_PDF, **kwargs) -> Tuple[str, List[
             'fileUrl': f'{APPSERVER_URL}/annotations/files/{file_id}',
             'excludeReferences': exclude_references
         }
+
+        checksum = db.session.query(
+            FileContent.checksum_sha256
+        ).join(
+            Files,
+            Files.content_id == FileContent.id
+        ).filter(
+            Files.id == file_id
+        ).scalar()
+        if checksum is not None:
+            cached = get_parsed_content(checksum, exclude_references)
+            if cached is not None:
+                return cached
     else:
+        checksum = None
         data = {'text': kwargs['text']}
 
     try:
@@ -87,4 +104,7 @@ def parse_content(content_type=FILE_MIME_TYPE_PDF, **kwargs) -> Tuple[str, List[
             'Parsing Error',
             'An unexpected error occurred with the parsing service.')
 
-    return process_parsed_content(resp)
+    pdf_text, parsed = process_parsed_content(resp)
+    if checksum is not None:
+        set_parsed_content(checksum, exclude_references, pdf_text, parsed)
+    return pdf_text, parsed
@@ -0,0 +1,58 @@
+from bisect import bisect_left
+from math import inf
+from typing import Dict, List, Tuple
+
+
+class ProximityIndex:
+    """Nearest location lookups for the (lo, hi) offsets of each entity
+    in a document, e.g the organisms genes and proteins are paired with.
+
+    The distance between an entity and a location is
+        entity lo - location hi     if the location ends before the entity starts
+        location lo - entity hi     otherwise (negative if they overlap)
+    and the lookups return the minimum distance over the locations of an entity
+    in O(log n), the same as checking every location.
+    """
+    def __init__(self, locations: Dict[str, List[Tuple[int, int]]]):
+        # {id: locations sorted by (lo, hi)}
+        self.positions: Dict[str, List[Tuple[int, int]]] = {}
+        # {id: hi offsets sorted}
+        self.his: Dict[str, List[int]] = {}
+        # {id: min lo of the locations from the i-th smallest hi onwards}
+        self.suffix_min_los: Dict[str, List[float]] = {}
+
+        for key, offsets in locations.items():
+            self.positions[key] = sorted(offsets)
+            by_hi = sorted(offsets, key=lambda offset: offset[1])
+            suffix_min_los: List[float] = [inf] * (len(by_hi) + 1)
+            for i in range(len(by_hi) - 1, -1, -1):
+                suffix_min_los[i] = min(by_hi[i][0], suffix_min_los[i + 1])
+            self.his[key] = [hi for _, hi in by_hi]
+            self.suffix_min_los[key] = suffix_min_los
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.positions
+
+    def closest_distance(self, key: str, lo: int, hi: int, above_only: bool = False) -> float:
+        """Minimum distance from (lo, hi) to a location of `key`, inf if there are none.
+
+        :param above_only: only consider the locations before (lo, hi)
+        """
+        his = self.his[key]
+        # locations ending before the entity starts, the closest ends last
+        idx = bisect_left(his, lo)
+        closest_before = lo - his[idx - 1] if idx else inf
+
+        # the rest start at or after the entity, or overlap it
+        min_lo = self.suffix_min_los[key][idx]
+        if above_only and min_lo >= lo:
+            # only locations at the same start offset that
+            # end before the entity are still above it
+            positions = self.positions[key]
+            if bisect_left(positions, (lo, lo)) < bisect_left(positions, (lo, hi)):
+                min_lo = lo
+            else:
+                min_lo = inf
+        closest_after = min_lo - hi
+
+        return min(closest_before, closest_after)
@@ -0,0 +1,49 @@
+"""Process-wide cache of the base URLs of the knowledge domains.
+
+The `domain_urls_map` table only changes with migrations and seeds, but was
+queried for every node of an expanded graph and for every enrichment table.
+The map is loaded once per process and reloaded after
+`DOMAIN_URLS_CACHE_TTL` seconds, or as soon as it is changed through the ORM
+by this process (see the DomainURLsMap event listeners).
+"""
+import time
+
+from threading import Lock
+from typing import Dict, Optional
+
+from flask import current_app
+
+from neo4japp.models.entity_resources import DomainURLsMap
+
+
+class DomainURLResolver:
+    def __init__(self):
+        self._url_map: Optional[Dict[str, str]] = None
+        self._expires = 0.0
+        self._lock = Lock()
+
+    def get_url_map(self, session) -> Dict[str, str]:
+        """Returns {domain: base URL}, shared, callers must not modify it."""
+        ttl = current_app.config.get('DOMAIN_URLS_CACHE_TTL', 300)
+        with self._lock:
+            if self._url_map is not None and time.monotonic() < self._expires:
+                return self._url_map
+
+        url_map = {
+            domain: base_url
+            for domain, base_url in session.query(
+                DomainURLsMap.domain,
+                DomainURLsMap.base_URL,
+            )
+        }
+        with self._lock:
+            self._url_map = url_map
+            self._expires = time.monotonic() + ttl
+        return url_map
+
+    def invalidate(self):
+        with self._lock:
+            self._url_map = None
+
+
+domain_url_resolver = DomainURLResolver()
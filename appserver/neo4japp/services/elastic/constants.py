@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from neo4japp.constants import FILE_INDEX_ID
 
@@ -15,9 +16,22 @@ ATTACHMENT_PIPELINE_DEFINITION_PATH = os.path.join(
 ELASTIC_INDEX_SEED_PAIRS = [
     (FILE_INDEX_ID, FILE_INDEX_DEFINITION_PATH),
 ]
+# Fields added to the file index mapping after indices were created with it. The elastic
+# indexer adds them to an existing index before it sends any document with them, otherwise
+# elastic maps them dynamically (e.g. a keyword as analysed text)
+FILE_INDEX_ADDED_FIELDS = ['principals']
 ELASTIC_PIPELINE_SEED_PAIRS = [
     (ATTACHMENT_PIPELINE_ID, ATTACHMENT_PIPELINE_DEFINITION_PATH),
 ]
 
+# number of files whose principals are looked up at once, see principals.py
+PRINCIPALS_BATCH_SIZE = 100
+
+# extracted indexable content is cached on local disk, see indexable_content_cache.py
+INDEXABLE_CONTENT_CACHE_DIR = os.getenv('INDEXABLE_CONTENT_CACHE_DIR', '').strip() or \
+                              os.path.join(tempfile.gettempdir(), 'lifelike-indexable-content')
+# in bytes, 0 disables the cache
+INDEXABLE_CONTENT_CACHE_SIZE = int(os.getenv('INDEXABLE_CONTENT_CACHE_SIZE', 1024 ** 3))
+
 # Search constants
 WILDCARD_MIN_LEN = 3
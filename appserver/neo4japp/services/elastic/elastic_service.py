@@ -5,24 +5,14 @@ from elasticsearch.helpers import parallel_bulk, streaming_bulk
 from flask import current_app
 from io import BytesIO
 import json
-
-from pyparsing import (
-    CaselessLiteral,
-    Optional,
-    ParserElement,
-    QuotedString,
-    Word,
-    ZeroOrMore,
-    infixNotation,
-    opAssoc,
-    printables,
-)
 from sqlalchemy import and_
 from sqlalchemy.orm import joinedload, raiseload
 from typing import (
     Any,
     Dict,
+    Iterable,
     List,
+    Optional,
 )
 
 from neo4japp.constants import FILE_INDEX_ID, LogEventType
@@ -36,24 +26,30 @@ from neo4japp.services.elastic import (
     ATTACHMENT_PIPELINE_ID,
     ELASTIC_INDEX_SEED_PAIRS,
     ELASTIC_PIPELINE_SEED_PAIRS,
+    PRINCIPALS_BATCH_SIZE,
 )
-from neo4japp.services.elastic.query_parser_helpers import (
-    BoolMust,
-    BoolMustNot,
-    BoolOperand,
-    BoolShould
+from neo4japp.services.elastic.indexable_content_cache import (
+    get_indexable_content,
+    set_indexable_content
+)
+from neo4japp.services.elastic.principals import get_file_principals
+from neo4japp.services.elastic.query_parser import (
+    PRE_PROCESS_PARSER,
+    WORDS_PHRASES_AND_WILDCARDS_PARSER,
+    get_grammar_key,
+    get_query_parser,
+    parse_query
 )
 from neo4japp.utils import EventLog
+from neo4japp.utils.collections import chunk
 from app import app
 
-ParserElement.enablePackrat()
-
 
 class ElasticService(ElasticConnection, GraphConnection):
     # Begin indexing methods
-    def update_or_create_index(self, index_id, index_mapping_file):
+    def update_or_create_index(self, index_id, index_mapping_file, reindex=True):
         """Creates an index with the given index id and mapping file. If the index already exists,
-        we update it and re-index any documents using that index."""
+        we update it and re-index any documents using that index, unless `reindex` is False."""
         with open(index_mapping_file) as f:
             index_definition_data = f.read()
         index_definition = json.loads(index_definition_data)
@@ -94,7 +90,32 @@ class ElasticService(ElasticConnection, GraphConnection):
         # If we trash the index we also need to re-index all the documents that used it.
         # Currently we take the safe route and simply re-index ALL documents, regardless of
         # which index was actually re-created.
-        self.reindex_all_documents()
+        if reindex:
+            self.reindex_all_documents()
+
+    def add_index_fields(self, index_id, index_mapping_file, fields: Iterable[str]):
+        """Adds the mapping of the given fields, from the mapping file, to the index if it
+        exists. Unlike a change to the type of a field, new fields need no reindex."""
+        with open(index_mapping_file) as f:
+            properties = json.load(f)['mappings']['properties']
+
+        if not self.elastic_client.indices.exists(index_id):
+            return
+
+        try:
+            self.elastic_client.indices.put_mapping(
+                index=index_id,
+                body={'properties': {field: properties[field] for field in fields}}
+            )
+        except Exception as e:
+            # e.g. the field was already mapped dynamically, the index has to be recreated
+            current_app.logger.error(
+                f'Failed to add the fields {", ".join(fields)} to ElasticSearch index '
+                f'{index_id}, run reset-elastic to recreate it',
+                exc_info=e,
+                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
+            )
+            raise
 
     def update_or_create_pipeline(self, pipeline_id, pipeline_definition_file):
         """Creates a pipeline with the given pipeline id and definition file. If the pipeline
@@ -118,35 +139,69 @@ class ElasticService(ElasticConnection, GraphConnection):
             extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
         )
 
-    def recreate_indices_and_pipelines(self):
+    def recreate_indices_and_pipelines(self, reindex=True):
         """Recreates all currently defined Elastic pipelines and indices. If any indices/pipelines
-        do not exist, we create them here. If an index/pipeline does exist, we update it."""
+        do not exist, we create them here. If an index/pipeline does exist, we update it. The
+        documents are indexed again unless `reindex` is False (see reindex.py)."""
         for (pipeline_id, pipeline_definition_file) in ELASTIC_PIPELINE_SEED_PAIRS:
             self.update_or_create_pipeline(pipeline_id, pipeline_definition_file)
 
         for (index_id, index_mapping_file) in ELASTIC_INDEX_SEED_PAIRS:
-            self.update_or_create_index(index_id, index_mapping_file)
+            self.update_or_create_index(index_id, index_mapping_file, reindex)
         return 'done'
 
     def reindex_all_documents(self):
         self.index_files()
 
-    def update_files(self, hash_ids: List[str] = None):
-        raise NotImplementedError()
+    def update_files(self, fields: Dict[str, Iterable[str]], batch_size: int = 100) -> List[str]:
+        """
+        Updates some metadata fields of the documents of the files with the given ids, without
+        extracting and sending their content again. The files whose update fails (e.g. because
+        they have no document yet) are indexed instead.
+        :param fields: the document fields to update, by file hash id
+        :param batch_size: number of documents to update per batch
+        :return: the ids of the files that failed to be updated and indexed
+        """
+        hash_ids = list(fields)
+        query = build_file_hierarchy_query(and_(
+            Files.deletion_date.is_(None),
+            Files.recycling_date.is_(None),
+            Files.hash_id.in_(hash_ids)
+        ), Projects, Files) \
+            .options(raiseload('*'),
+                     joinedload(Files.user)) \
+            .filter(Files.hash_id.in_(hash_ids)) \
+            .with_entities(Files, Projects)
+
+        failed = self._streaming_bulk_documents(
+            self._lazy_create_update_docs(
+                self._windowed_query(query, Files.hash_id, batch_size),
+                fields
+            )
+        )
+        if failed:
+            return self.index_files(failed, batch_size)
+        return []
 
-    def delete_files(self, hash_ids: List[str]):
-        self._streaming_bulk_documents([
+    def delete_files(self, hash_ids: List[str]) -> List[str]:
+        """
+        Deletes the files with the given ids from Elastic.
+        :return: the ids of the files that failed to be deleted
+        """
+        failed = self._streaming_bulk_documents([
             self._get_delete_obj(hash_id, FILE_INDEX_ID)
             for hash_id in hash_ids
         ])
         self.elastic_client.indices.refresh(FILE_INDEX_ID)
+        return failed
 
-    def index_files(self, hash_ids: List[str] = None, batch_size: int = 100):
+    def index_files(self, hash_ids: List[str] = None, batch_size: int = 100) -> List[str]:
         """
         Adds the files with the given ids to Elastic. If no IDs are given,
         all non-deleted files will be indexed.
         :param ids: a list of file table IDs (integers)
         :param batch_size: number of documents to index per batch
+        :return: the ids of the files that failed to be indexed
         """
         filters = [
             Files.deletion_date.is_(None),
@@ -171,7 +226,7 @@ class ElasticService(ElasticConnection, GraphConnection):
         # Just return Files and Projects data, we don't care about any other columns
         query = query.with_entities(Files, Projects)
 
-        self._streaming_bulk_documents(
+        return self._streaming_bulk_documents(
             self._lazy_create_index_docs_for_streaming_bulk(
                 self._windowed_query(query, Files.hash_id, batch_size)
             )
@@ -217,9 +272,18 @@ class ElasticService(ElasticConnection, GraphConnection):
         :return: the bytes to send to Elastic
         """
         if file.content:
-            content = file.content.raw_file
+            checksum = file.content.checksum_sha256
+            cached = get_indexable_content(checksum, file.mime_type)
+            if cached is not None:
+                return BytesIO(cached)
+
+            content = BytesIO(file.content.raw_file)
             file_type_service = get_file_type_service()
-            return file_type_service.get(file).to_indexable_content(BytesIO(content))
+            indexable_content = file_type_service.get(file).to_indexable_content(content)
+            # Some types are indexed as they are, there is nothing to cache
+            if indexable_content is not content:
+                set_indexable_content(checksum, file.mime_type, indexable_content.getvalue())
+            return indexable_content
         else:
             return BytesIO()
 
@@ -234,8 +298,10 @@ class ElasticService(ElasticConnection, GraphConnection):
         # Preserve context that is lost from threading when used
         # with the elasticsearch parallel_bulk
         with app.app_context():
-            for file, project in batch:
-                yield self._get_index_obj(file, project, FILE_INDEX_ID)
+            for files in chunk(batch, PRINCIPALS_BATCH_SIZE):
+                principals = get_file_principals(files)
+                for file, project in files:
+                    yield self._get_index_obj(file, project, FILE_INDEX_ID, principals[file.id])
 
     def _lazy_create_index_docs_for_streaming_bulk(self, batch):
         """
@@ -244,25 +310,38 @@ class ElasticService(ElasticConnection, GraphConnection):
         :param batch: iterable of file/project pairs
         :return: indexable object in generator form
         """
-        for file, project in batch:
-            yield self._get_index_obj(file, project, FILE_INDEX_ID)
+        for files in chunk(batch, PRINCIPALS_BATCH_SIZE):
+            principals = get_file_principals(files)
+            for file, project in files:
+                yield self._get_index_obj(file, project, FILE_INDEX_ID, principals[file.id])
+
+    def _lazy_create_update_docs(self, batch, fields: Dict[str, Iterable[str]]):
+        """
+        Creates a generator out of the elastic document update
+        process to prevent loading everything into memory.
+        :param batch: iterable of file/project pairs
+        :param fields: the document fields to update, by file hash id
+        :return: update object in generator form
+        """
+        for files in chunk(batch, PRINCIPALS_BATCH_SIZE):
+            # Only look the principals up for the files whose principals changed
+            principals = get_file_principals([
+                (file, project) for file, project in files
+                if 'principals' in fields[file.hash_id]
+            ])
+            for file, project in files:
+                yield self._get_update_action_obj(
+                    file.hash_id,
+                    FILE_INDEX_ID,
+                    self._get_metadata(
+                        file, project, principals.get(file.id, []), fields[file.hash_id])
+                )
 
     def _get_update_action_obj(self, file_hash_id: str, index_id: str, changes: dict = {}) -> dict:
-        # 'filename': file.filename,
-        # 'description': file.description,
-        # 'uploaded_date': file.creation_date,
-        # 'data': base64.b64encode(indexable_content).decode('utf-8'),
-        # 'user_id': file.user_id,
-        # 'username': file.user.username,
-        # 'project_id': project.id,
-        # 'project_hash_id': project.hash_id,
-        # 'project_name': project.name,
-        # 'doi': file.doi,
-        # 'public': file.public,
-        # 'id': file.id,
-        # 'hash_id': file.hash_id,
-        # 'mime_type': file.mime_type,
-        # 'data_ok': data_ok,
+        """
+        Generate an update operation object, of some fields of the document
+        :param changes: the new values of the fields, see :func:`_get_metadata`
+        """
         return {
             '_op_type': 'update',
             '_index': index_id,
@@ -277,12 +356,19 @@ class ElasticService(ElasticConnection, GraphConnection):
             '_id': file_hash_id
         }
 
-    def _get_index_obj(self, file: Files, project: Projects, index_id) -> dict:
+    def _get_index_obj(
+        self,
+        file: Files,
+        project: Projects,
+        index_id,
+        principals: List[str]
+    ) -> dict:
         """
         Generate an index operation object from the given file and project
         :param file: the file
         :param project: the project that file is within
         :param index_id: the index
+        :param principals: who can read the file, see :func:`get_file_principals`
         :return: a document
         """
         try:
@@ -309,25 +395,52 @@ class ElasticService(ElasticConnection, GraphConnection):
             'pipeline': ATTACHMENT_PIPELINE_ID,
             '_id': file.hash_id,
             '_source': {
-                'filename': file.filename,
-                'file_path': file.filename_path,
-                'description': file.description,
-                'uploaded_date': file.creation_date,
+                **self._get_metadata(file, project, principals),
                 'data': base64.b64encode(indexable_content).decode('utf-8'),
-                'user_id': file.user_id,
-                'username': file.user.username,
-                'project_id': project.id,
-                'project_hash_id': project.hash_id,
-                'project_name': project.name,
-                'doi': file.doi,
-                'public': file.public,
-                'id': file.id,
-                'hash_id': file.hash_id,
-                'mime_type': file.mime_type,
                 'data_ok': data_ok,
             }
         }
 
+    def _get_metadata(
+        self,
+        file: Files,
+        project: Projects,
+        principals: List[str],
+        fields: Optional[Iterable[str]] = None
+    ) -> dict:
+        """
+        Get the fields of the document of a file, other than its content
+        :param file: the file
+        :param project: the project that file is within
+        :param principals: who can read the file, see :func:`get_file_principals`
+        :param fields: only get these fields, all of them if not given. The file path takes
+        a query per parent of the file, and is only looked up if it is one of them
+        :return: the fields
+        """
+        metadata = {
+            'filename': file.filename,
+            'description': file.description,
+            'uploaded_date': file.creation_date,
+            'user_id': file.user_id,
+            'username': file.user.username,
+            'project_id': project.id,
+            'project_hash_id': project.hash_id,
+            'project_name': project.name,
+            'doi': file.doi,
+            'public': file.public,
+            'principals': principals,
+            'id': file.id,
+            'hash_id': file.hash_id,
+            'mime_type': file.mime_type,
+        }
+        if fields is None:
+            return {**metadata, 'file_path': file.filename_path}
+
+        fields = set(fields)
+        if 'file_path' in fields:
+            metadata['file_path'] = file.filename_path
+        return {field: value for field, value in metadata.items() if field in fields}
+
     def _parallel_bulk_documents(self, documents):
         """
         Performs a series of bulk operations in elastic, determined by the `documents` input.
@@ -357,10 +470,11 @@ class ElasticService(ElasticConnection, GraphConnection):
                     extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
                 )
 
-    def _streaming_bulk_documents(self, documents):
+    def _streaming_bulk_documents(self, documents) -> List[str]:
         """
         Performs a series of bulk operations in elastic, determined by the `documents` input.
         These operations are done in series.
+        :return: the ids of the documents whose operation failed
         """
         # `raise_on_exception` set to False so that we don't error out if one of the documents
         # fails to index
@@ -372,6 +486,7 @@ class ElasticService(ElasticConnection, GraphConnection):
             raise_on_exception=False
         )
 
+        failed = []
         for success, info in results:
             # TODO: Evaluate the data egress size. When seeding the staging database
             # locally, this could output ~1gb of data. Question: Should we conditionally
@@ -386,6 +501,12 @@ class ElasticService(ElasticConnection, GraphConnection):
                     f'Elastic search bulk operation failed: {info}',
                     extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
                 )
+                (op_type, result), = info.items()
+                # Deleting a document that is not in the index is not a failure
+                if not (op_type == 'delete' and result.get('status') == 404):
+                    failed.append(result.get('_id'))
+
+        return failed
 
     # End indexing methods
 
@@ -452,11 +573,8 @@ class ElasticService(ElasticConnection, GraphConnection):
 
         string = self._strip_unmatched_characters(string)
 
-        token = QuotedString('"', unquoteResults=False) | Word(printables)
-        parser = ZeroOrMore(token)
-
         unique_non_keyword_tokens = list(set([
-                t for t in list(parser.parseString(string))
+                t for t in list(WORDS_PHRASES_AND_WILDCARDS_PARSER.parseString(string))
                 if t.lower() not in ['and', 'not', 'or']
             ])
         )
@@ -485,21 +603,10 @@ class ElasticService(ElasticConnection, GraphConnection):
         """
         query = self._strip_unmatched_characters(query)
 
-        open_parens = Word('(')
-        closed_parens = Word(')')
-        term = term = Word(printables)
-        # Need to include these optional parens, otherwise something like '(r and "p and q")' will
-        # be tokenized as ['(r', 'and', '"p', 'and', 'q")']
-        quoted_term = QuotedString('"', unquoteResults=False)
-        quoted_term_with_parens = Optional(open_parens) + quoted_term + Optional(closed_parens)
-        quoted_term_with_parens.setParseAction(''.join)
-        operand = quoted_term_with_parens | term
-        query_parser = ZeroOrMore(operand)
-
         unstackable_logical_ops = ['and', 'or']
         new_query = []
         _next = None
-        tokens = list(query_parser.parseString(query))
+        tokens = list(PRE_PROCESS_PARSER.parseString(query))
         for i, curr in enumerate(tokens):
             # If we're at the last element in the list, just add it to the new list of tokens.
             if i == len(tokens) - 1:
@@ -543,34 +650,10 @@ class ElasticService(ElasticConnection, GraphConnection):
         text_field_boosts: Dict[str, int],
     ):
         """
-        Generates a parser which expects a pseudo-Lucene query string, and returns an object
-        representing:
-
-        - A simple Elastic match query in the case of a single term
-        - An Elastic bool query in the case of a logical expression
-
-        See the helper classes in `query_parser_helpers.py` for the object structure.
+        Returns a parser which expects a pseudo-Lucene query string, see `query_parser.py`. The
+        parser is only built once for the same text fields and boosts.
         """
-        boolOperand = QuotedString('"', unquoteResults=False) | Word(printables, excludeChars='()')
-        boolOperand.setParseAction(
-            lambda token: BoolOperand(
-                token,
-                text_fields,
-                text_field_boosts
-            ),
-        )
-
-        # Define expression, based on expression operand and list of operations in precedence order
-        boolExpr = infixNotation(
-            boolOperand,
-            [
-                (CaselessLiteral('not'), 1, opAssoc.RIGHT, BoolMustNot),
-                (CaselessLiteral('and'), 2, opAssoc.LEFT, BoolMust),
-                (CaselessLiteral('or'), 2, opAssoc.LEFT, BoolShould),
-            ],
-        )
-
-        return boolExpr
+        return get_query_parser(*get_grammar_key(text_fields, text_field_boosts))
 
     def _build_query_clause(
         self,
@@ -602,8 +685,10 @@ class ElasticService(ElasticConnection, GraphConnection):
 
         words_phrases_and_wildcards = self._get_words_phrases_and_wildcards(user_search_query)
         processed_query = self._pre_process_query(user_search_query)
-        parser = self._get_query_parser(text_fields, text_field_boosts)
-        result = parser.parseString(processed_query)[0].to_dict()
+        result = parse_query(
+            processed_query,
+            *get_grammar_key(text_fields, text_field_boosts)
+        ).to_dict()
 
         return {
             'query': {
@@ -0,0 +1,105 @@
+"""Local disk cache of the indexable content of files.
+
+The content of maps, enrichment tables and graphs is turned into text before
+it is sent to elastic. That text only depends on the content and the type of
+the file, so it is cached by the content checksum: content shared by several
+files, and files indexed again (e.g. by a full reindex), are converted once.
+Types that are sent to elastic as they are (e.g. PDFs) are not cached.
+
+Entries are compressed files, and the least recently used entries are
+removed once the cache grows over `INDEXABLE_CONTENT_CACHE_SIZE` bytes.
+"""
+import os
+import zlib
+
+from tempfile import NamedTemporaryFile
+from typing import Optional
+
+from flask import current_app
+
+from neo4japp.constants import LogEventType
+from neo4japp.services.elastic.constants import (
+    INDEXABLE_CONTENT_CACHE_DIR,
+    INDEXABLE_CONTENT_CACHE_SIZE
+)
+from neo4japp.utils.logger import EventLog
+
+
+# bump when the conversion of any file type changes
+CACHE_VERSION = 1
+
+
+def _get_path(checksum: bytes, mime_type: str) -> str:
+    mime_type = mime_type.replace('/', '_')
+    return os.path.join(
+        INDEXABLE_CONTENT_CACHE_DIR,
+        f'{checksum.hex()}-{mime_type}-v{CACHE_VERSION}.z')
+
+
+def get_indexable_content(checksum: bytes, mime_type: str) -> Optional[bytes]:
+    if not INDEXABLE_CONTENT_CACHE_SIZE:
+        return None
+
+    path = _get_path(checksum, mime_type)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # mark as recently used for the eviction
+        os.utime(path)
+        return zlib.decompress(data)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        current_app.logger.warning(
+            f'Failed to read the indexable content cache entry {path}.',
+            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
+        )
+        return None
+
+
+def set_indexable_content(checksum: bytes, mime_type: str, content: bytes):
+    if not INDEXABLE_CONTENT_CACHE_SIZE:
+        return
+
+    try:
+        os.makedirs(INDEXABLE_CONTENT_CACHE_DIR, exist_ok=True)
+        # write to a temporary file first so other workers
+        # never read a partially written entry
+        with NamedTemporaryFile(
+            dir=INDEXABLE_CONTENT_CACHE_DIR, suffix='.tmp', delete=False
+        ) as f:
+            f.write(zlib.compress(content))
+        os.replace(f.name, _get_path(checksum, mime_type))
+        evict(INDEXABLE_CONTENT_CACHE_SIZE)
+    except OSError:
+        current_app.logger.warning(
+            'Failed to write the indexable content cache entry.',
+            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
+        )
+
+
+def evict(max_size: int):
+    """Remove the least recently used entries until the cache fits in `max_size` bytes."""
+    entries = []
+    total = 0
+    for entry in os.scandir(INDEXABLE_CONTENT_CACHE_DIR):
+        if not entry.name.endswith('.z'):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    if total <= max_size:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= max_size:
+            break
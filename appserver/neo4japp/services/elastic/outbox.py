@@ -0,0 +1,282 @@
+"""Outbox of the files to index in elastic.
+
+Changing a file does not index it in elastic: the Files and Projects
+listeners (see models/files.py) only write the hash ids of the files to
+index or delete to the file_index_outbox table, in the transaction that
+changes them. The elastic indexer (`flask elastic-indexer`) drains the
+outbox in the background, so file operations neither wait on nor fail
+because of elastic.
+
+Only what changed is sent again: a change to the metadata of a file queues an
+UPDATE of the document fields that depend on it (and on the children of a
+directory, of their paths and principals), the content of a file is only extracted again
+when the content itself changes, and changes that are not part of the
+document queue nothing.
+
+Each batch of the outbox is coalesced to one operation per file, and sent to
+elastic in bulk. The files that fail are retried with an
+exponential backoff, and dropped after ELASTIC_INDEXER_MAX_ATTEMPTS. Rows are
+locked with SKIP LOCKED, so several indexers can drain the outbox at once.
+"""
+import time
+
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import literal, select
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from neo4japp.constants import FILE_INDEX_ID, LogEventType
+from neo4japp.database import db, get_elastic_service
+from neo4japp.models.files import FileIndexOperation, FileIndexOutbox, Files
+from neo4japp.services.elastic.constants import FILE_INDEX_ADDED_FIELDS, FILE_INDEX_DEFINITION_PATH
+from neo4japp.utils import EventLog
+
+# longest time a failed file is backed off for, in seconds
+MAX_RETRY_DELAY = 3600
+
+# The document fields (see ElasticService._get_metadata) that depend on where a file is
+PATH_FIELDS = frozenset({'file_path', 'project_id', 'project_hash_id', 'project_name'})
+
+# The document fields of the children of a directory that depend on the directory: their
+# path, and who can read them (see principals.py), as they inherit the directory permissions
+INHERITED_FIELDS = PATH_FIELDS | {'principals'}
+
+# The document fields that depend on each attribute of a file
+DOCUMENT_FIELDS: Dict[str, FrozenSet[str]] = {
+    'filename': frozenset({'filename', 'file_path'}),
+    'description': frozenset({'description'}),
+    'creation_date': frozenset({'uploaded_date'}),
+    'user': frozenset({'user_id', 'username'}),
+    'user_id': frozenset({'user_id', 'username'}),
+    'doi': frozenset({'doi'}),
+    'public': frozenset({'public', 'principals'}),
+    'parent': INHERITED_FIELDS,
+    'parent_id': INHERITED_FIELDS,
+}
+
+# The attributes of a file that are not part of its document. Changing an attribute that is
+# neither here nor in DOCUMENT_FIELDS (e.g. the content) indexes the whole document again
+UNINDEXED_ATTRIBUTES = frozenset({
+    'annotations',
+    'annotation_configs',
+    'annotations_date',
+    'custom_annotations',
+    'enrichment_annotations',
+    'excluded_annotations',
+    'fallback_organism',
+    'fallback_organism_id',
+    'upload_url',
+    'modified_date',
+    'creator',
+    'creator_id',
+    'modifier',
+    'modifier_id',
+    'deleter',
+    'deleter_id',
+    'recycler',
+    'recycler_id',
+})
+
+
+def get_document_changes(
+    changes: dict
+) -> Tuple[Optional[FileIndexOperation], Optional[Set[str]]]:
+    """Returns how the document of a file has to change after its attributes changed.
+
+    :param changes: the changes of the file, see get_model_changes
+    :return: the operation and, for UPDATE, the fields to update; or None if the
+        document does not change
+    """
+    fields: Set[str] = set()
+    for attribute in changes:
+        if attribute in DOCUMENT_FIELDS:
+            fields |= DOCUMENT_FIELDS[attribute]
+        elif attribute not in UNINDEXED_ATTRIBUTES:
+            return FileIndexOperation.INDEX, None
+    if not fields:
+        return None, None
+    return FileIndexOperation.UPDATE, fields
+
+
+def enqueue_files(
+    connection,
+    hash_ids: Iterable[str],
+    operation: FileIndexOperation,
+    fields: Optional[Iterable[str]] = None
+):
+    """Adds the files to the outbox, in the transaction of the connection."""
+    fields = sorted(fields) if fields is not None else None
+    values = [
+        {'hash_id': hash_id, 'operation': operation, 'fields': fields}
+        for hash_id in hash_ids]
+    if values:
+        connection.execute(FileIndexOutbox.__table__.insert().values(values))
+
+
+def enqueue_file_family(
+    connection,
+    file_id: int,
+    operation: FileIndexOperation,
+    fields: Optional[Iterable[str]] = None,
+    children_only: bool = False
+):
+    """Adds the file and all of its children to the outbox, in the transaction
+    of the connection, without loading them.
+
+    :param children_only: only add the children of the file
+    """
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.models.files_queries import build_file_children_cte
+
+    q_hierarchy = build_file_children_cte(Files.id == file_id)
+    t_outbox = FileIndexOutbox.__table__
+    query = select([
+        Files.hash_id,
+        literal(operation, type_=t_outbox.c.operation.type),
+        literal(sorted(fields) if fields is not None else None, type_=t_outbox.c.fields.type)
+    ]).select_from(
+        Files.__table__.join(q_hierarchy, q_hierarchy.c.id == Files.id)
+    )
+    if children_only:
+        query = query.where(q_hierarchy.c.level > 0)
+    connection.execute(t_outbox.insert().from_select(['hash_id', 'operation', 'fields'], query))
+
+
+def coalesce_outbox(rows: List[FileIndexOutbox]) -> Dict[str, FileIndexOutbox]:
+    """Returns the latest row of every file, the rows being in outbox order. The operation
+    of the row is changed to the combined operation of all the rows of the file:
+
+    * INDEX and DELETE replace anything before them
+    * UPDATE after INDEX is part of the INDEX, which sends the whole document
+    * UPDATE after DELETE is dropped, the document is gone
+    * UPDATE after UPDATE updates the fields of both
+    """
+    latest: Dict[str, FileIndexOutbox] = {}
+    for row in rows:
+        previous = latest.get(row.hash_id)
+        if previous is not None and row.operation == FileIndexOperation.UPDATE:
+            if previous.operation == FileIndexOperation.UPDATE:
+                row.fields = sorted(set(previous.fields) | set(row.fields))
+            else:
+                row.operation = previous.operation
+                row.fields = None
+        latest[row.hash_id] = row
+    return latest
+
+
+def get_retry_delay(attempts: int) -> int:
+    """Seconds to back a file off for after its n-th failed attempt."""
+    retry_delay = current_app.config['ELASTIC_INDEXER_RETRY_DELAY']
+    return min(retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def drain_outbox(batch_size: int) -> Tuple[int, int]:
+    """Sends one batch of the outbox to elastic.
+
+    :param batch_size: max number of rows to take
+    :return: the number of rows taken and the number of files that failed
+    """
+    rows = db.session.query(
+        FileIndexOutbox
+    ).filter(
+        FileIndexOutbox.available_date <= db.func.now()
+    ).order_by(
+        FileIndexOutbox.id
+    ).limit(
+        batch_size
+    ).with_for_update(
+        skip_locked=True
+    ).all()
+
+    if not rows:
+        db.session.commit()
+        return 0, 0
+
+    latest = coalesce_outbox(rows)
+    to_delete = [
+        hash_id for hash_id, row in latest.items()
+        if row.operation == FileIndexOperation.DELETE]
+    to_index = [
+        hash_id for hash_id, row in latest.items()
+        if row.operation == FileIndexOperation.INDEX]
+    to_update = {
+        hash_id: row.fields for hash_id, row in latest.items()
+        if row.operation == FileIndexOperation.UPDATE}
+
+    elastic_service = get_elastic_service()
+    try:
+        failed = set()
+        if to_delete:
+            failed.update(elastic_service.delete_files(to_delete))
+        if to_index:
+            failed.update(elastic_service.index_files(to_index))
+        if to_update:
+            failed.update(elastic_service.update_files(to_update))
+    except Exception as e:
+        current_app.logger.error(
+            f'Elastic indexer failed to send {len(latest)} files to elastic',
+            exc_info=e,
+            extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
+        )
+        # The error may have come from the database, so the rows are locked again in a
+        # new transaction to retry them
+        db.session.rollback()
+        row_ids = [row.id for row in rows]
+        rows = db.session.query(
+            FileIndexOutbox
+        ).filter(
+            FileIndexOutbox.id.in_(row_ids)
+        ).order_by(
+            FileIndexOutbox.id
+        ).with_for_update(
+            skip_locked=True
+        ).all()
+        latest = coalesce_outbox(rows)
+        failed = set(latest)
+
+    max_attempts = current_app.config['ELASTIC_INDEXER_MAX_ATTEMPTS']
+    # The latest row of a failed file is kept to retry it, every other row is done
+    for row in rows:
+        if row.hash_id in failed and latest[row.hash_id] is row:
+            row.attempts += 1
+            if row.attempts < max_attempts:
+                row.available_date = db.func.now() + timedelta(
+                    seconds=get_retry_delay(row.attempts))
+                continue
+            current_app.logger.error(
+                f'Elastic indexer gave up on file with hash_id: {row.hash_id} ' +
+                f'({row.operation.value}) after {row.attempts} attempts',
+                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
+            )
+        db.session.delete(row)
+    db.session.commit()
+
+    current_app.logger.info(
+        f'Elastic indexer deleted {len(to_delete)}, indexed {len(to_index)} and updated ' +
+        f'{len(to_update)} files ({len(failed)} failed)',
+        extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
+    )
+    return len(rows), len(failed)
+
+
+def run_indexer(until_empty: bool = False):
+    """Drains the outbox as files are changed.
+
+    Full batches are drained back to back. The indexer waits ELASTIC_INDEXER_INTERVAL
+    seconds once the outbox is drained, and after a batch with failures so that an
+    unavailable elastic is not hammered.
+
+    :param until_empty: stop once the outbox has nothing available
+    """
+    # the outbox may hold updates of fields the index did not have yet
+    get_elastic_service().add_index_fields(
+        FILE_INDEX_ID, FILE_INDEX_DEFINITION_PATH, FILE_INDEX_ADDED_FIELDS)
+
+    batch_size = current_app.config['ELASTIC_INDEXER_BATCH_SIZE']
+    interval = current_app.config['ELASTIC_INDEXER_INTERVAL']
+    while True:
+        taken, failed = drain_outbox(batch_size)
+        if until_empty and not taken:
+            return
+        if taken < batch_size or failed:
+            time.sleep(interval)
@@ -0,0 +1,114 @@
+"""Principals of the file documents in elastic.
+
+Every document carries, in its `principals` field, who can read the file: a
+`user:<id>` principal for every user that can read it through a project or
+file role (on the file or on any of its parents), and the `public` principal
+if the file or any of its parents is public. Search then only has to match
+the principals of the user (see get_user_principals) with a single terms
+query, instead of the projects and folders the user can read.
+
+The principals follow the readable privilege of FileHierarchy.calculate_privileges.
+They are maintained by the outbox (see outbox.py): the files of a project are
+updated when its collaborators change, and the children of a directory when the
+directory is made public or moved.
+"""
+from typing import Dict, Iterable, List, Set, Tuple
+
+from neo4japp.database import db
+from neo4japp.models import (
+    AppRole,
+    AppUser,
+    Files,
+    Projects,
+    file_collaborator_role,
+    projects_collaborator_role,
+)
+
+PUBLIC_PRINCIPAL = 'public'
+
+# The roles that make a project or a file (and its children) readable
+PROJECT_READ_ROLES = ['project-read', 'project-write', 'project-admin']
+FILE_READ_ROLES = ['file-read', 'file-write', 'file-comment']
+
+
+def get_user_principal(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def get_user_principals(user: AppUser) -> List[str]:
+    """Returns the principals of the documents the user can read."""
+    return [PUBLIC_PRINCIPAL, get_user_principal(user.id)]
+
+
+def get_principals(public: bool, reader_ids: Iterable[int]) -> List[str]:
+    """
+    :param public: whether the file or any of its parents is public
+    :param reader_ids: the ids of the users with a read role on the file
+    """
+    principals = {get_user_principal(user_id) for user_id in reader_ids}
+    if public:
+        principals.add(PUBLIC_PRINCIPAL)
+    return sorted(principals)
+
+
+def get_file_principals(files: Iterable[Tuple[Files, Projects]]) -> Dict[int, List[str]]:
+    """
+    Returns the principals of the given files, in three queries whatever the number of files.
+    :param files: file/project pairs
+    :return: the principals by file id
+    """
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.models.files_queries import build_file_parents_cte
+
+    project_ids = {file.id: project.id for file, project in files}
+    if not project_ids:
+        return {}
+
+    # The file itself is its first "parent"
+    q_hierarchy = build_file_parents_cte(Files.id.in_(project_ids))
+    parents: Dict[int, Set[int]] = {file_id: set() for file_id in project_ids}
+    public: Set[int] = set()
+    for file_id, parent_id, parent_public in db.session.query(
+        q_hierarchy.c.initial_id,
+        q_hierarchy.c.id,
+        Files.public
+    ).join(
+        Files, Files.id == q_hierarchy.c.id
+    ):
+        parents[file_id].add(parent_id)
+        if parent_public:
+            public.add(file_id)
+
+    file_readers: Dict[int, Set[int]] = {}
+    for parent_id, user_id in db.session.query(
+        file_collaborator_role.c.file_id,
+        file_collaborator_role.c.collaborator_id
+    ).join(
+        AppRole, AppRole.id == file_collaborator_role.c.role_id
+    ).filter(
+        file_collaborator_role.c.file_id.in_(set().union(*parents.values())),
+        file_collaborator_role.c.collaborator_id.isnot(None),
+        AppRole.name.in_(FILE_READ_ROLES)
+    ):
+        file_readers.setdefault(parent_id, set()).add(user_id)
+
+    project_readers: Dict[int, Set[int]] = {}
+    for project_id, user_id in db.session.query(
+        projects_collaborator_role.c.projects_id,
+        projects_collaborator_role.c.appuser_id
+    ).join(
+        AppRole, AppRole.id == projects_collaborator_role.c.app_role_id
+    ).filter(
+        projects_collaborator_role.c.projects_id.in_(set(project_ids.values())),
+        AppRole.name.in_(PROJECT_READ_ROLES)
+    ):
+        project_readers.setdefault(project_id, set()).add(user_id)
+
+    return {
+        file_id: get_principals(
+            file_id in public,
+            project_readers.get(project_id, set()).union(
+                *(file_readers.get(parent_id, set()) for parent_id in parents[file_id]))
+        )
+        for file_id, project_id in project_ids.items()
+    }
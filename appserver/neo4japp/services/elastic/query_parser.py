@@ -0,0 +1,130 @@
+"""Grammars of the content search queries.
+
+Building a pyparsing grammar is far slower than parsing a query with it, so the
+grammars are built once: the tokenizers of the user queries when this module is
+imported, and the boolean grammar once per set of text fields and boosts (see
+get_query_parser). Parsed queries are kept in a bounded LRU keyed by the
+pre-processed query (see ElasticService._pre_process_query), so that a query
+searched again, e.g. to get the next page of results, is not parsed again.
+
+The parse actions of the grammars only create new objects, so the grammars and the
+parsed queries can be shared by requests.
+"""
+from functools import lru_cache
+from typing import Dict, Sequence, Tuple
+
+from pyparsing import (
+    CaselessLiteral,
+    Optional,
+    ParserElement,
+    QuotedString,
+    Word,
+    ZeroOrMore,
+    infixNotation,
+    opAssoc,
+    printables,
+)
+
+from neo4japp.services.elastic.query_parser_helpers import (
+    BoolMust,
+    BoolMustNot,
+    BoolOperand,
+    BoolShould
+)
+
+ParserElement.enablePackrat()
+
+# number of boolean grammars kept, one per set of text fields and boosts
+QUERY_PARSER_CACHE_SIZE = 16
+# number of parsed queries kept
+PARSED_QUERY_CACHE_SIZE = 1024
+
+TextFields = Tuple[str, ...]
+TextFieldBoosts = Tuple[Tuple[str, int], ...]
+
+
+def build_words_phrases_and_wildcards_parser():
+    """Tokenizes a user query into quoted phrases and words."""
+    token = QuotedString('"', unquoteResults=False) | Word(printables)
+    return ZeroOrMore(token)
+
+
+def build_pre_process_parser():
+    """Tokenizes a user query into parentheses, quoted phrases and words."""
+    open_parens = Word('(')
+    closed_parens = Word(')')
+    term = Word(printables)
+    # Need to include these optional parens, otherwise something like '(r and "p and q")' will
+    # be tokenized as ['(r', 'and', '"p', 'and', 'q")']
+    quoted_term = QuotedString('"', unquoteResults=False)
+    quoted_term_with_parens = Optional(open_parens) + quoted_term + Optional(closed_parens)
+    quoted_term_with_parens.setParseAction(''.join)
+    operand = quoted_term_with_parens | term
+    return ZeroOrMore(operand)
+
+
+def build_query_parser(text_fields: TextFields, text_field_boosts: TextFieldBoosts):
+    """
+    Builds a parser which expects a pseudo-Lucene query string, and returns an object
+    representing:
+
+    - A simple Elastic match query in the case of a single term
+    - An Elastic bool query in the case of a logical expression
+
+    See the helper classes in `query_parser_helpers.py` for the object structure.
+    """
+    fields = list(text_fields)
+    boosts = dict(text_field_boosts)
+
+    boolOperand = QuotedString('"', unquoteResults=False) | Word(printables, excludeChars='()')
+    boolOperand.setParseAction(
+        lambda token: BoolOperand(
+            token,
+            fields,
+            boosts
+        ),
+    )
+
+    # Define expression, based on expression operand and list of operations in precedence order
+    boolExpr = infixNotation(
+        boolOperand,
+        [
+            (CaselessLiteral('not'), 1, opAssoc.RIGHT, BoolMustNot),
+            (CaselessLiteral('and'), 2, opAssoc.LEFT, BoolMust),
+            (CaselessLiteral('or'), 2, opAssoc.LEFT, BoolShould),
+        ],
+    )
+
+    return boolExpr
+
+
+WORDS_PHRASES_AND_WILDCARDS_PARSER = build_words_phrases_and_wildcards_parser()
+PRE_PROCESS_PARSER = build_pre_process_parser()
+
+
+def get_grammar_key(
+    text_fields: Sequence[str],
+    text_field_boosts: Dict[str, int]
+) -> Tuple[TextFields, TextFieldBoosts]:
+    """Returns the hashable signature of the boolean grammar of the text fields and boosts."""
+    return tuple(text_fields), tuple(sorted(text_field_boosts.items()))
+
+
+@lru_cache(maxsize=QUERY_PARSER_CACHE_SIZE)
+def get_query_parser(text_fields: TextFields, text_field_boosts: TextFieldBoosts):
+    """Returns the boolean grammar of the text fields and boosts, see build_query_parser."""
+    return build_query_parser(text_fields, text_field_boosts)
+
+
+@lru_cache(maxsize=PARSED_QUERY_CACHE_SIZE)
+def parse_query(
+    processed_query: str,
+    text_fields: TextFields,
+    text_field_boosts: TextFieldBoosts
+):
+    """
+    Returns the parsed pre-processed query, see build_query_parser.
+
+    Queries that fail to parse are not cached.
+    """
+    return get_query_parser(text_fields, text_field_boosts).parseString(processed_query)[0]
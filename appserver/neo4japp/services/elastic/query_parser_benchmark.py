@@ -0,0 +1,89 @@
+"""Benchmark of the content search query parsing, used by the `benchmark-query-parser` command.
+
+Every query is parsed the way the search did before the grammars were cached
+(building the grammars for every query), with the cached grammars, and with the
+parsed query cache, as a search of the same query would.
+"""
+import time
+
+from typing import Callable, Dict, List
+
+from neo4japp.services.elastic.query_parser import (
+    build_pre_process_parser,
+    build_query_parser,
+    build_words_phrases_and_wildcards_parser,
+    get_grammar_key,
+    parse_query
+)
+
+# Realistic user queries, from single terms to nested boolean expressions with filters
+BENCHMARK_QUERIES = [
+    'BOLA3',
+    'glycolysis',
+    'E. coli',
+    'dog cat',
+    '"heat shock protein"',
+    'gene* type:pdf',
+    'acetyl-CoA carboxylase',
+    'BRCA1 or BRCA2',
+    'not mitochondria',
+    '"cell wall" and (biosynthesis or assembly)',
+    '(lysine or arginine) and not "amino acid transport"',
+    'metabolic model type:map type:enrichment-table',
+    '("tca cycle" or "krebs cycle") and (citrate or isocitrate or succinate) not yeast',
+    'CRISPR* and (cas9 or cas12 or "guide rna") and not review type:pdf',
+    'fig? (a or b) and "supplementary table" or appendix',
+]
+
+TEXT_FIELDS = ['description', 'data.content', 'filename']
+TEXT_FIELD_BOOSTS = {'description': 1, 'data.content': 1, 'filename': 3}
+
+
+def _time(parse: Callable[[str], object], queries: List[str], iterations: int) -> float:
+    """Returns the mean time to parse a query, in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            parse(query)
+    return (time.perf_counter() - start) / (iterations * len(queries)) * 1e6
+
+
+def benchmark_query_parsing(
+    iterations: int = 100,
+    queries: List[str] = BENCHMARK_QUERIES
+) -> Dict[str, float]:
+    """
+    Returns the mean time to parse a query of `queries`, in microseconds, by way of parsing:
+
+    * uncached: building the grammars for every query
+    * cached_grammar: with the grammars built once
+    * cached_query: with the grammars built once, and the parsed queries cached
+    """
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.elastic import ElasticService
+
+    elastic_service = ElasticService()
+    grammar_key = get_grammar_key(TEXT_FIELDS, TEXT_FIELD_BOOSTS)
+
+    def pre_process(query: str) -> str:
+        elastic_service._get_words_phrases_and_wildcards(query)
+        return elastic_service._pre_process_query(query)
+
+    def parse_uncached(query: str):
+        # parsing with the cached tokenizers only leaves out the cost of building them
+        build_words_phrases_and_wildcards_parser()
+        build_pre_process_parser()
+        build_query_parser(*grammar_key).parseString(pre_process(query))
+
+    def parse_cached_grammar(query: str):
+        elastic_service._get_query_parser(
+            TEXT_FIELDS, TEXT_FIELD_BOOSTS).parseString(pre_process(query))
+
+    def parse_cached_query(query: str):
+        parse_query(pre_process(query), *grammar_key)
+
+    return {
+        'uncached': _time(parse_uncached, queries, iterations),
+        'cached_grammar': _time(parse_cached_grammar, queries, iterations),
+        'cached_query': _time(parse_cached_query, queries, iterations),
+    }
@@ -0,0 +1,231 @@
+"""Parallel full reindex of the files in elastic, used by the `reset-elastic` command.
+
+The files are split in batches, in hash id order, and every batch is indexed
+by one of the worker processes: the worker converts the content of the files
+(see indexable_content_cache.py, content shared by several files is converted
+once) and sends the batch to elastic itself, so the workers are also parallel
+bulk senders. Elastic does not refresh the index while the reindex runs.
+
+The last hash id before which every batch is indexed is kept in a checkpoint
+file, so an interrupted reindex resumes from there instead of from the first
+file. Files that fail to be indexed are added to the outbox (see outbox.py),
+for the elastic indexer to retry, before the checkpoint moves past them.
+"""
+import multiprocessing as mp
+import os
+import time
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from flask import current_app, Flask
+
+from neo4japp.constants import FILE_INDEX_ID, LogEventType
+from neo4japp.database import db, get_elastic_service
+from neo4japp.models.files import FileIndexOperation, Files
+from neo4japp.utils.logger import EventLog
+
+
+# seconds between progress reports
+REPORT_INTERVAL = 30
+
+
+class ReindexProgress:
+    """Keeps track of the throughput of a reindex run."""
+    def __init__(self, total: int):
+        self.total = total
+        self.indexed = 0
+        self.failed = 0
+        self.start = time.time()
+
+    def add(self, indexed: int, failed: int):
+        self.indexed += indexed
+        self.failed += failed
+
+    @property
+    def done(self) -> int:
+        return self.indexed + self.failed
+
+    def report(self) -> str:
+        seconds = time.time() - self.start
+        rate = self.done / seconds if seconds else 0
+        return f'Reindexed {self.done}/{self.total} files ({self.failed} failed), ' \
+            f'{rate:.1f} files/s'
+
+
+class ReindexCheckpoint:
+    """The last hash id before which every batch is indexed, in a file.
+
+    Batches finish out of order, so a batch only moves the checkpoint once
+    every batch before it has finished too.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # last hash id of every finished batch that is not checkpointed yet
+        self.finished: Dict[int, str] = {}
+        self.next_batch = 0
+
+    def read(self) -> Optional[str]:
+        try:
+            with open(self.path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def finish(self, batch: int, last_hash_id: str):
+        self.finished[batch] = last_hash_id
+        checkpoint = None
+        while self.next_batch in self.finished:
+            checkpoint = self.finished.pop(self.next_batch)
+            self.next_batch += 1
+        if checkpoint is None:
+            return
+        # replace the file at once, an interruption keeps the previous checkpoint
+        with open(f'{self.path}.tmp', 'w') as f:
+            f.write(checkpoint)
+        os.replace(f'{self.path}.tmp', self.path)
+
+
+def get_files_to_reindex(after: Optional[str] = None) -> List[str]:
+    query = db.session.query(
+        Files.hash_id
+    ).filter(
+        Files.deletion_date.is_(None),
+        Files.recycling_date.is_(None)
+    ).order_by(Files.hash_id)
+    if after is not None:
+        query = query.filter(Files.hash_id > after)
+    return [hash_id for hash_id, in query]
+
+
+# the app of the worker process, see _init_worker
+_worker_app: Optional[Flask] = None
+
+
+def _init_worker(config: str):
+    global _worker_app
+
+    from neo4japp.factory import create_app
+    _worker_app = create_app(config=config)
+
+
+def _index_batch(hash_ids: List[str]) -> List[str]:
+    """Returns the hash ids of the files that failed to be indexed."""
+    assert _worker_app is not None, 'the worker was not initialized'
+    with _worker_app.app_context():
+        try:
+            return get_elastic_service().index_files(hash_ids, batch_size=len(hash_ids))
+        finally:
+            db.session.remove()
+
+
+def _finish_batch(
+    hash_ids: List[str],
+    batch: int,
+    batch_failed: List[str],
+    progress: ReindexProgress,
+    checkpoint_file: Optional[ReindexCheckpoint]
+):
+    """Queues the failed files of a batch for the elastic indexer, then moves the checkpoint,
+    so that an interrupted run does not skip them."""
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.elastic.outbox import enqueue_files
+
+    if batch_failed:
+        enqueue_files(db.session.connection(), batch_failed, FileIndexOperation.INDEX)
+        db.session.commit()
+    progress.add(len(hash_ids) - len(batch_failed), len(batch_failed))
+    if checkpoint_file:
+        checkpoint_file.finish(batch, hash_ids[-1])
+
+
+def _set_refresh_interval(refresh_interval: Optional[str]):
+    elastic_service = get_elastic_service()
+    elastic_service.elastic_client.indices.put_settings(
+        index=FILE_INDEX_ID,
+        body={'index': {'refresh_interval': refresh_interval}}
+    )
+
+
+def reindex_files(
+    config: str,
+    processes: int,
+    batch_size: int = 100,
+    checkpoint: Optional[str] = None
+) -> ReindexProgress:
+    """Index every file in elastic with `processes` worker processes.
+
+    :param config: the app config the workers are created with
+    :param batch_size: number of files indexed by a worker at once
+    :param checkpoint: file that keeps the last indexed hash id, files up
+        to it are skipped
+    """
+    checkpoint_file = ReindexCheckpoint(checkpoint) if checkpoint else None
+    after = checkpoint_file.read() if checkpoint_file else None
+    files = get_files_to_reindex(after)
+    # the workers use their own connections
+    db.session.close()
+
+    current_app.logger.info(
+        f'Reindexing {len(files)} files' + (f', resuming after {after}.' if after else '.'),
+        extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
+    )
+    progress = ReindexProgress(len(files))
+    if not files:
+        return progress
+
+    batches = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+    _set_refresh_interval('-1')
+    # spawn so the workers do not inherit the database connections
+    executor = ProcessPoolExecutor(
+        max_workers=min(processes, len(batches)),
+        mp_context=mp.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(config,)
+    )
+    try:
+        # only keep a few batches per worker queued, so an interrupted run stops soon
+        max_pending = processes * 2
+        # the batch of every future
+        pending: Dict[Future, int] = {}
+        next_batch = 0
+        last_report = time.time()
+        while next_batch < len(batches) or pending:
+            while next_batch < len(batches) and len(pending) < max_pending:
+                pending[executor.submit(_index_batch, batches[next_batch])] = next_batch
+                next_batch += 1
+
+            done, _ = wait(pending, timeout=REPORT_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                try:
+                    batch_failed = future.result()
+                except Exception as e:
+                    current_app.logger.error(
+                        f'Failed to reindex the batch of files starting at {batches[batch][0]}',
+                        exc_info=e,
+                        extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict()
+                    )
+                    batch_failed = batches[batch]
+                _finish_batch(batches[batch], batch, batch_failed, progress, checkpoint_file)
+
+            if time.time() - last_report >= REPORT_INTERVAL:
+                last_report = time.time()
+                current_app.logger.info(
+                    progress.report(),
+                    extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
+                )
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        # back to the default
+        _set_refresh_interval(None)
+
+    # the next reindex starts over
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    current_app.logger.info(
+        progress.report(),
+        extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict()
+    )
+    return progress
@@ -0,0 +1,147 @@
+"""Domain data of the genes of an enrichment table.
+
+Each domain is a separate graph query over every gene of the table. The
+domains that are requested together are queried concurrently, each in its
+own session of the neo4j driver, instead of one after another.
+
+The result of every (domain, tax id, gene node) is cached in redis, including
+the genes without a result, so reopening a table only queries the genes that
+were not seen before. Gene node ids change when the graph is reloaded, so the
+cache keys include the graph version the cache-invalidator bumps.
+"""
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from neo4japp.constants import EnrichmentDomain, LogEventType
+from neo4japp.services.annotations.organism_match_cache import get_graph_version
+from neo4japp.services.kg_service import KgService
+from neo4japp.services.rcache import redis_server
+from neo4japp.utils.logger import EventLog
+
+
+ENRICHMENT_DOMAIN_CACHE_KEY_PREFIX = 'enrichment_domain'
+ENRICHMENT_DOMAIN_CACHE_EXPIRATION = 3600 * 24
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get(
+                    'ENRICHMENT_DOMAIN_WORKERS', len(EnrichmentDomain)),
+                thread_name_prefix='enrichment-domain')
+        return _executor
+
+
+def _get_domain_functions(kg: KgService, domain: EnrichmentDomain) -> Tuple[Callable, Callable]:
+    """Returns the query of the domain and the function formatting its results."""
+    return {
+        EnrichmentDomain.REGULON: (kg.get_regulon_genes_query, kg.format_regulon_genes),
+        EnrichmentDomain.BIOCYC: (kg.get_biocyc_genes_query, kg.format_biocyc_genes),
+        EnrichmentDomain.GO: (kg.get_go_genes_query, kg.format_go_genes),
+        EnrichmentDomain.STRING: (kg.get_string_genes_query, kg.format_string_genes),
+        EnrichmentDomain.UNIPROT: (kg.get_uniprot_genes_query, kg.format_uniprot_genes),
+        EnrichmentDomain.KEGG: (kg.get_kegg_genes_query, kg.format_kegg_genes),
+    }[domain]
+
+
+def _get_cache_key(version: int, domain: EnrichmentDomain, tax_id: str, node_id: int) -> str:
+    return f'{ENRICHMENT_DOMAIN_CACHE_KEY_PREFIX}:{version}:{domain.value}:{tax_id}:{node_id}'
+
+
+def _read(query: Callable, node_ids: List[int]) -> Tuple[List[dict], float]:
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.database import graph
+
+    start = time.time()
+    # sessions are not thread safe, every query gets its own
+    with graph.session() as session:
+        results = session.read_transaction(query, node_ids)
+    return results, time.time() - start
+
+
+def _query_domains(
+    kg: KgService,
+    node_ids: Dict[EnrichmentDomain, List[int]],
+    tax_id: str
+) -> Dict[EnrichmentDomain, dict]:
+    """Returns the formatted results of every domain for its node ids."""
+    futures = {
+        domain: _get_executor().submit(_read, _get_domain_functions(kg, domain)[0], ids)
+        for domain, ids in node_ids.items()
+    }
+
+    formatted = {}
+    for domain, future in futures.items():
+        results, elapsed = future.result()
+        current_app.logger.info(
+            f'Enrichment {domain.value} KG query time {elapsed}',
+            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
+        )
+        formatted[domain] = _get_domain_functions(kg, domain)[1](results, tax_id)
+    return formatted
+
+
+def get_enrichment_domains(
+    kg: KgService,
+    node_ids: List[int],
+    tax_id: str,
+    domains: List[EnrichmentDomain]
+) -> Dict[EnrichmentDomain, Dict[int, Optional[dict]]]:
+    """Returns {domain: {node id: result or None}} for the requested domains."""
+    version = None
+    if current_app.config.get('ENRICHMENT_DOMAIN_CACHE', True):
+        version = get_graph_version()
+
+    results: Dict[EnrichmentDomain, Dict[int, Optional[dict]]] = {
+        domain: {} for domain in domains}
+    misses: Dict[EnrichmentDomain, List[int]] = {domain: [] for domain in domains}
+
+    keys = [(domain, node_id) for domain in domains for node_id in node_ids]
+    cached: List[Optional[bytes]] = [None] * len(keys)
+    if version is not None and keys:
+        try:
+            cached = redis_server.mget([
+                _get_cache_key(version, domain, tax_id, node_id) for domain, node_id in keys])
+        except RedisError:
+            version = None
+
+    for (domain, node_id), value in zip(keys, cached):
+        if value is None:
+            misses[domain].append(node_id)
+        else:
+            results[domain][node_id] = json.loads(value)
+
+    misses = {domain: ids for domain, ids in misses.items() if ids}
+    if not misses:
+        return results
+
+    queried = _query_domains(kg, misses, tax_id)
+    for domain, ids in misses.items():
+        for node_id in ids:
+            results[domain][node_id] = queried[domain].get(node_id)
+
+    if version is not None:
+        try:
+            pipe = redis_server.pipeline()
+            for domain, ids in misses.items():
+                for node_id in ids:
+                    pipe.set(
+                        _get_cache_key(version, domain, tax_id, node_id),
+                        json.dumps(results[domain][node_id]),
+                        ex=ENRICHMENT_DOMAIN_CACHE_EXPIRATION)
+            pipe.execute()
+        except RedisError:
+            pass
+    return results
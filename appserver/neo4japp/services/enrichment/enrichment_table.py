@@ -8,8 +8,8 @@ from typing import List
 
 from neo4japp.constants import EnrichmentDomain, LogEventType
 from neo4japp.exceptions import AnnotationError, ServerException
-from neo4japp.models import DomainURLsMap
 from neo4japp.services import KgService
+from neo4japp.services.domain_urls import domain_url_resolver
 from neo4japp.services.enrichment.data_transfer_objects import EnrichmentCellTextMapping
 from neo4japp.schemas.formats.enrichment_tables import validate_enrichment_table
 from neo4japp.utils.logger import EventLog
@@ -82,10 +82,9 @@ class EnrichmentTableService(KgService):
         """
         results = self.graph.read_transaction(self.match_ncbi_genes_query, gene_names, organism)
 
-        domain = self.session.query(DomainURLsMap).filter(
-            DomainURLsMap.domain == 'NCBI_Gene').one_or_none()
+        base_url = domain_url_resolver.get_url_map(self.session).get('NCBI_Gene')
 
-        if domain is None:
+        if base_url is None:
             raise ServerException(
                 title='Could not create enrichment table',
                 message='There was a problem finding NCBI domain URLs.')
@@ -95,7 +94,7 @@ class EnrichmentTableService(KgService):
             'synonym': result['synonym'],
             'geneNeo4jId': result['gene_neo4j_id'],
             'synonymNeo4jId': result['syn_neo4j_id'],
-            'link': domain.base_URL.format(result['gene_id']) if result['gene_id'] else ''
+            'link': base_url.format(result['gene_id']) if result['gene_id'] else ''
         } for result in results]
 
     def match_ncbi_genes_query(
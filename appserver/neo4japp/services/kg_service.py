@@ -1,5 +1,3 @@
-import time
-
 from flask import current_app
 from neo4j import Transaction as Neo4jTx
 from neo4j.graph import Node as N4jDriverNode, Relationship as N4jDriverRelationship
@@ -10,8 +8,8 @@ from neo4japp.constants import (
 )
 from neo4japp.exceptions import ServerException
 from neo4japp.services.common import HybridDBDao
+from neo4japp.services.domain_urls import domain_url_resolver
 from neo4japp.models import (
-    DomainURLsMap,
     GraphNode,
     GraphRelationship
 )
@@ -143,22 +141,10 @@ class KgService(HybridDBDao):
 
             return self._neo4j_objs_to_graph_objs(nodes, relationships)
 
-    def get_uniprot_genes(self, ncbi_gene_ids: List[int]):
-        start = time.time()
-        results = self.graph.read_transaction(
-            self.get_uniprot_genes_query,
-            ncbi_gene_ids
-        )
-
-        current_app.logger.info(
-            f'Enrichment UniProt KG query time {time.time() - start}',
-            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
-        )
+    def format_uniprot_genes(self, results: List[dict], tax_id: str):
+        base_url = domain_url_resolver.get_url_map(self.session).get('uniprot')
 
-        domain = self.session.query(DomainURLsMap).filter(
-            DomainURLsMap.domain == 'uniprot').one_or_none()
-
-        if domain is None:
+        if base_url is None:
             raise ServerException(
                 title='Could not create enrichment table',
                 message='There was a problem finding UniProt domain URLs.')
@@ -166,43 +152,17 @@ class KgService(HybridDBDao):
         return {
             result['node_id']: {
                 'result': {'id': result['uniprot_id'], 'function': result['function']},
-                'link': domain.base_URL.format(result['uniprot_id'])
+                'link': base_url.format(result['uniprot_id'])
             } for result in results}
 
-    def get_string_genes(self, ncbi_gene_ids: List[int]):
-        start = time.time()
-        results = self.graph.read_transaction(
-            self.get_string_genes_query,
-            ncbi_gene_ids
-        )
-
-        current_app.logger.info(
-            f'Enrichment String KG query time {time.time() - start}',
-            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
-        )
-
+    def format_string_genes(self, results: List[dict], tax_id: str):
         return {
             result['node_id']: {
                 'result': {'id': result['string_id'], 'annotation': result['annotation']},
                 'link': f"https://string-db.org/cgi/network?identifiers={result['string_id']}"
             } for result in results}
 
-    def get_biocyc_genes(
-        self,
-        ncbi_gene_ids: List[int],
-        tax_id: str
-    ):
-        start = time.time()
-        results = self.graph.read_transaction(
-            self.get_biocyc_genes_query,
-            ncbi_gene_ids
-        )
-
-        current_app.logger.info(
-            f'Enrichment Biocyc KG query time {time.time() - start}',
-            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
-        )
-
+    def format_biocyc_genes(self, results: List[dict], tax_id: str):
         return {
             result['node_id']: {
                 'result': result['pathways'],
@@ -210,54 +170,21 @@ class KgService(HybridDBDao):
                     if tax_id in BIOCYC_ORG_ID_DICT else f"https://biocyc.org/gene?id={result['biocyc_id']}"  # noqa
             } for result in results}
 
-    def get_go_genes(self, ncbi_gene_ids: List[int]):
-        start = time.time()
-        results = self.graph.read_transaction(
-            self.get_go_genes_query,
-            ncbi_gene_ids,
-        )
-
-        current_app.logger.info(
-            f'Enrichment GO KG query time {time.time() - start}',
-            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
-        )
-
+    def format_go_genes(self, results: List[dict], tax_id: str):
         return {
             result['node_id']: {
                 'result': result['go_terms'],
                 'link': 'https://www.ebi.ac.uk/QuickGO/annotations?geneProductId='
             } for result in results}
 
-    def get_regulon_genes(self, ncbi_gene_ids: List[int]):
-        start = time.time()
-        results = self.graph.read_transaction(
-            self.get_regulon_genes_query,
-            ncbi_gene_ids
-        )
-
-        current_app.logger.info(
-            f'Enrichment Regulon KG query time {time.time() - start}',
-            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
-        )
-
+    def format_regulon_genes(self, results: List[dict], tax_id: str):
         return {
             result['node_id']: {
                 'result': result['node'],
                 'link': f"http://regulondb.ccg.unam.mx/gene?term={result['regulondb_id']}&organism=ECK12&format=jsp&type=gene"  # noqa
             } for result in results}
 
-    def get_kegg_genes(self, ncbi_gene_ids: List[int]):
-        start = time.time()
-        results = self.graph.read_transaction(
-            self.get_kegg_genes_query,
-            ncbi_gene_ids
-        )
-
-        current_app.logger.info(
-            f'Enrichment KEGG KG query time {time.time() - start}',
-            extra=EventLog(event_type=LogEventType.ENRICHMENT.value).to_dict()
-        )
-
+    def format_kegg_genes(self, results: List[dict], tax_id: str):
         return {
             result['node_id']: {
                 'result': result['pathway'],
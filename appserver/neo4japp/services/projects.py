@@ -98,6 +98,7 @@ class ProjectsService(RDBMSBaseDao):
                 'projects_id': projects.id,
             }]
         )
+        self._enqueue_principals_update(projects)
 
     def add_collaborator(self, user: AppUser, role: AppRole, projects: Projects):
         self.add_collaborator_uncommitted(user, role, projects)
@@ -117,6 +118,7 @@ class ProjectsService(RDBMSBaseDao):
                 )
             )
         )
+        self._enqueue_principals_update(projects)
 
         self.session.commit()
 
@@ -131,4 +133,21 @@ class ProjectsService(RDBMSBaseDao):
                 )
             )
         )
+        self._enqueue_principals_update(projects)
         self.session.commit()
+
+    def _enqueue_principals_update(self, projects: Projects):
+        """ Update who can read the files of the project in elastic """
+        # Import what we need, when we need it (Helps to avoid circular dependencies)
+        from neo4japp.models.files import FileIndexOperation
+        from neo4japp.services.elastic.outbox import enqueue_file_family
+
+        # The files of a new project are not indexed yet
+        if projects.root_id is None:
+            return
+        enqueue_file_family(
+            self.session.connection(),
+            projects.root_id,
+            FileIndexOperation.UPDATE,
+            {'principals'}
+        )
@@ -0,0 +1,157 @@
+"""Snippet counts and pages of the visualizer associations.
+
+The snippets of an edge, a cluster or a node pair are paged over a stable
+ordering: associations by snippet count (descending), then from id, to id
+and description; the snippets of an association by publication year
+(descending), then snippet id and PubMed id.
+
+The snippet count of every association of a query is computed once per graph
+version and cached in redis, so a page request knows which associations the
+page spans without counting the snippets again, and only queries the
+snippets of those associations. Within the first association of the page
+the snippets are found with the cursor of the previous page (keyset) rather
+than by skipping the snippets before it.
+"""
+import base64
+import hashlib
+import json
+
+from typing import Callable, List, Optional
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from neo4japp.exceptions import InvalidArgument
+from neo4japp.services.annotations.organism_match_cache import get_graph_version
+from neo4japp.services.rcache import redis_server
+
+
+SNIPPET_COUNT_CACHE_KEY_PREFIX = 'snippet_counts'
+SNIPPET_COUNT_CACHE_EXPIRATION = 3600 * 24
+
+CURSOR_KEYS = {'position', 'from_id', 'to_id', 'description', 'pub_year', 'snippet_id', 'pmid'}
+
+
+def _get_cache_key(version: int, query: str, params: dict) -> str:
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'{SNIPPET_COUNT_CACHE_KEY_PREFIX}:{version}:{query}:{digest}'
+
+
+def get_snippet_counts(
+    query: str,
+    params: dict,
+    fetch: Callable[[], List[dict]]
+) -> List[dict]:
+    """Returns the {from_id, to_id, description, count} of the associations of
+    a snippet query, in page order.
+
+    :param query: name of the query, params are the parameters of the query
+    :param fetch: counts the snippets in the graph
+    """
+    version = None
+    if current_app.config.get('SNIPPET_COUNT_CACHE', True):
+        version = get_graph_version()
+    if version is None:
+        return fetch()
+
+    key = _get_cache_key(version, query, params)
+    try:
+        cached = redis_server.get(key)
+    except RedisError:
+        cached = None
+    if cached:
+        return json.loads(cached)
+
+    counts = fetch()
+    try:
+        redis_server.set(key, json.dumps(counts), ex=SNIPPET_COUNT_CACHE_EXPIRATION)
+    except RedisError:
+        pass
+    return counts
+
+
+def encode_cursor(position: int, reference: dict, association: dict) -> str:
+    """Returns the cursor that follows the reference, which was at the
+    position (counted from 0) of the snippet ordering."""
+    # the snippets are ordered with the missing years last, as -1
+    pub_year = reference['publication']['data']['pub_year']
+    return base64.urlsafe_b64encode(json.dumps({
+        'position': position,
+        'from_id': association['from_id'],
+        'to_id': association['to_id'],
+        'description': association['description'],
+        'pub_year': pub_year if pub_year is not None else -1,
+        'snippet_id': reference['snippet']['id'],
+        'pmid': reference['publication']['id'],
+    }).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(decoded['position'], int) or not CURSOR_KEYS <= decoded.keys():
+            raise ValueError(cursor)
+    except (ValueError, KeyError, TypeError):
+        raise InvalidArgument(
+            title='Failed to Get Snippets',
+            message='The page cursor is not valid.')
+    return decoded
+
+
+def get_page_offset(limit: int, page: int = 1, cursor: Optional[dict] = None) -> int:
+    """Returns the position (counted from 0) of the first snippet of the page."""
+    if cursor is not None:
+        return cursor['position'] + 1
+    return (page - 1) * limit
+
+
+def plan_snippet_page(
+    counts: List[dict],
+    offset: int,
+    limit: int,
+    cursor: Optional[dict] = None
+) -> List[dict]:
+    """Returns the associations that the page of snippets spans, with their
+    rank and where the page starts in the first one: either 'skip' snippets,
+    or the snippets 'after' the cursor.
+
+    The cursor is only used if it still points into the association it was
+    created in, otherwise the snippets before the page are skipped.
+    """
+    associations = []
+    start = 0
+    for rank, association in enumerate(counts):
+        end = start + association['count']
+        if end > offset and start < offset + limit:
+            associations.append({
+                'rank': rank,
+                'from_id': association['from_id'],
+                'to_id': association['to_id'],
+                'description': association['description'],
+                'skip': max(offset - start, 0),
+                'after': None,
+            })
+        start = end
+
+    if associations and cursor is not None:
+        first = associations[0]
+        if first['skip'] and all(
+            cursor[key] == first[key] for key in ('from_id', 'to_id', 'description')
+        ):
+            first['after'] = {key: cursor[key] for key in ('pub_year', 'snippet_id', 'pmid')}
+            first['skip'] = 0
+    return associations
+
+
+def get_next_cursor(counts: List[dict], offset: int, results: List[dict]) -> Optional[str]:
+    """Returns the cursor of the page after the results of a page query,
+    or None if it was the last page."""
+    returned = sum(len(result['references']) for result in results)
+    if not returned:
+        return None
+
+    position = offset + returned - 1
+    if position + 1 >= sum(association['count'] for association in counts):
+        return None
+    last = results[-1]
+    return encode_cursor(position, last['references'][-1], last)
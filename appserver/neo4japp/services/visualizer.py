@@ -1,6 +1,6 @@
 from flask.globals import current_app
 from neo4j import Record as Neo4jRecord, Transaction as Neo4jTx
-from typing import List
+from typing import List, Optional, Tuple
 
 from neo4japp.constants import (
     LogEventType,
@@ -26,8 +26,15 @@ from neo4japp.data_transfer_objects.visualization import (
     GetAssociatedTypesResult,
 )
 from neo4japp.models import GraphNode
-from neo4japp.models.entity_resources import DomainURLsMap
 from neo4japp.services import KgService
+from neo4japp.services.domain_urls import domain_url_resolver
+from neo4japp.services.snippet_counts import (
+    decode_cursor,
+    get_next_cursor,
+    get_page_offset,
+    get_snippet_counts,
+    plan_snippet_page
+)
 from neo4japp.util import get_first_known_label_from_list, snake_to_camel_dict
 from neo4japp.utils.logger import EventLog
 
@@ -36,67 +43,61 @@ class VisualizerService(KgService):
     def __init__(self, graph, session):
         super().__init__(graph=graph, session=session)
 
-    def _get_uri_of_node_data(self, id: int, label: str, entity_id: str):
-        """Given node meta data returns the appropriate
-        URL formatted with the node entity identifier.
+    def _get_domain_of_node_data(
+        self,
+        label: str,
+        entity_id: str
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Given node meta data returns the domain of its URL
+        and the identifier to format it with.
         """
-        url_map = {
-            domain: base_url
-            for domain, base_url in self.session.query(
-                DomainURLsMap.domain,
-                DomainURLsMap.base_URL,
-            )
-        }
-
-        # Can't get the URI of the node if there is no 'eid' property, so return None
-        if entity_id is None:
-            current_app.logger.warning(
-                f'Node with EID {entity_id} does not have a URI.',
-                extra=EventLog(event_type=LogEventType.KNOWLEDGE_GRAPH.value).to_dict()
-            )
-            return None
-
-        url = None
         try:
-            if label == TYPE_CHEMICAL:
+            if label in (TYPE_CHEMICAL, TYPE_LITERATURE_CHEMICAL):
                 db_prefix, uid = entity_id.split(':')
-                if db_prefix == 'CHEBI':
-                    url = url_map['chebi'].format(uid)
-                else:
-                    url = url_map['MESH'].format(uid)
-            elif label == TYPE_DISEASE:
+                return ('chebi' if db_prefix == 'CHEBI' else 'MESH'), uid
+            elif label in (TYPE_DISEASE, TYPE_LITERATURE_DISEASE):
                 db_prefix, uid = entity_id.split(':')
-                if db_prefix == 'MESH':
-                    url = url_map['MESH'].format(uid)
-                else:
-                    url = url_map['omim'].format(uid)
-            elif label == TYPE_GENE:
-                url = url_map['NCBI_Gene'].format(entity_id)
-            elif label == TYPE_LITERATURE_CHEMICAL:
-                db_prefix, uid = entity_id.split(':')
-                if db_prefix == 'CHEBI':
-                    url = url_map['chebi'].format(uid)
-                else:
-                    url = url_map['MESH'].format(uid)
-            elif label == TYPE_LITERATURE_DISEASE:
-                db_prefix, uid = entity_id.split(':')
-                if db_prefix == 'MESH':
-                    url = url_map['MESH'].format(uid)
-                else:
-                    url = url_map['omim'].format(uid)
-            elif label == TYPE_LITERATURE_GENE:
-                url = url_map['NCBI_Gene'].format(entity_id)
-        except KeyError:
-            current_app.logger.warning(
-                f'url_map did not contain the expected key value for node with:\n' +
-                f'\tID: {id}\n'
-                f'\tLabel: {label}\n' +
-                f'\tURI: {entity_id}\n'
-                'There may be something wrong in the database.',
-                extra=EventLog(event_type=LogEventType.KNOWLEDGE_GRAPH.value).to_dict()
-            )
-        finally:
-            return url
+                return ('MESH' if db_prefix == 'MESH' else 'omim'), uid
+            elif label in (TYPE_GENE, TYPE_LITERATURE_GENE):
+                return 'NCBI_Gene', entity_id
+        except ValueError:
+            # malformed identifier
+            pass
+        return None, None
+
+    def _get_uris_of_node_data(self, nodes: List[Tuple[int, str, str]]) -> List[Optional[str]]:
+        """Given the (id, label, entity_id) of nodes returns the appropriate
+        URLs formatted with the node entity identifiers.
+        """
+        url_map = domain_url_resolver.get_url_map(self.session)
+
+        urls: List[Optional[str]] = []
+        for id, label, entity_id in nodes:
+            # Can't get the URI of the node if there is no 'eid' property, so return None
+            if entity_id is None:
+                current_app.logger.warning(
+                    f'Node with EID {entity_id} does not have a URI.',
+                    extra=EventLog(event_type=LogEventType.KNOWLEDGE_GRAPH.value).to_dict()
+                )
+                urls.append(None)
+                continue
+
+            domain, uid = self._get_domain_of_node_data(label, entity_id)
+            if domain is None:
+                urls.append(None)
+            elif domain not in url_map:
+                current_app.logger.warning(
+                    f'url_map did not contain the expected key value for node with:\n' +
+                    f'\tID: {id}\n'
+                    f'\tLabel: {label}\n' +
+                    f'\tURI: {entity_id}\n'
+                    'There may be something wrong in the database.',
+                    extra=EventLog(event_type=LogEventType.KNOWLEDGE_GRAPH.value).to_dict()
+                )
+                urls.append(None)
+            else:
+                urls.append(url_map[domain].format(uid))
+        return urls
 
     def expand_graph(self, node_id: str, filter_labels: List[str]):
         result = self.graph.read_transaction(self.get_expand_query, node_id, filter_labels)
@@ -107,12 +108,19 @@ class VisualizerService(KgService):
             node_data = result[0]['nodes']
             edge_data = result[0]['relationships']
 
-        nodes = []
+        labels = []
         for data in node_data:
             try:
-                label = get_first_known_label_from_list(data['labels'])
+                labels.append(get_first_known_label_from_list(data['labels']))
             except ValueError:
-                label = 'Unknown'
+                labels.append('Unknown')
+
+        urls = self._get_uris_of_node_data([
+            (data['id'], label, data['entity_id']) for data, label in zip(node_data, labels)
+        ])
+
+        nodes = []
+        for data, label, url in zip(node_data, labels, urls):
             nodes.append({
                 'id': data['id'],
                 'label': label,
@@ -123,7 +131,7 @@ class VisualizerService(KgService):
                 },
                 'subLabels': data['labels'],
                 'displayName': data['name'],
-                'entityUrl': self._get_uri_of_node_data(data['id'], label, data['entity_id'])
+                'entityUrl': url
             })
 
         edges = []
@@ -154,48 +162,61 @@ class VisualizerService(KgService):
 
         return {'nodes': nodes, 'edges': edges}
 
-    def get_snippets_from_edges(
+    def get_snippet_counts_from_edges(
         self,
         from_ids: List[int],
         to_ids: List[int],
-        description: str,
-        page: int,
-        limit: int
-    ):
-        return self.graph.read_transaction(
-            self.get_snippets_from_edges_query,
-            from_ids,
-            to_ids,
-            description,
-            (page - 1) * limit,
-            limit
+        description: str
+    ) -> List[dict]:
+        from_ids = sorted(from_ids)
+        to_ids = sorted(to_ids)
+        return get_snippet_counts(
+            'edges',
+            {'from_ids': from_ids, 'to_ids': to_ids, 'description': description},
+            lambda: self.graph.read_transaction(
+                self.get_snippet_counts_from_edges_query,
+                from_ids,
+                to_ids,
+                description
+            )
+        )
+
+    def get_snippet_counts_from_node_pair(self, node_1_id: int, node_2_id: int) -> List[dict]:
+        return get_snippet_counts(
+            'node_pair',
+            {'node_1_id': node_1_id, 'node_2_id': node_2_id},
+            lambda: self.graph.read_transaction(
+                self.get_snippet_counts_from_node_pair_query,
+                node_1_id,
+                node_2_id
+            )
         )
 
-    def get_snippets_from_node_pair(
+    def get_snippet_page(
         self,
-        node_1_id: int,
-        node_2_id: int,
+        counts: List[dict],
         page: int,
-        limit: int
-    ):
-        return self.graph.read_transaction(
-            self.get_snippets_from_node_pair_query,
-            node_1_id,
-            node_2_id,
-            (page - 1) * limit,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Returns the snippets of the page grouped by association, in page
+        order, and the cursor of the next page.
+
+        :param counts: the snippet counts of the associations, in page order
+        """
+        cursor_data = decode_cursor(cursor) if cursor else None
+        offset = get_page_offset(limit, page, cursor_data)
+        associations = plan_snippet_page(counts, offset, limit, cursor_data)
+        if not associations:
+            return [], None
+
+        results = self.graph.read_transaction(
+            self.get_snippets_from_associations_query,
+            associations,
+            associations[0]['skip'],
             limit
         )
-
-    def get_snippet_count_from_node_pair(
-        self,
-        node_1_id: int,
-        node_2_id: int,
-    ):
-        return self.graph.read_transaction(
-            self.get_snippet_count_from_node_pair_query,
-            node_1_id,
-            node_2_id
-        )['snippet_count']
+        return results, get_next_cursor(counts, offset, results)
 
     def get_reference_table_data(self, node_edge_pairs: List[ReferenceTablePair]):
         # For duplicate edges, We need to remember which true node ID pairs map to which
@@ -213,12 +234,7 @@ class VisualizerService(KgService):
         description = node_edge_pairs[0].edge.label  # Every edge should have the same label
         direction = Direction.FROM.value if len(from_ids) == 1 else Direction.TO.value
 
-        counts = self.graph.read_transaction(
-            self.get_snippet_count_from_edges_query,
-            from_ids,
-            to_ids,
-            description
-        )
+        counts = self.get_snippet_counts_from_edges(from_ids, to_ids, description)
 
         reference_table_rows: List[ReferenceTableRow] = []
         for row in counts:
@@ -240,19 +256,15 @@ class VisualizerService(KgService):
         edge: EdgeConnectionData,
         page: int,
         limit: int,
+        cursor: Optional[str] = None,
     ) -> GetEdgeSnippetsResult:
         from_ids = [edge.from_]
         to_ids = [edge.to]
         description = edge.label  # Every edge should have the same label
 
-        data = self.get_snippets_from_edges(from_ids, to_ids, description, page, limit)
-        count_results = self.graph.read_transaction(
-            self.get_snippet_count_from_edges_query,
-            from_ids,
-            to_ids,
-            description
-        )
-        total_results = sum(row['count'] for row in count_results)
+        counts = self.get_snippet_counts_from_edges(from_ids, to_ids, description)
+        total_results = sum(row['count'] for row in counts)
+        data, next_cursor = self.get_snippet_page(counts, page, limit, cursor)
 
         # `data` is either length 0 or 1
         snippets = []
@@ -292,6 +304,7 @@ class VisualizerService(KgService):
             snippet_data=result,
             total_results=total_results,
             query_data=edge,
+            next_cursor=next_cursor,
         )
 
     def get_snippets_for_cluster(
@@ -299,6 +312,7 @@ class VisualizerService(KgService):
         edges: List[DuplicateEdgeConnectionData],
         page: int,
         limit: int,
+        cursor: Optional[str] = None,
     ) -> GetClusterSnippetsResult:
         # For duplicate edges, We need to remember which true node ID pairs map to which
         # duplicate node ID pairs, otherwise when we send the data back to the frontend
@@ -314,14 +328,9 @@ class VisualizerService(KgService):
         to_ids = list({edge.original_to for edge in edges})
         description = edges[0].label  # Every edge should have the same label
 
-        data = self.get_snippets_from_edges(from_ids, to_ids, description, page, limit)
-        count_results = self.graph.read_transaction(
-            self.get_snippet_count_from_edges_query,
-            from_ids,
-            to_ids,
-            description
-        )
-        total_results = sum(row['count'] for row in count_results)
+        counts = self.get_snippet_counts_from_edges(from_ids, to_ids, description)
+        total_results = sum(row['count'] for row in counts)
+        data, next_cursor = self.get_snippet_page(counts, page, limit, cursor)
 
         results = [
             GetSnippetsFromEdgeResult(
@@ -355,6 +364,7 @@ class VisualizerService(KgService):
             snippet_data=results,
             total_results=total_results,
             query_data=edges,
+            next_cursor=next_cursor,
         )
 
     def get_associated_type_snippet_count(
@@ -378,9 +388,11 @@ class VisualizerService(KgService):
         node_2_id: int,
         page: int,
         limit: int,
+        cursor: Optional[str] = None,
     ):
-        data = self.get_snippets_from_node_pair(node_1_id, node_2_id, page, limit)
-        total_results = self.get_snippet_count_from_node_pair(node_1_id, node_2_id)
+        counts = self.get_snippet_counts_from_node_pair(node_1_id, node_2_id)
+        total_results = sum(row['count'] for row in counts)
+        data, next_cursor = self.get_snippet_page(counts, page, limit, cursor)
 
         results = [
             GetSnippetsFromEdgeResult(
@@ -414,6 +426,7 @@ class VisualizerService(KgService):
             snippet_data=results,
             total_results=total_results,
             query_data={'node_1_id': node_1_id, 'node_2_id': node_2_id},
+            next_cursor=next_cursor,
         )
 
     def get_expand_query(self, tx: Neo4jTx, node_id: str, labels: List[str]) -> List[Neo4jRecord]:
@@ -488,232 +501,135 @@ class VisualizerService(KgService):
             ).data()
         )
 
-    def get_snippets_from_edges_query(
+    def get_snippets_from_associations_query(
         self,
         tx: Neo4jTx,
-        from_ids: List[int],
-        to_ids: List[int],
-        description: str,
+        associations: List[dict],
         skip: int,
         limit: int
-    ) -> List[Neo4jRecord]:
-        return list(
-            tx.run(
-                """
-                MATCH (f)-[:HAS_ASSOCIATION]->(a:Association)-[:HAS_ASSOCIATION]->(t)
-                WHERE
-                    ID(f) IN $from_ids AND
-                    ID(t) IN $to_ids AND
-                    a.description=$description
-                WITH
-                    a AS association,
-                    ID(f) AS from_id,
-                    ID(t) AS to_id,
-                    a.description AS description
-                MATCH (association)<-[r:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
-                WITH
-                    s,
-                    p,
-                    head(collect(r)) as sample_path,
-                    coalesce(association.entry1_type, 'Unknown') as entry1_type,
-                    coalesce(association.entry2_type, 'Unknown') as entry2_type,
-                    from_id,
-                    to_id,
-                    description
-                WITH
-                    collect({snippet: s, publication: p, path: sample_path}) as references,
-                    count({snippet: s, publication: p, path: sample_path}) as snippet_count,
-                    entry1_type,
-                    entry2_type,
-                    from_id,
-                    to_id,
-                    description
-                UNWIND references as reference
-                WITH
-                    entry1_type,
-                    entry2_type,
-                    {
-                        snippet: {
-                            id: reference.snippet.eid,
-                            data: {
-                                entry1_text: reference.path.entry1_text,
-                                entry2_text: reference.path.entry2_text,
-                                entry1_type: entry1_type,
-                                entry2_type: entry2_type,
-                                sentence: reference.snippet.sentence
-                            }
-                        },
-                        publication: {
-                            id: reference.publication.pmid,
-                            data: {
-                                journal: reference.publication.journal,
-                                title: reference.publication.title,
-                                pmid: reference.publication.pmid,
-                                pub_year: reference.publication.pub_year
-                            }
+    ) -> List[dict]:
+        """Returns the snippets of the associations planned by `plan_snippet_page`,
+        the page starts `skip` snippets into, or after the cursor of, the first
+        association."""
+        return tx.run(
+            """
+            UNWIND $associations AS association
+            MATCH (f)-[:HAS_ASSOCIATION]->(a:Association)-[:HAS_ASSOCIATION]->(t)
+            WHERE
+                ID(f)=association.from_id AND
+                ID(t)=association.to_id AND
+                a.description=association.description
+            MATCH (a)<-[r:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
+            WITH
+                association,
+                s,
+                p,
+                coalesce(p.pub_year, -1) AS pub_year,
+                head(collect(r)) AS sample_path,
+                coalesce(head(collect(a.entry1_type)), 'Unknown') AS entry1_type,
+                coalesce(head(collect(a.entry2_type)), 'Unknown') AS entry2_type
+            WHERE
+                association.after IS NULL OR
+                pub_year < association.after.pub_year OR (
+                    pub_year = association.after.pub_year AND (
+                        s.eid > association.after.snippet_id OR (
+                            s.eid = association.after.snippet_id AND
+                            p.pmid > association.after.pmid
+                        )
+                    )
+                )
+            WITH association, s, p, pub_year, sample_path, entry1_type, entry2_type
+            ORDER BY association.rank, pub_year DESC, s.eid, p.pmid
+            SKIP $skip LIMIT $limit
+            WITH
+                association,
+                collect({
+                    snippet: {
+                        id: s.eid,
+                        data: {
+                            entry1_text: sample_path.entry1_text,
+                            entry2_text: sample_path.entry2_text,
+                            entry1_type: entry1_type,
+                            entry2_type: entry2_type,
+                            sentence: s.sentence
                         }
-                    } AS reference,
-                    snippet_count,
-                    from_id,
-                    to_id,
-                    description
-                ORDER BY
-                    snippet_count DESC,
-                    [from_id, to_id],
-                    coalesce(reference.publication.data.pub_year, -1) DESC
-                SKIP $skip LIMIT $limit
-                RETURN collect(DISTINCT reference) AS references, from_id, to_id, description
-                """,
-                from_ids=from_ids, to_ids=to_ids, description=description, skip=skip, limit=limit
-            )
-        )
-
-    def get_snippets_from_node_pair_query(
-        self,
-        tx: Neo4jTx,
-        node_1_id: int,
-        node_2_id: int,
-        skip: int,
-        limit: int
-    ) -> List[Neo4jRecord]:
-        return list(
-            tx.run(
-                """
-                MATCH (f)-[r:ASSOCIATED]-(t)
-                WHERE
-                    ID(f)=$node_1_id AND
-                    ID(t)=$node_2_id
-                WITH ID(startNode(r)) as from_id, ID(endNode(r)) as to_id
-                MATCH (f)-[:HAS_ASSOCIATION]->(a:Association)-[:HAS_ASSOCIATION]->(t)
-                WHERE
-                    ID(f)=from_id AND
-                    ID(t)=to_id
-                WITH
-                    a AS association,
-                    from_id,
-                    to_id,
-                    a.description AS description
-                MATCH (association)<-[r:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
-                WITH
-                    s,
-                    p,
-                    head(collect(r)) as sample_path,
-                    coalesce(association.entry1_type, 'Unknown') as entry1_type,
-                    coalesce(association.entry2_type, 'Unknown') as entry2_type,
-                    from_id,
-                    to_id,
-                    description
-                WITH
-                    collect({snippet: s, publication: p, path: sample_path}) as references,
-                    count({snippet: s, publication: p, path: sample_path}) as snippet_count,
-                    entry1_type,
-                    entry2_type,
-                    from_id,
-                    to_id,
-                    description
-                UNWIND references as reference
-                WITH
-                    entry1_type,
-                    entry2_type,
-                    {
-                        snippet: {
-                            id: reference.snippet.eid,
-                            data: {
-                                entry1_text: reference.path.entry1_text,
-                                entry2_text: reference.path.entry2_text,
-                                entry1_type: entry1_type,
-                                entry2_type: entry2_type,
-                                sentence: reference.snippet.sentence
-                            }
-                        },
-                        publication: {
-                            id: reference.publication.pmid,
-                            data: {
-                                journal: reference.publication.journal,
-                                title: reference.publication.title,
-                                pmid: reference.publication.pmid,
-                                pub_year: reference.publication.pub_year
-                            }
+                    },
+                    publication: {
+                        id: p.pmid,
+                        data: {
+                            journal: p.journal,
+                            title: p.title,
+                            pmid: p.pmid,
+                            pub_year: p.pub_year
                         }
-                    } AS reference,
-                    snippet_count,
-                    from_id,
-                    to_id,
-                    description
-                ORDER BY
-                    snippet_count DESC,
-                    [from_id, to_id],
-                    coalesce(reference.publication.data.pub_year, -1) DESC
-                SKIP $skip LIMIT $limit
-                RETURN collect(DISTINCT reference) AS references, from_id, to_id, description
-                """,
-                node_1_id=node_1_id, node_2_id=node_2_id, skip=skip, limit=limit
-            )
-        )
+                    }
+                }) AS references
+            RETURN
+                references,
+                association.rank AS rank,
+                association.from_id AS from_id,
+                association.to_id AS to_id,
+                association.description AS description
+            ORDER BY rank
+            """,
+            associations=associations, skip=skip, limit=limit
+        ).data()
 
-    def get_snippet_count_from_node_pair_query(
+    def get_snippet_counts_from_node_pair_query(
         self,
         tx: Neo4jTx,
         node_1_id: int,
         node_2_id: int
-    ) -> Neo4jRecord:
+    ) -> List[dict]:
+        """Returns the snippet counts of the associations between the nodes, in either
+        direction. Each association is returned from its source to its target node, the
+        way the snippet page query matches it."""
         return tx.run(
             """
-            MATCH (f)-[r:ASSOCIATED]-(t)
+            MATCH (n1)-[r:HAS_ASSOCIATION]-(a:Association)-[:HAS_ASSOCIATION]-(n2)
             WHERE
-                ID(f)=$node_1_id AND
-                ID(t)=$node_2_id
-            WITH ID(startNode(r)) as from_id, ID(endNode(r)) as to_id
-            MATCH (f)-[:HAS_ASSOCIATION]-(a:Association)-[:HAS_ASSOCIATION]-(t)
-            WHERE ID(f)=from_id AND ID(t)=to_id
-            WITH from_id, to_id, a AS association
-            MATCH (association)<-[r:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
-            RETURN
-                count(DISTINCT {
-                    from_id: from_id,
-                    to_id: to_id,
-                    description: association.description,
-                    snippet_id: s.eid
-                }) AS snippet_count
+                ID(n1)=$node_1_id AND
+                ID(n2)=$node_2_id AND
+                exists((n1)-[:ASSOCIATED]-(n2))
+            WITH DISTINCT
+                a,
+                CASE WHEN startNode(r) = n1 THEN [ID(n1), ID(n2)] ELSE [ID(n2), ID(n1)] END AS ids
+            MATCH (a)<-[:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
+            WITH
+                ids[0] AS from_id,
+                ids[1] AS to_id,
+                a.description AS description,
+                count(DISTINCT [ID(s), ID(p)]) AS count
+            RETURN from_id, to_id, description, count
+            ORDER BY count DESC, from_id, to_id, description
             """,
             node_1_id=node_1_id, node_2_id=node_2_id
-        ).single()
+        ).data()
 
-    def get_snippet_count_from_edges_query(
+    def get_snippet_counts_from_edges_query(
         self,
         tx: Neo4jTx,
         from_ids: List[int],
         to_ids: List[int],
         description: str
-    ) -> List[Neo4jRecord]:
-        return list(
-            tx.run(
-                """
-                MATCH (f)-[:HAS_ASSOCIATION]->(a:Association)-[:HAS_ASSOCIATION]->(t)
-                WHERE
-                    ID(f) IN $from_ids AND
-                    ID(t) IN $to_ids AND
-                    a.description=$description
-                WITH
-                    a AS association,
-                    ID(f) AS from_id,
-                    ID(t) AS to_id,
-                    labels(f) AS from_labels,
-                    labels(t) AS to_labels
-                OPTIONAL MATCH (association)<-[r:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
-                WITH
-                    count(DISTINCT {
-                        description: association.description,
-                        snippet_id: s.eid
-                    }) AS snippet_count,
-                    max(p.pub_year) AS max_pub_year,
-                    from_id,
-                    to_id,
-                    from_labels,
-                    to_labels
-                ORDER BY snippet_count DESC, [from_id, to_id], coalesce(max_pub_year, -1) DESC
-                RETURN from_id, to_id, from_labels, to_labels, snippet_count AS count
-                """,
-                from_ids=from_ids, to_ids=to_ids, description=description
-            )
-        )
+    ) -> List[dict]:
+        """Returns the snippet counts of the associations of the edges, including the
+        associations without snippets (for the reference table)."""
+        return tx.run(
+            """
+            MATCH (f)-[:HAS_ASSOCIATION]->(a:Association)-[:HAS_ASSOCIATION]->(t)
+            WHERE
+                ID(f) IN $from_ids AND
+                ID(t) IN $to_ids AND
+                a.description=$description
+            OPTIONAL MATCH (a)<-[:INDICATES]-(s:Snippet)-[:IN_PUB]-(p:Publication)
+            WITH
+                ID(f) AS from_id,
+                ID(t) AS to_id,
+                a.description AS description,
+                count(DISTINCT CASE WHEN s IS NULL THEN NULL ELSE [ID(s), ID(p)] END) AS count
+            RETURN from_id, to_id, description, count
+            ORDER BY count DESC, from_id, to_id, description
+            """,
+            from_ids=from_ids, to_ids=to_ids, description=description
+        ).data()
@@ -11,3 +11,13 @@ def window(seq, n=2):
     for elem in it:
         result = result[1:] + (elem,)
         yield result
+
+
+def chunk(seq, n):
+    """Returns the data from the iterable in tuples of (at most) n items."""
+    it = iter(seq)
+    while True:
+        result = tuple(islice(it, n))
+        if not result:
+            return
+        yield result
@@ -0,0 +1,93 @@
+import pytest
+
+from neo4japp.blueprints import annotations
+from neo4japp.blueprints.annotations import FileAnnotationsGenerationView
+from neo4japp.models import AppUser, Files
+from neo4japp.services.annotations import annotation_jobs
+from neo4japp.services.annotations.annotation_jobs import FAILED_RESULT
+from tests.helpers.annotation_jobs import FakeRedis, ImmediateExecutor
+from tests.helpers.api import generate_jwt_headers
+
+
+@pytest.fixture(scope='function')
+def jobs(monkeypatch):
+    monkeypatch.setattr(annotation_jobs, 'redis_server', FakeRedis())
+    # the job tasks run in the request, so they see the test transaction
+    monkeypatch.setattr(annotation_jobs, '_get_executor', lambda: ImmediateExecutor())
+
+
+@pytest.fixture(scope='function')
+def headers(client, test_user: AppUser):
+    login_resp = client.login_as_user(test_user.email, 'password')
+    return generate_jwt_headers(login_resp['accessToken']['token'])
+
+
+def start_job(client, headers, hash_ids):
+    resp = client.post(
+        '/filesystem/annotations/generate/jobs',
+        headers=headers,
+        json={'hashIds': hash_ids},
+    )
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_user_can_poll_a_finished_annotation_job(
+        client,
+        headers,
+        jobs,
+        test_user_with_pdf: Files,
+        monkeypatch,
+):
+    result = {'attempted': True, 'success': True, 'error': ''}
+    monkeypatch.setattr(
+        FileAnnotationsGenerationView,
+        '_annotate_file',
+        lambda self, **kwargs: (result, None, None))
+
+    job = start_job(client, headers, [test_user_with_pdf.hash_id, 'missing'])
+
+    resp = client.get(f'/filesystem/annotations/generate/jobs/{job["jobId"]}', headers=headers)
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {
+        'jobId': job['jobId'],
+        'total': 1,
+        'completed': 1,
+        'done': True,
+        'mapping': {test_user_with_pdf.hash_id: result},
+        'missing': ['missing'],
+    }
+
+
+def test_annotation_job_records_files_that_fail_outside_of_the_annotation(
+        client,
+        headers,
+        jobs,
+        test_user_with_pdf: Files,
+        monkeypatch,
+):
+    monkeypatch.setattr(
+        FileAnnotationsGenerationView,
+        '_annotate_file',
+        lambda self, **kwargs: ({'attempted': True, 'success': True, 'error': ''}, None, None))
+
+    def set_result(*args, **kwargs):
+        raise RuntimeError('failed to record the result')
+
+    monkeypatch.setattr(annotations, 'set_annotation_job_result', set_result)
+
+    job = start_job(client, headers, [test_user_with_pdf.hash_id])
+
+    resp = client.get(f'/filesystem/annotations/generate/jobs/{job["jobId"]}', headers=headers)
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['done']
+    assert data['mapping'] == {test_user_with_pdf.hash_id: FAILED_RESULT}
+
+
+def test_unknown_annotation_job_is_not_found(client, headers, jobs):
+    resp = client.get('/filesystem/annotations/generate/jobs/unknown', headers=headers)
+
+    assert resp.status_code == 404
@@ -11,14 +11,13 @@ def generate_headers(jwt_token):
 
 def test_user_can_get_gene_annotations_from_pdf(
         client,
-        test_user_with_pdf: Files,
+        test_user_with_annotated_pdf: Files,
         fix_admin_user: AppUser,
-        mock_get_combined_annotations_result,
         mock_get_organisms_from_gene_ids_result,
 ):
     login_resp = client.login_as_user(fix_admin_user.email, 'password')
     headers = generate_headers(login_resp['accessToken']['token'])
-    file_id = test_user_with_pdf.hash_id
+    file_id = test_user_with_annotated_pdf.hash_id
 
     response = client.post(
         f'/filesystem/objects/{file_id}/annotations/gene-counts',
@@ -35,13 +34,12 @@ def test_user_can_get_gene_annotations_from_pdf(
 
 def test_user_can_get_all_annotations_from_pdf(
         client,
-        test_user_with_pdf: Files,
+        test_user_with_annotated_pdf: Files,
         fix_admin_user: AppUser,
-        mock_get_combined_annotations_result,
 ):
     login_resp = client.login_as_user(fix_admin_user.email, 'password')
     headers = generate_headers(login_resp['accessToken']['token'])
-    file_id = test_user_with_pdf.hash_id
+    file_id = test_user_with_annotated_pdf.hash_id
 
     response = client.post(
         f'/filesystem/objects/{file_id}/annotations/counts',
@@ -20,7 +20,7 @@ from neo4japp.models import (
     FallbackOrganism
 )
 from neo4japp.services import AccountService
-from neo4japp.services.annotations import AnnotationGraphService, ManualAnnotationService
+from neo4japp.services.annotations import AnnotationGraphService
 from neo4japp.services.annotations.constants import EntityType, ManualAnnotationType
 from neo4japp.services.elastic import ElasticService
 
@@ -138,32 +138,27 @@ def mock_global_list(fix_admin_user, fix_project, session):
 
 
 @pytest.fixture(scope='function')
-def mock_get_combined_annotations_result(monkeypatch):
-    def get_combined_annotations_result(*args, **kwargs):
-        return [
-            {
-                'meta': {
-                    'type': EntityType.GENE.value,
-                    'id': '945771',
-                },
-                'keyword': 'cysB',
-                'primaryName': 'cysB',
+def test_user_with_annotated_pdf(session, test_user_with_pdf: Files) -> Files:
+    test_user_with_pdf.custom_annotations = [
+        {
+            'meta': {
+                'type': EntityType.GENE.value,
+                'id': '945771',
             },
-            {
-                'meta': {
-                    'type': EntityType.SPECIES.value,
-                    'id': '511145',
-                },
-                'keyword': 'e. coli',
-                'primaryName': 'Escherichia coli str. K-12 substr. MG1655',
+            'keyword': 'cysB',
+            'primaryName': 'cysB',
+        },
+        {
+            'meta': {
+                'type': EntityType.SPECIES.value,
+                'id': '511145',
             },
-        ]
-
-    monkeypatch.setattr(
-        ManualAnnotationService,
-        'get_file_annotations',
-        get_combined_annotations_result,
-    )
+            'keyword': 'e. coli',
+            'primaryName': 'Escherichia coli str. K-12 substr. MG1655',
+        },
+    ]
+    session.flush()
+    return test_user_with_pdf
 
 
 @pytest.fixture(scope='function')
@@ -40,16 +40,9 @@ def return_fields():
 
 
 @pytest.fixture(scope='function')
-def filter_(fix_project):
+def filter_(test_user):
     return [
-            {
-                'bool': {
-                    'should': [
-                        {'terms': {'project_id': [fix_project.id]}},
-                        {'term': {'public': True}}
-                    ]
-                }
-            },
+            {'terms': {'principals': ['public', f'user:{test_user.id}']}},
             {
                 'bool': {
                     'must_not': [
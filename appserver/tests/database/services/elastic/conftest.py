@@ -0,0 +1,37 @@
+import pytest
+
+from neo4japp.models import AppUser, Files, Projects
+from neo4japp.services.file_types.providers import DirectoryTypeProvider, MapTypeProvider
+
+
+@pytest.fixture(scope='function')
+def file_hierarchy(session, fix_owner: AppUser):
+    """A project with a directory, and a map in the directory.
+
+    :return: the project, its root directory, the directory and the map
+    """
+    root = Files(
+        mime_type=DirectoryTypeProvider.MIME_TYPE,
+        filename='/',
+        user=fix_owner,
+    )
+    project = Projects(
+        name='elastic-project',
+        description='test project',
+        root=root,
+    )
+    directory = Files(
+        mime_type=DirectoryTypeProvider.MIME_TYPE,
+        filename='directory',
+        user=fix_owner,
+        parent=root,
+    )
+    file = Files(
+        mime_type=MapTypeProvider.MIME_TYPE,
+        filename='map',
+        user=fix_owner,
+        parent=directory,
+    )
+    session.add_all([root, project, directory, file])
+    session.flush()
+    return project, root, directory, file
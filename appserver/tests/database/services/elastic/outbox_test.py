@@ -0,0 +1,220 @@
+import pytest
+
+from neo4japp.constants import FILE_INDEX_ID
+from neo4japp.database import db
+from neo4japp.models.files import FileIndexOperation, FileIndexOutbox
+from neo4japp.services.elastic import outbox
+from neo4japp.services.elastic.outbox import drain_outbox, enqueue_files
+
+INDEX = FileIndexOperation.INDEX
+UPDATE = FileIndexOperation.UPDATE
+DELETE = FileIndexOperation.DELETE
+
+
+class FakeElasticService:
+    """Records the bulk operations sent to elastic, and fails those of the given files."""
+
+    def __init__(self, failed=()):
+        self.failed = set(failed)
+        self.operations = []
+
+    def _send(self, operation, hash_ids, sent):
+        self.operations.append((operation, sent))
+        return [hash_id for hash_id in hash_ids if hash_id in self.failed]
+
+    def delete_files(self, hash_ids):
+        return self._send('delete', hash_ids, sorted(hash_ids))
+
+    def index_files(self, hash_ids):
+        return self._send('index', hash_ids, sorted(hash_ids))
+
+    def update_files(self, fields):
+        return self._send('update', fields, dict(fields))
+
+
+@pytest.fixture(scope='function')
+def fake_elastic(monkeypatch):
+    elastic_service = FakeElasticService()
+    monkeypatch.setattr(outbox, 'get_elastic_service', lambda: elastic_service)
+    return elastic_service
+
+
+def get_outbox(session):
+    return [
+        (row.hash_id, row.operation, row.fields)
+        for row in session.query(FileIndexOutbox).order_by(FileIndexOutbox.id)
+    ]
+
+
+def clear_outbox(session):
+    session.query(FileIndexOutbox).delete()
+
+
+def test_inserted_files_are_indexed(session, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+
+    assert sorted(get_outbox(session)) == sorted([
+        (root.hash_id, INDEX, None),
+        (directory.hash_id, INDEX, None),
+        (file.hash_id, INDEX, None),
+    ])
+
+
+def test_changed_fields_are_updated(session, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+    clear_outbox(session)
+
+    file.description = 'a map'
+    session.flush()
+    assert get_outbox(session) == [(file.hash_id, UPDATE, ['description'])]
+    clear_outbox(session)
+
+    # changes which are not part of the document are not sent
+    file.annotations_date = db.func.now()
+    session.flush()
+    assert get_outbox(session) == []
+
+
+def test_directory_changes_are_updated_in_its_children(session, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+    clear_outbox(session)
+
+    directory.filename = 'renamed'
+    session.flush()
+    assert get_outbox(session) == [
+        (directory.hash_id, UPDATE, ['file_path', 'filename']),
+        (file.hash_id, UPDATE, ['file_path']),
+    ]
+    clear_outbox(session)
+
+    directory.public = True
+    session.flush()
+    assert get_outbox(session) == [
+        (directory.hash_id, UPDATE, ['principals', 'public']),
+        (file.hash_id, UPDATE, ['principals']),
+    ]
+    clear_outbox(session)
+
+    project.name = 'renamed-project'
+    session.flush()
+    assert sorted(get_outbox(session)) == sorted([
+        (root.hash_id, UPDATE, ['file_path', 'project_name']),
+        (directory.hash_id, UPDATE, ['file_path', 'project_name']),
+        (file.hash_id, UPDATE, ['file_path', 'project_name']),
+    ])
+
+
+def test_deleted_files_are_deleted_with_their_children(session, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+    clear_outbox(session)
+
+    directory.deletion_date = db.func.now()
+    session.flush()
+
+    assert get_outbox(session) == [
+        (directory.hash_id, DELETE, None),
+        (file.hash_id, DELETE, None),
+    ]
+
+
+def test_outbox_is_sent_to_elastic_in_bulk(session, fake_elastic):
+    connection = session.connection()
+    enqueue_files(connection, ['a', 'b'], INDEX)
+    enqueue_files(connection, ['c'], UPDATE, ['description'])
+    enqueue_files(connection, ['c'], UPDATE, ['filename', 'file_path'])
+    enqueue_files(connection, ['b', 'd'], DELETE)
+    enqueue_files(connection, ['d'], UPDATE, ['public'])
+
+    assert drain_outbox(10) == (7, 0)
+
+    assert fake_elastic.operations == [
+        ('delete', ['b', 'd']),
+        ('index', ['a']),
+        ('update', {'c': ['description', 'file_path', 'filename']}),
+    ]
+    assert get_outbox(session) == []
+
+
+def test_outbox_is_drained_by_batch(session, fake_elastic):
+    enqueue_files(session.connection(), ['a', 'b', 'c'], INDEX)
+
+    assert drain_outbox(2) == (2, 0)
+    assert drain_outbox(2) == (1, 0)
+    assert drain_outbox(2) == (0, 0)
+    assert fake_elastic.operations == [('index', ['a', 'b']), ('index', ['c'])]
+
+
+def test_failed_files_are_backed_off_and_dropped(app, session, fake_elastic, monkeypatch):
+    monkeypatch.setitem(app.config, 'ELASTIC_INDEXER_MAX_ATTEMPTS', 2)
+    fake_elastic.failed = {'a'}
+    connection = session.connection()
+    enqueue_files(connection, ['a'], UPDATE, ['description'])
+    enqueue_files(connection, ['a', 'b'], INDEX)
+
+    assert drain_outbox(10) == (3, 1)
+    # only the latest row of the failed file is kept
+    row = session.query(FileIndexOutbox).one()
+    assert (row.hash_id, row.operation, row.attempts) == ('a', INDEX, 1)
+    assert session.query(FileIndexOutbox.available_date > db.func.now()).scalar()
+
+    # the file is backed off
+    assert drain_outbox(10) == (0, 0)
+
+    row.available_date = db.func.now()
+    session.flush()
+    assert drain_outbox(10) == (1, 1)
+    # and dropped after the last attempt
+    assert get_outbox(session) == []
+    assert fake_elastic.operations == [('index', ['a', 'b']), ('index', ['a'])]
+
+
+@pytest.fixture(scope='function')
+def committed_outbox(app):
+    """Outbox rows committed outside of the test transaction, so that another connection can
+    lock them. Request it before `session`, to delete the rows after its transaction is done.
+    """
+    t_outbox = FileIndexOutbox.__table__
+    with db.engine.begin() as connection:
+        row_ids = [
+            connection.execute(t_outbox.insert().values(
+                hash_id=hash_id, operation=INDEX)).inserted_primary_key[0]
+            for hash_id in ['locked', 'unlocked']
+        ]
+    yield row_ids
+    with db.engine.begin() as connection:
+        connection.execute(t_outbox.delete().where(t_outbox.c.id.in_(row_ids)))
+
+
+def test_rows_locked_by_another_indexer_are_skipped(committed_outbox, session, fake_elastic):
+    locked_id, unlocked_id = committed_outbox
+    t_outbox = FileIndexOutbox.__table__
+    other_indexer = db.engine.connect()
+    transaction = other_indexer.begin()
+    try:
+        other_indexer.execute(
+            t_outbox.select().where(t_outbox.c.id == locked_id).with_for_update())
+
+        assert drain_outbox(10) == (1, 0)
+        assert fake_elastic.operations == [('index', ['unlocked'])]
+    finally:
+        transaction.rollback()
+        other_indexer.close()
+
+    assert [row.id for row in session.query(FileIndexOutbox)] == [locked_id]
+
+
+def test_deleted_and_recycled_files_are_read_again(session, elastic_service, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+    directory.deletion_date = db.func.now()
+    file.recycling_date = db.func.now()
+    session.flush()
+    clear_outbox(session)
+    connection = session.connection()
+    enqueue_files(connection, [directory.hash_id], UPDATE, ['description'])
+    enqueue_files(connection, [file.hash_id], INDEX)
+
+    assert drain_outbox(10) == (2, 0)
+
+    elastic_service.elastic_client.indices.refresh(FILE_INDEX_ID)
+    assert elastic_service.elastic_client.count(index=FILE_INDEX_ID)['count'] == 0
+    assert get_outbox(session) == []
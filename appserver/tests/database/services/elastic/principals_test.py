@@ -0,0 +1,111 @@
+import pytest
+
+from neo4japp.models import (
+    AppRole,
+    AppUser,
+    Files,
+    Projects,
+    file_collaborator_role,
+    projects_collaborator_role,
+)
+from neo4japp.services.elastic.principals import get_file_principals
+
+
+@pytest.fixture(scope='function')
+def reader(session) -> AppUser:
+    user = AppUser(
+        id=300,
+        username='reader',
+        email='reader@lifelike.bio',
+        password_hash='password',
+        first_name='Jim',
+        last_name='Melancholy'
+    )
+    session.add(user)
+    session.flush()
+    return user
+
+
+def add_project_role(session, project: Projects, user: AppUser, role_name: str):
+    role = AppRole.query.filter(AppRole.name == role_name).one()
+    session.execute(projects_collaborator_role.insert().values(
+        appuser_id=user.id,
+        projects_id=project.id,
+        app_role_id=role.id,
+    ))
+
+
+def add_file_role(session, file: Files, user: AppUser, owner: AppUser, role_name: str):
+    role = AppRole.query.filter(AppRole.name == role_name).one()
+    session.execute(file_collaborator_role.insert().values(
+        file_id=file.id,
+        collaborator_id=user.id,
+        owner_id=owner.id,
+        role_id=role.id,
+    ))
+
+
+def test_files_without_readers_have_no_principals(session, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+
+    assert get_file_principals([(file, project)]) == {file.id: []}
+    assert get_file_principals([]) == {}
+
+
+@pytest.mark.parametrize('role_name', ['project-read', 'project-write', 'project-admin'])
+def test_project_readers_are_principals_of_its_files(
+    session, file_hierarchy, reader: AppUser, role_name
+):
+    project, root, directory, file = file_hierarchy
+    add_project_role(session, project, reader, role_name)
+
+    assert get_file_principals([(directory, project), (file, project)]) == {
+        directory.id: ['user:300'],
+        file.id: ['user:300'],
+    }
+
+
+def test_other_project_roles_are_not_principals(session, file_hierarchy, reader: AppUser):
+    project, root, directory, file = file_hierarchy
+    add_project_role(session, project, reader, 'file-read')
+
+    assert get_file_principals([(file, project)]) == {file.id: []}
+
+
+def test_file_collaborators_are_principals_of_the_file_and_its_children(
+    session, file_hierarchy, fix_owner: AppUser, reader: AppUser
+):
+    project, root, directory, file = file_hierarchy
+    add_file_role(session, directory, reader, fix_owner, 'file-read')
+
+    assert get_file_principals([(root, project), (directory, project), (file, project)]) == {
+        root.id: [],
+        directory.id: ['user:300'],
+        file.id: ['user:300'],
+    }
+
+
+def test_public_files_and_their_children_have_the_public_principal(session, file_hierarchy):
+    project, root, directory, file = file_hierarchy
+    directory.public = True
+    session.flush()
+
+    assert get_file_principals([(root, project), (directory, project), (file, project)]) == {
+        root.id: [],
+        directory.id: ['public'],
+        file.id: ['public'],
+    }
+
+
+def test_principals_are_merged(
+    session, file_hierarchy, fix_owner: AppUser, test_user: AppUser, reader: AppUser
+):
+    project, root, directory, file = file_hierarchy
+    file.public = True
+    add_project_role(session, project, test_user, 'project-read')
+    add_file_role(session, root, reader, fix_owner, 'file-write')
+    session.flush()
+
+    assert get_file_principals([(file, project)]) == {
+        file.id: ['public', 'user:200', 'user:300'],
+    }
@@ -0,0 +1,163 @@
+import pytest
+
+from neo4j import Session
+
+from neo4japp.data_transfer_objects.visualization import DuplicateEdgeConnectionData
+from tests.conftest import (
+    create_associated_relationship,
+    create_association_node,
+    create_chemical_node,
+    create_disease_node,
+    create_has_association_relationship,
+    create_in_pub_relationship,
+    create_predicts_relationship,
+    create_publication_node,
+    create_snippet_node,
+)
+
+
+@pytest.fixture(scope='function')
+def snippet_graph(graph: Session):
+    """Three chemicals which treat a disease, with snippets over a few publications,
+    and an association from the disease back to the first chemical.
+
+    :return: the chemical ids, and the disease id
+    """
+    pub_years = [2020, None, 1998, 2005]
+    snippet_id = 0
+    with graph.begin_transaction() as tx:
+        disease = create_disease_node(tx, 'disease', 'MESH:D0')
+        publications = [
+            create_publication_node(tx, pub_id=pmid, pub_year=pub_year)
+            for pmid, pub_year in enumerate(pub_years, 1)
+        ]
+
+        def create_association(source, target, description, snippets):
+            nonlocal snippet_id
+            association = create_association_node(tx, 'J', description, snippet_id)
+            create_has_association_relationship(tx, source.id, association.id)
+            create_has_association_relationship(tx, association.id, target.id)
+            for i in range(snippets):
+                snippet_id += 1
+                snippet = create_snippet_node(tx, snippet_id, f'sentence {snippet_id}')
+                create_predicts_relationship(
+                    tx, snippet.id, association.id, source['name'], target['name'])
+                create_in_pub_relationship(tx, snippet.id, publications[i % len(pub_years)].id)
+                # the same snippet is also in another publication
+                if i == 0:
+                    create_in_pub_relationship(tx, snippet.id, publications[-1].id)
+
+        chemicals = []
+        for i, snippets in enumerate([5, 3, 7]):
+            chemical = create_chemical_node(tx, f'chemical {i}', f'MESH:C{i}')
+            create_associated_relationship(tx, chemical.id, disease.id, 'J', 'treatment')
+            create_association(chemical, disease, 'treatment', snippets)
+            chemicals.append(chemical)
+        create_association(disease, chemicals[0], 'marker', 4)
+
+    return [chemical.id for chemical in chemicals], disease.id
+
+
+def flatten(snippet_data):
+    return [
+        (result.from_node_id, result.to_node_id, result.association,
+         snippet.reference.id, snippet.publication.id)
+        for result in snippet_data for snippet in result.snippets
+    ]
+
+
+def get_cluster_pages(visualizer_service, edges, limit, by_cursor):
+    snippets = []
+    page = 1
+    cursor = None
+    while True:
+        result = visualizer_service.get_snippets_for_cluster(
+            edges, page, limit, cursor if by_cursor else None)
+        snippets += flatten(result.snippet_data)
+        cursor = result.next_cursor
+        if cursor is None:
+            return snippets, result.total_results
+        page += 1
+
+
+def test_cluster_pages_and_cursors_follow_the_snippet_ordering(
+    visualizer_service,
+    snippet_graph
+):
+    chemical_ids, disease_id = snippet_graph
+    edges = [
+        DuplicateEdgeConnectionData(
+            from_label='Chemical',
+            to_label='Disease',
+            from_=chemical_id,
+            to=disease_id,
+            original_from=chemical_id,
+            original_to=disease_id,
+            label='treatment',
+        )
+        for chemical_id in chemical_ids
+    ]
+
+    result = visualizer_service.get_snippets_for_cluster(edges, 1, 1000)
+    everything = flatten(result.snippet_data)
+    # every snippet once per publication it is in
+    assert result.total_results == len(everything) == 5 + 3 + 7 + 3
+    assert [from_id for from_id, *_ in everything] == \
+        [chemical_ids[2]] * 8 + [chemical_ids[0]] * 6 + [chemical_ids[1]] * 4
+
+    for limit in [1, 3, 4]:
+        assert get_cluster_pages(visualizer_service, edges, limit, False) == \
+            (everything, result.total_results)
+        assert get_cluster_pages(visualizer_service, edges, limit, True) == \
+            (everything, result.total_results)
+
+
+def test_node_pair_snippets_are_counted_in_both_directions(
+    visualizer_service,
+    snippet_graph
+):
+    chemical_ids, disease_id = snippet_graph
+
+    result = visualizer_service.get_snippets_for_node_pair(chemical_ids[0], disease_id, 1, 1000)
+    everything = flatten(result.snippet_data)
+    assert result.total_results == len(everything) == 6 + 5
+    assert {(from_id, to_id, description) for from_id, to_id, description, *_ in everything} == {
+        (chemical_ids[0], disease_id, 'treatment'),
+        (disease_id, chemical_ids[0], 'marker'),
+    }
+
+    snippets = []
+    cursor = None
+    while True:
+        page = visualizer_service.get_snippets_for_node_pair(
+            chemical_ids[0], disease_id, 1, 2, cursor)
+        snippets += flatten(page.snippet_data)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert snippets == everything
+
+
+def test_reference_table_counts_are_the_snippet_totals(
+    visualizer_service,
+    gas_gangrene_treatment_cluster_node_edge_pairs,
+    gas_gangrene_with_associations_and_references,
+):
+    rows = visualizer_service.get_reference_table_data(
+        gas_gangrene_treatment_cluster_node_edge_pairs,
+    ).reference_table_rows
+
+    edges = [
+        DuplicateEdgeConnectionData(
+            from_label='Chemical',
+            to_label='Disease',
+            from_=pair.edge.original_from,
+            to=pair.edge.original_to,
+            original_from=pair.edge.original_from,
+            original_to=pair.edge.original_to,
+            label=pair.edge.label,
+        )
+        for pair in gas_gangrene_treatment_cluster_node_edge_pairs
+    ]
+    assert sum(row.snippet_count for row in rows) == \
+        visualizer_service.get_snippets_for_cluster(edges, 1, 1).total_results
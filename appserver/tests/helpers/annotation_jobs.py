@@ -0,0 +1,57 @@
+from concurrent.futures import Future
+
+
+class FakeRedis:
+    """The hash commands of redis used by the annotation jobs."""
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self):
+        return self
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.hashes.setdefault(key, {})
+        for k, v in ({field: value} if mapping is None else mapping).items():
+            fields[k.encode('utf-8')] = str(v).encode('utf-8')
+
+    def hsetnx(self, key, field, value):
+        if field.encode('utf-8') not in self.hashes.get(key, {}):
+            self.hset(key, field, value)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        pass
+
+
+class ImmediateExecutor:
+    """Runs the tasks as they are submitted."""
+    def submit(self, fn):
+        future = Future()
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class QueuedExecutor:
+    """Queues the tasks until they are run one by one."""
+    def __init__(self):
+        self.queue = []
+
+    def submit(self, fn):
+        future = Future()
+        self.queue.append((future, fn))
+        return future
+
+    def run_next(self):
+        future, fn = self.queue.pop(0)
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from neo4japp.services.annotations import annotation_jobs
+from neo4japp.services.annotations.annotation_jobs import (
+    FAILED_RESULT,
+    INTERRUPTED_RESULT,
+    JOB_STALL_TIMEOUT,
+    create_job,
+    get_job,
+    set_job_result,
+    submit_job_task
+)
+from tests.helpers.annotation_jobs import FakeRedis, ImmediateExecutor, QueuedExecutor
+
+
+@pytest.fixture
+def jobs(app, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(annotation_jobs, 'redis_server', redis)
+    monkeypatch.setattr(annotation_jobs, '_get_executor', lambda: ImmediateExecutor())
+    return redis
+
+
+def test_a_task_that_raises_records_a_failed_result(jobs):
+    job_id = create_job(['a', 'b'], [], user_id=1)
+
+    def annotate(hash_id):
+        if hash_id == 'b':
+            raise RuntimeError('lost the database')
+        set_job_result(job_id, hash_id, {'attempted': True, 'success': True, 'error': ''})
+
+    submit_job_task(job_id, 'a', annotate, 'a')
+    submit_job_task(job_id, 'b', annotate, 'b')
+
+    job = get_job(job_id)
+    assert job['done']
+    assert job['mapping'] == {
+        'a': {'attempted': True, 'success': True, 'error': ''},
+        'b': FAILED_RESULT,
+    }
+
+
+def test_a_task_that_raises_keeps_its_own_result(jobs):
+    job_id = create_job(['a'], [], user_id=1)
+    result = {'attempted': True, 'success': False, 'error': 'The file is too large.'}
+
+    def annotate():
+        set_job_result(job_id, 'a', result)
+        raise RuntimeError('failed after recording the result')
+
+    submit_job_task(job_id, 'a', annotate)
+
+    assert get_job(job_id)['mapping'] == {'a': result}
+
+
+def test_a_job_without_progress_is_interrupted(jobs, monkeypatch):
+    job_id = create_job(['a', 'b'], ['c'], user_id=1)
+    set_job_result(job_id, 'a', {'attempted': True, 'success': True, 'error': ''})
+    assert not get_job(job_id)['done']
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + JOB_STALL_TIMEOUT + 1)
+
+    job = get_job(job_id)
+    assert job['done']
+    assert job['mapping']['a']['success']
+    assert job['mapping']['b'] == INTERRUPTED_RESULT
+    assert job['missing'] == ['c']
+
+
+def test_jobs_queued_behind_others_are_not_interrupted(jobs, monkeypatch):
+    executor = QueuedExecutor()
+    monkeypatch.setattr(annotation_jobs, '_get_executor', lambda: executor)
+    running_job = create_job(['a'], [], user_id=1)
+    queued_job = create_job(['b'], [], user_id=1)
+    submit_job_task(running_job, 'a', set_job_result, running_job, 'a', FAILED_RESULT)
+    submit_job_task(queued_job, 'b', set_job_result, queued_job, 'b', FAILED_RESULT)
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + JOB_STALL_TIMEOUT + 1)
+    # the task of the first job starts after the timeout, the second job is still queued
+    executor.run_next()
+
+    assert get_job(running_job)['done']
+    assert not get_job(queued_job)['done']
+
+    executor.run_next()
+    assert get_job(queued_job)['mapping'] == {'b': FAILED_RESULT}
+    assert annotation_jobs._pending_tasks == {}
+
+
+def test_unknown_jobs_do_not_exist(jobs):
+    assert get_job('unknown') is None
@@ -0,0 +1,42 @@
+from neo4japp.services.annotations.metrics import MetricsRegistry, SIZE_BUCKETS, profiled
+
+
+def test_histograms_are_cumulative_per_labels():
+    registry = MetricsRegistry()
+    registry.observe('stage_seconds', 0.003, stage='nlp')
+    registry.observe('stage_seconds', 2, stage='nlp')
+    registry.observe('stage_seconds', 0.2, stage='parse')
+
+    metrics = registry.snapshot()['stage_seconds']
+
+    assert [m['labels'] for m in metrics] == [{'stage': 'nlp'}, {'stage': 'parse'}]
+    nlp = metrics[0]
+    assert nlp['count'] == 2
+    assert nlp['sum'] == 2.003
+    buckets = dict((bound, count) for bound, count in nlp['buckets'])
+    assert buckets[0.005] == 1
+    assert buckets[1] == 1
+    assert buckets[2.5] == 2
+    assert buckets['+Inf'] == 2
+
+
+def test_prometheus_format():
+    registry = MetricsRegistry()
+    registry.observe('tokens', 50, buckets=SIZE_BUCKETS)
+
+    lines = registry.to_prometheus().splitlines()
+
+    assert lines[0] == '# TYPE tokens histogram'
+    assert 'tokens_bucket{le="10"} 0' in lines
+    assert 'tokens_bucket{le="100"} 1' in lines
+    assert 'tokens_bucket{le="+Inf"} 1' in lines
+    assert lines[-2:] == ['tokens_sum 50.0', 'tokens_count 1']
+
+
+def test_profiled_saves_a_capture(tmp_path):
+    with profiled(str(tmp_path), 'file'):
+        sum(range(10))
+    assert [path.name.endswith('-file.prof') for path in tmp_path.iterdir()] == [True]
+
+    with profiled(None, 'file'):
+        pass
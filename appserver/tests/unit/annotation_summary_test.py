@@ -0,0 +1,168 @@
+import random
+
+from pandas import DataFrame
+
+from neo4japp.services.annotations.annotation_summary import (
+    SUMMARY_COLUMNS,
+    count_enrichment_genes,
+    count_entities,
+    filter_excluded_annotations,
+    summarize_annotations
+)
+
+
+def create_annotation(entity_id, entity_type, text, primary_name=None):
+    annotation = {
+        'meta': {'id': entity_id, 'type': entity_type},
+        'keyword': text,
+        'textInDocument': text,
+    }
+    if primary_name is not None:
+        annotation['primaryName'] = primary_name
+    return annotation
+
+
+def is_excluded(exclusions, annotation):
+    """The nested loop the exclusion lookup replaced."""
+    def terms_match(term1, term2, is_case_insensitive):
+        if is_case_insensitive:
+            return term1.strip().lower() == term2.strip().lower()
+        return term1.strip() == term2.strip()
+
+    for exclusion in exclusions:
+        if (exclusion.get('type') == annotation['meta']['type'] and
+                terms_match(
+                    exclusion.get('text', 'True'),
+                    annotation.get('textInDocument', 'False'),
+                    exclusion['isCaseInsensitive'])):
+            return True
+    return False
+
+
+def count_annotations(files):
+    """Counting the annotations of the files one by one, like the export did."""
+    counts = {}
+    for annotations in files:
+        for annotation in annotations:
+            key = annotation['meta']['id']
+            if key not in counts:
+                counts[key] = {'annotation': annotation, 'count': 1}
+            else:
+                counts[key]['count'] += 1
+    return [
+        (
+            key,
+            counts[key]['annotation']['meta']['type'],
+            counts[key]['annotation']['keyword'],
+            counts[key]['count']
+        ) for key in sorted(counts, key=lambda key: counts[key]['count'], reverse=True)
+    ]
+
+
+def test_filter_excluded_annotations_matches_loop():
+    rng = random.Random(0)
+    texts = ['IL7', 'il7', ' IL7 ', 'Il-7', 'cysB']
+    types = ['Gene', 'Protein']
+
+    for _ in range(200):
+        annotations = [
+            create_annotation(str(i), rng.choice(types), rng.choice(texts))
+            for i in range(rng.randint(0, 20))
+        ]
+        exclusions = [
+            {
+                'type': rng.choice(types),
+                'text': rng.choice(texts),
+                'isCaseInsensitive': rng.random() < 0.5
+            } for _ in range(rng.randint(0, 3))
+        ]
+
+        assert filter_excluded_annotations(annotations, exclusions) == [
+            annotation for annotation in annotations
+            if not is_excluded(exclusions, annotation)
+        ]
+
+
+def test_summarize_annotations():
+    summary = summarize_annotations([
+        create_annotation('945771', 'Gene', ' cysB', 'cysB'),
+        create_annotation('511145', 'Species', 'e. coli'),
+        create_annotation('945771', 'Gene', 'CysB', 'cysB'),
+        create_annotation('945771', 'Protein', 'CysB'),
+    ])
+
+    assert summary == [
+        {'entity_id': '945771', 'entity_type': 'Gene', 'text': 'cysB',
+         'primary_name': 'cysB', 'count': 2, 'enrichment_genes': []},
+        {'entity_id': '511145', 'entity_type': 'Species', 'text': 'e. coli',
+         'primary_name': '', 'count': 1, 'enrichment_genes': []},
+        {'entity_id': '945771', 'entity_type': 'Protein', 'text': 'CysB',
+         'primary_name': '', 'count': 1, 'enrichment_genes': []},
+    ]
+
+
+def test_count_entities_matches_counting_every_annotation():
+    rng = random.Random(0)
+    entities = [('1', 'Gene'), ('1', 'Protein'), ('2', 'Gene'), ('3', 'Chemical'), ('4', 'Disease')]
+
+    for _ in range(100):
+        files = [
+            [
+                create_annotation(*rng.choice(entities), text=f'text {rng.randint(0, 3)}')
+                for _ in range(rng.randint(0, 15))
+            ] for _ in range(rng.randint(1, 5))
+        ]
+
+        summaries = DataFrame([
+            {'file_id': file_id, **row}
+            for file_id, annotations in enumerate(files)
+            for row in summarize_annotations(annotations)
+        ], columns=SUMMARY_COLUMNS)
+        counts = count_entities(summaries)
+
+        assert [
+            (key, entity['entity_type'], entity['text'], entity['count'])
+            for key, entity in counts.iterrows()
+        ] == count_annotations(files)
+
+
+def count_genes(files):
+    """Counting the genes of the annotations of the files one by one,
+    like the count per row sorting did."""
+    genes = {}
+    for annotations in files:
+        for annotation in annotations:
+            genes.setdefault(annotation['meta']['id'], set()).add(annotation['enrichmentGene'])
+    return {key: len(value) for key, value in genes.items()}
+
+
+def test_count_enrichment_genes_matches_counting_every_annotation():
+    rng = random.Random(0)
+    entities = [('1', 'Gene'), ('1', 'Protein'), ('2', 'Gene'), ('3', 'Chemical')]
+    genes = ['', 'cysB', 'ompF', 'acrA', 'tolC']
+
+    for _ in range(100):
+        files = [
+            [
+                {
+                    **create_annotation(*rng.choice(entities), text='text'),
+                    'enrichmentGene': rng.choice(genes),
+                    'enrichmentDomain': {'domain': 'Regulon', 'subDomain': 'name'}
+                }
+                for _ in range(rng.randint(0, 15))
+            ] for _ in range(rng.randint(1, 5))
+        ]
+        # custom annotations have no gene
+        files[0].append(create_annotation('4', 'Disease', 'text'))
+
+        summaries = DataFrame([
+            {'file_id': file_id, **row}
+            for file_id, annotations in enumerate(files)
+            for row in summarize_annotations(annotations)
+        ], columns=SUMMARY_COLUMNS)
+
+        expected = count_genes([
+            [annotation for annotation in annotations if 'enrichmentGene' in annotation]
+            for annotations in files
+        ])
+        assert count_enrichment_genes(summaries).to_dict() == expected
@@ -0,0 +1,130 @@
+import random
+
+from intervaltree import Interval, IntervalTree
+
+from neo4japp.services.annotations import AnnotationService
+from neo4japp.services.annotations.constants import EntityType
+from neo4japp.services.annotations.data_transfer_objects import Annotation
+
+
+ENTITY_TYPES = [
+    EntityType.ANATOMY.value,
+    EntityType.CHEMICAL.value,
+    EntityType.COMPOUND.value,
+    EntityType.DISEASE.value,
+    EntityType.GENE.value,
+    EntityType.PROTEIN.value,
+    EntityType.SPECIES.value,
+]
+
+
+def create_annotation(keyword: str, text_in_document: str, lo: int, hi: int, entity_type: str):
+    return Annotation(
+        page_number=1,
+        keyword=keyword,
+        lo_location_offset=lo,
+        hi_location_offset=hi,
+        keyword_length=len(keyword),
+        text_in_document=text_in_document,
+        keywords=[],
+        rects=[[1, 2]],
+        meta=Annotation.Meta(
+            type=entity_type,
+            id='',
+            id_type='',
+            id_hyperlinks=[],
+            links=Annotation.Meta.Links(),
+        ),
+        uuid='',
+    )
+
+
+def fix_conflicting_annotations_with_tree(service, unified_annotations):
+    """The interval tree implementation the sweep replaced."""
+    annotation_interval_dict = {}
+    for unified in unified_annotations:
+        annotation_interval_dict.setdefault(
+            (unified.lo_location_offset, unified.hi_location_offset), []).append(unified)
+
+    tree = IntervalTree(Interval(lo, hi) for (lo, hi) in annotation_interval_dict)
+    merged_tree = tree.copy()
+    # the service merged touching intervals too
+    merged_tree.merge_overlaps(strict=False)
+
+    fixed = []
+    for merged in sorted(merged_tree):
+        annotations_to_fix = []
+        for overlap in tree.overlap(merged.begin, merged.end):
+            annotations_to_fix += annotation_interval_dict[(overlap.begin, overlap.end)]
+
+        chosen_annotation = None
+        for annotation in annotations_to_fix:
+            if chosen_annotation:
+                chosen_annotation = service.determine_entity_precedence(
+                    anno1=chosen_annotation, anno2=annotation)
+            else:
+                chosen_annotation = annotation
+        fixed.append(chosen_annotation)
+    return fixed
+
+
+def create_document(rng: random.Random):
+    """Random overlapping annotations.
+
+    The tree resolved each group in set order, so the documents only have
+    conflicts that resolve the same in any order: no two annotations of the
+    same type and length, and only a gene and protein can share an interval
+    (they are compared by text instead of type) apart from other annotations.
+    """
+    annotations = []
+    used = set()
+    for _ in range(rng.randint(0, 40)):
+        lo = rng.randint(0, 300)
+        hi = lo + rng.randint(1, 15)
+        entity_type = rng.choice(ENTITY_TYPES)
+        if (entity_type, hi - lo) in used:
+            continue
+        if (lo, hi) in used:
+            # only one annotation per interval
+            continue
+        used.add((entity_type, hi - lo))
+        used.add((lo, hi))
+
+        keyword = 'k' * (hi - lo + 1)
+        annotations.append(create_annotation(keyword, keyword, lo, hi, entity_type))
+
+    for i in range(rng.randint(0, 3)):
+        lo = 400 + i * 50
+        hi = lo + rng.randint(1, 15)
+        text = rng.choice(['IL7', 'IL-7', 'il-7'])
+        annotations.append(create_annotation(
+            rng.choice(['IL7', 'IL-7']), text, lo, hi, EntityType.GENE.value))
+        annotations.append(create_annotation(
+            rng.choice(['IL-7', 'IL 7']), text, lo, hi, EntityType.PROTEIN.value))
+
+    rng.shuffle(annotations)
+    return annotations
+
+
+def test_adjacent_intervals_conflict():
+    service = AnnotationService(db=None, graph=None)
+    fixed = service.fix_conflicting_annotations([
+        create_annotation('word a', 'word a', 17, 22, EntityType.GENE.value),
+        create_annotation('a long word', 'a long word', 22, 32, EntityType.CHEMICAL.value),
+        create_annotation('long word', 'long word', 55, 63, EntityType.CHEMICAL.value),
+    ])
+
+    assert [(anno.keyword, anno.meta.type) for anno in fixed] == [
+        ('word a', EntityType.GENE.value),
+        ('long word', EntityType.CHEMICAL.value),
+    ]
+
+
+def test_sweep_matches_interval_tree():
+    service = AnnotationService(db=None, graph=None)
+    rng = random.Random(0)
+
+    for _ in range(500):
+        annotations = create_document(rng)
+        assert service.fix_conflicting_annotations(annotations) == \
+            fix_conflicting_annotations_with_tree(service, annotations)
@@ -0,0 +1,77 @@
+import pytest
+
+from neo4japp.services import domain_urls
+from neo4japp.services.domain_urls import DomainURLResolver
+from neo4japp.services.visualizer import VisualizerService
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, *columns):
+        self.queries += 1
+        return list(self.rows)
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    resolver = DomainURLResolver()
+    monkeypatch.setattr(domain_urls, 'domain_url_resolver', resolver)
+    return resolver
+
+
+def test_url_map_is_kept_for_the_ttl(app, resolver):
+    session = FakeSession([('NCBI_Gene', 'https://www.ncbi.nlm.nih.gov/gene/{}')])
+    app.config['DOMAIN_URLS_CACHE_TTL'] = 60
+
+    for _ in range(3):
+        assert resolver.get_url_map(session) == {
+            'NCBI_Gene': 'https://www.ncbi.nlm.nih.gov/gene/{}'}
+    assert session.queries == 1
+
+    session.rows.append(('uniprot', 'https://www.uniprot.org/uniprot/{}'))
+    resolver.invalidate()
+    assert 'uniprot' in resolver.get_url_map(session)
+    assert session.queries == 2
+
+
+def test_url_map_is_reloaded_without_ttl(app, resolver):
+    session = FakeSession([('NCBI_Gene', 'https://www.ncbi.nlm.nih.gov/gene/{}')])
+    app.config['DOMAIN_URLS_CACHE_TTL'] = 0
+
+    resolver.get_url_map(session)
+    resolver.get_url_map(session)
+    assert session.queries == 2
+
+
+def test_node_uris_are_resolved_with_one_query(app, monkeypatch):
+    session = FakeSession([
+        ('chebi', 'https://www.ebi.ac.uk/chebi/searchId.do?chebiId={}'),
+        ('MESH', 'https://www.ncbi.nlm.nih.gov/mesh/?term={}'),
+        ('NCBI_Gene', 'https://www.ncbi.nlm.nih.gov/gene/{}'),
+    ])
+    app.config['DOMAIN_URLS_CACHE_TTL'] = 60
+    monkeypatch.setattr('neo4japp.services.visualizer.domain_url_resolver', DomainURLResolver())
+    service = VisualizerService(graph=None, session=session)
+
+    assert service._get_uris_of_node_data([
+        (1, 'Chemical', 'CHEBI:27732'),
+        (2, 'Chemical', 'MESH:D002110'),
+        (3, 'Gene', '945771'),
+        # omim is not in the map
+        (4, 'Disease', 'OMIM:601623'),
+        (5, 'Gene', None),
+        (6, 'Chemical', 'malformed'),
+        (7, 'Protein', 'P0A9F3'),
+    ]) == [
+        'https://www.ebi.ac.uk/chebi/searchId.do?chebiId=27732',
+        'https://www.ncbi.nlm.nih.gov/mesh/?term=D002110',
+        'https://www.ncbi.nlm.nih.gov/gene/945771',
+        None,
+        None,
+        None,
+        None,
+    ]
+    assert session.queries == 1
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from neo4japp.constants import EnrichmentDomain
+from neo4japp.services import KgService
+from neo4japp.services.enrichment import enrichment_domains
+from neo4japp.services.enrichment.enrichment_domains import get_enrichment_domains
+
+
+GRAPH = {
+    'get_go_genes_query': {1: {'node_id': 1, 'go_terms': ['cell wall']}},
+    'get_string_genes_query': {
+        1: {'node_id': 1, 'string_id': '511145.b3939', 'annotation': 'metJ'},
+        2: {'node_id': 2, 'string_id': '511145.b0001', 'annotation': 'thrL'},
+    },
+}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode('utf-8')
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def queries(app, monkeypatch):
+    queries = []
+
+    def read(query, node_ids):
+        queries.append((query.__name__, sorted(node_ids), threading.get_ident()))
+        return [GRAPH[query.__name__][i] for i in node_ids if i in GRAPH[query.__name__]], 0
+
+    app.config['ENRICHMENT_DOMAIN_CACHE'] = True
+    monkeypatch.setattr(enrichment_domains, '_read', read)
+    monkeypatch.setattr(enrichment_domains, 'redis_server', FakeRedis())
+    monkeypatch.setattr(enrichment_domains, 'get_graph_version', lambda: 0)
+    return queries
+
+
+def test_domains_are_queried_concurrently_once(queries):
+    kg = KgService(graph=None, session=None)
+    domains = [EnrichmentDomain.GO, EnrichmentDomain.STRING]
+
+    results = get_enrichment_domains(kg, [1, 2, 3], '511145', domains)
+
+    assert results[EnrichmentDomain.GO] == {
+        1: {
+            'result': ['cell wall'],
+            'link': 'https://www.ebi.ac.uk/QuickGO/annotations?geneProductId='
+        },
+        2: None,
+        3: None,
+    }
+    assert results[EnrichmentDomain.STRING][2]['result'] == {
+        'id': '511145.b0001', 'annotation': 'thrL'}
+    assert sorted(query[:2] for query in queries) == [
+        ('get_go_genes_query', [1, 2, 3]),
+        ('get_string_genes_query', [1, 2, 3]),
+    ]
+    assert threading.get_ident() not in {query[2] for query in queries}
+
+    # the genes without results are cached too
+    queries.clear()
+    assert get_enrichment_domains(kg, [1, 2, 3], '511145', domains) == results
+    assert queries == []
+
+    assert get_enrichment_domains(kg, [2, 4], '511145', domains)[EnrichmentDomain.STRING] == {
+        2: results[EnrichmentDomain.STRING][2],
+        4: None,
+    }
+    assert sorted(query[:2] for query in queries) == [
+        ('get_go_genes_query', [4]),
+        ('get_string_genes_query', [4]),
+    ]
@@ -0,0 +1,174 @@
+from types import SimpleNamespace
+
+from neo4japp.constants import FILE_INDEX_ID
+from neo4japp.models import AppUser, Projects
+from neo4japp.models.files import FileIndexOperation, FileIndexOutbox
+from neo4japp.services.elastic import ElasticService, elastic_service
+from neo4japp.services.elastic.constants import (
+    FILE_INDEX_ADDED_FIELDS,
+    FILE_INDEX_DEFINITION_PATH
+)
+from neo4japp.services.elastic.outbox import (
+    coalesce_outbox,
+    get_document_changes,
+    get_retry_delay
+)
+
+
+def test_outbox_is_coalesced_to_the_latest_operation_of_every_file():
+    rows = [
+        FileIndexOutbox(id=1, hash_id='a', operation=FileIndexOperation.INDEX),
+        FileIndexOutbox(id=2, hash_id='b', operation=FileIndexOperation.INDEX),
+        FileIndexOutbox(id=3, hash_id='a', operation=FileIndexOperation.INDEX),
+        FileIndexOutbox(id=4, hash_id='b', operation=FileIndexOperation.DELETE),
+        FileIndexOutbox(id=5, hash_id='c', operation=FileIndexOperation.DELETE),
+        FileIndexOutbox(id=6, hash_id='c', operation=FileIndexOperation.INDEX),
+    ]
+
+    assert {
+        hash_id: (row.id, row.operation)
+        for hash_id, row in coalesce_outbox(rows).items()
+    } == {
+        'a': (3, FileIndexOperation.INDEX),
+        'b': (4, FileIndexOperation.DELETE),
+        'c': (6, FileIndexOperation.INDEX),
+    }
+
+
+def test_updates_are_combined_with_the_operations_before_them():
+    rows = [
+        FileIndexOutbox(id=1, hash_id='a', operation=FileIndexOperation.UPDATE,
+                        fields=['description']),
+        FileIndexOutbox(id=2, hash_id='a', operation=FileIndexOperation.UPDATE,
+                        fields=['file_path', 'filename']),
+        FileIndexOutbox(id=3, hash_id='b', operation=FileIndexOperation.INDEX),
+        FileIndexOutbox(id=4, hash_id='b', operation=FileIndexOperation.UPDATE,
+                        fields=['public']),
+        FileIndexOutbox(id=5, hash_id='c', operation=FileIndexOperation.DELETE),
+        FileIndexOutbox(id=6, hash_id='c', operation=FileIndexOperation.UPDATE,
+                        fields=['public']),
+        FileIndexOutbox(id=7, hash_id='d', operation=FileIndexOperation.UPDATE,
+                        fields=['public']),
+        FileIndexOutbox(id=8, hash_id='d', operation=FileIndexOperation.INDEX),
+    ]
+
+    assert {
+        hash_id: (row.id, row.operation, row.fields)
+        for hash_id, row in coalesce_outbox(rows).items()
+    } == {
+        'a': (2, FileIndexOperation.UPDATE, ['description', 'file_path', 'filename']),
+        'b': (4, FileIndexOperation.INDEX, None),
+        'c': (6, FileIndexOperation.DELETE, None),
+        'd': (8, FileIndexOperation.INDEX, None),
+    }
+
+
+def test_only_changes_to_the_document_are_sent_to_elastic():
+    # annotations are not part of the document
+    assert get_document_changes({
+        'annotations': [[], [{}]],
+        'annotations_date': [None, 1],
+    }) == (None, None)
+
+    assert get_document_changes({
+        'filename': ['a.pdf', 'b.pdf'],
+        'public': [False, True],
+        'modified_date': [0, 1],
+    }) == (FileIndexOperation.UPDATE, {'filename', 'file_path', 'public', 'principals'})
+
+    assert get_document_changes({
+        'parent_id': [1, 2],
+    }) == (FileIndexOperation.UPDATE, {
+        'file_path', 'project_id', 'project_hash_id', 'project_name', 'principals'})
+
+    # the content has to be extracted again
+    assert get_document_changes({
+        'filename': ['a.pdf', 'b.pdf'],
+        'content_id': [1, 2],
+    }) == (FileIndexOperation.INDEX, None)
+
+
+def test_retry_delay_is_doubled_up_to_an_hour(app):
+    app.config['ELASTIC_INDEXER_RETRY_DELAY'] = 5
+
+    assert [get_retry_delay(attempts) for attempts in range(1, 5)] == [5, 10, 20, 40]
+    assert get_retry_delay(20) == 3600
+
+
+def test_bulk_operations_return_the_failed_documents(app, monkeypatch):
+    results = [
+        (True, {'index': {'_id': 'a', 'status': 201}}),
+        (False, {'index': {'_id': 'b', 'status': 503, 'error': 'unavailable'}}),
+        # already deleted
+        (False, {'delete': {'_id': 'c', 'status': 404}}),
+        (False, {'delete': {'_id': 'd', 'status': 500, 'error': 'internal'}}),
+    ]
+    monkeypatch.setattr(elastic_service, 'streaming_bulk', lambda **kwargs: iter(results))
+
+    assert ElasticService()._streaming_bulk_documents([]) == ['b', 'd']
+
+
+class FakeFile:
+    """A file whose path counts how often it is looked up."""
+
+    def __init__(self):
+        self.path_lookups = 0
+        self.filename = 'a.pdf'
+        self.description = 'a pdf'
+        self.creation_date = None
+        self.user_id = 1
+        self.user = AppUser(username='owner')
+        self.doi = None
+        self.public = True
+        self.id = 2
+        self.hash_id = 'a'
+        self.mime_type = 'application/pdf'
+
+    @property
+    def filename_path(self):
+        self.path_lookups += 1
+        return '/project/a.pdf'
+
+
+def test_only_the_updated_fields_are_looked_up(app):
+    file = FakeFile()
+    project = Projects(id=3, hash_id='p', name='project')
+
+    assert ElasticService()._get_metadata(file, project, [], ['public', 'principals']) == {
+        'public': True,
+        'principals': [],
+    }
+    assert file.path_lookups == 0
+
+    assert ElasticService()._get_metadata(file, project, [], ['file_path']) == {
+        'file_path': '/project/a.pdf',
+    }
+    assert ElasticService()._get_metadata(file, project, [])['file_path'] == '/project/a.pdf'
+    assert file.path_lookups == 2
+
+
+class FakeIndices:
+    def __init__(self, exists):
+        self.index_exists = exists
+        self.mappings = []
+
+    def exists(self, index_id):
+        return self.index_exists
+
+    def put_mapping(self, index, body):
+        self.mappings.append((index, body))
+
+
+def test_added_fields_are_mapped_in_existing_indices(app):
+    elastic = ElasticService()
+    elastic.elastic_client = SimpleNamespace(indices=FakeIndices(exists=True))
+
+    elastic.add_index_fields(FILE_INDEX_ID, FILE_INDEX_DEFINITION_PATH, FILE_INDEX_ADDED_FIELDS)
+    assert elastic.elastic_client.indices.mappings == [
+        (FILE_INDEX_ID, {'properties': {'principals': {'type': 'keyword'}}}),
+    ]
+
+    # new indices are created with the fields
+    elastic.elastic_client = SimpleNamespace(indices=FakeIndices(exists=False))
+    elastic.add_index_fields(FILE_INDEX_ID, FILE_INDEX_DEFINITION_PATH, FILE_INDEX_ADDED_FIELDS)
+    assert elastic.elastic_client.indices.mappings == []
@@ -0,0 +1,33 @@
+from neo4japp.services.annotations import manual_annotation_service
+from neo4japp.services.annotations.manual_annotation_service import ManualAnnotationService
+
+
+class FakeGraph:
+    def __init__(self, events):
+        self.events = events
+
+    def exec_write_query_with_params(self, query, params):
+        self.events.append(('write', params))
+
+    def exec_read_query_with_params(self, query, params):
+        return [{
+            'node_id': 1,
+            'node_labels': ['GlobalInclusion', 'Gene', 'Chemical'],
+            'rel_entity_types': ['Gene'],
+            'valid_entity_types': [],
+        }]
+
+
+def test_globals_version_is_bumped_after_the_labels_are_cleaned_up(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        manual_annotation_service, 'bump_globals_version', lambda: events.append('bump'))
+
+    ManualAnnotationService(FakeGraph(events), None).remove_global_inclusions([(1, 2)])
+
+    assert events == [
+        ('write', {'node_ids': [[1, 2]]}),
+        # the Chemical label is removed
+        ('write', {'node_id': 1}),
+        'bump',
+    ]
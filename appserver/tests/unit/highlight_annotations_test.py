@@ -0,0 +1,34 @@
+import html
+import json
+
+from neo4japp.blueprints.annotations import FileAnnotationsGenerationView
+
+
+def create_annotation(text: str, term: str, start: int = 0):
+    lo = text.index(term, start)
+    return {
+        'meta': {'type': 'Gene', 'allText': term},
+        'textInDocument': term,
+        'loLocationOffset': lo,
+        'hiLocationOffset': lo + len(term) - 1
+    }
+
+
+def annotation_tag(term: str):
+    meta = html.escape(json.dumps({'type': 'Gene', 'allText': term}))
+    return f'<annotation type="Gene" meta="{meta}">{term}</annotation>'
+
+
+def test_highlight_annotations():
+    text = 'BRCA1 binds BRCA2 in cells'
+    annotations = [create_annotation(text, 'BRCA1'), create_annotation(text, 'BRCA2')]
+
+    snippet = FileAnnotationsGenerationView()._highlight_annotations(text, annotations)
+
+    assert snippet == \
+        f'<snippet>{annotation_tag("BRCA1")} binds {annotation_tag("BRCA2")} in cells</snippet>'
+
+
+def test_highlight_annotations_without_annotations():
+    assert FileAnnotationsGenerationView()._highlight_annotations('no genes', []) == \
+        '<snippet>no genes</snippet>'
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+from neo4japp.constants import FILE_MIME_TYPE_MAP, FILE_MIME_TYPE_PDF
+from neo4japp.models import FileContent, Files
+from neo4japp.services.elastic import ElasticService, elastic_service, indexable_content_cache
+from neo4japp.services.elastic.indexable_content_cache import (
+    get_indexable_content,
+    set_indexable_content
+)
+
+
+@pytest.fixture(scope='function')
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexable_content_cache, 'INDEXABLE_CONTENT_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_entries_are_keyed_by_checksum_and_mime_type(app, cache_dir):
+    set_indexable_content(b'\x01' * 32, FILE_MIME_TYPE_MAP, b'BRCA1 breast cancer')
+
+    assert get_indexable_content(b'\x01' * 32, FILE_MIME_TYPE_MAP) == b'BRCA1 breast cancer'
+    assert get_indexable_content(b'\x01' * 32, FILE_MIME_TYPE_PDF) is None
+    assert get_indexable_content(b'\x02' * 32, FILE_MIME_TYPE_MAP) is None
+
+
+def test_content_is_converted_once(app, cache_dir, monkeypatch):
+    class Provider:
+        def __init__(self):
+            self.conversions = 0
+
+        def to_indexable_content(self, buffer):
+            self.conversions += 1
+            if file.mime_type == FILE_MIME_TYPE_PDF:
+                return buffer
+            return io.BytesIO(buffer.read().upper())
+
+    class FileTypeService:
+        def get(self, file):
+            return provider
+
+    provider = Provider()
+    monkeypatch.setattr(elastic_service, 'get_file_type_service', FileTypeService)
+    service = ElasticService()
+
+    content = FileContent(raw_file=b'brca1', checksum_sha256=b'\x01' * 32)
+    for _ in range(2):
+        file = Files(mime_type=FILE_MIME_TYPE_MAP, content=content)
+        assert service._transform_data_for_indexing(file).getvalue() == b'BRCA1'
+    assert provider.conversions == 1
+
+    # PDFs are indexed as they are
+    for _ in range(2):
+        file = Files(mime_type=FILE_MIME_TYPE_PDF, content=content)
+        assert service._transform_data_for_indexing(file).getvalue() == b'brca1'
+    assert provider.conversions == 3
@@ -0,0 +1,75 @@
+import json
+import lmdb
+import os
+import pytest
+
+from neo4japp.services.annotations.lmdb_connection import close_environments
+from neo4japp.services.annotations.lmdb_service import LMDBService
+
+
+def create_lmdb(dirpath: str, db_name: str, entities):
+    env = lmdb.open(dirpath, map_size=1048576 * 10, max_dbs=2)
+    db = env.open_db(db_name.encode('utf-8'), dupsort=True)
+    with env.begin(db=db, write=True) as txn:
+        for entity in entities:
+            txn.put(entity['synonym'].encode('utf-8'), json.dumps(entity).encode('utf-8'))
+    env.close()
+
+
+@pytest.fixture(scope='function')
+def lmdb_service(tmp_path, request):
+    request.addfinalizer(close_environments)
+    create_lmdb(
+        os.path.join(tmp_path, 'genes'),
+        'genes_lmdb',
+        [{'synonym': 'hyp27', 'name': 'hyp27'}])
+    return LMDBService(str(tmp_path), genes_lmdb='genes')
+
+
+def test_environment_is_reused_between_transactions(lmdb_service):
+    first = lmdb_service.begin(dbname='genes_lmdb')
+    with first as txn:
+        assert json.loads(txn.get(b'hyp27'))['name'] == 'hyp27'
+
+    second = lmdb_service.begin(dbname='genes_lmdb')
+    with second as txn:
+        assert json.loads(txn.get(b'hyp27'))['name'] == 'hyp27'
+    assert first.env is second.env
+
+
+def test_environment_is_reopened_when_data_changes(lmdb_service, tmp_path):
+    old = lmdb_service.begin(dbname='genes_lmdb')
+
+    os.remove(os.path.join(tmp_path, 'genes', 'data.mdb'))
+    os.remove(os.path.join(tmp_path, 'genes', 'lock.mdb'))
+    create_lmdb(
+        os.path.join(tmp_path, 'genes'),
+        'genes_lmdb',
+        [{'synonym': 'il8', 'name': 'il8'}])
+
+    new = lmdb_service.begin(dbname='genes_lmdb')
+    assert new.env is not old.env
+
+    with new as txn:
+        assert txn.get(b'hyp27') is None
+        assert json.loads(txn.get(b'il8'))['name'] == 'il8'
+
+
+def test_replaced_environment_is_closed_after_its_last_transaction(lmdb_service, tmp_path):
+    old = lmdb_service.begin(dbname='genes_lmdb')
+    with old as old_txn:
+        os.remove(os.path.join(tmp_path, 'genes', 'data.mdb'))
+        os.remove(os.path.join(tmp_path, 'genes', 'lock.mdb'))
+        create_lmdb(
+            os.path.join(tmp_path, 'genes'),
+            'genes_lmdb',
+            [{'synonym': 'il8', 'name': 'il8'}])
+
+        with lmdb_service.begin(dbname='genes_lmdb') as new_txn:
+            assert json.loads(new_txn.get(b'il8'))['name'] == 'il8'
+
+        # the transaction started before the swap still reads the previous version
+        assert json.loads(old_txn.get(b'hyp27'))['name'] == 'hyp27'
+
+    with pytest.raises(lmdb.Error):
+        old.env.begin()
@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from pandas import DataFrame
+from scipy.stats import mannwhitneyu
+
+from neo4japp.services.annotations.sorted_annotation_service import mann_whitney_u_greater
+
+
+def mann_whitney_u_per_key(counts: DataFrame) -> pd.Series:
+    """The per key loop the vectorized test replaced."""
+    ds = counts.set_index(['file_id', 'key'])['count']
+    unique_keys = ds.index.get_level_values('key').unique()
+    unique_file_ids = ds.index.get_level_values('file_id').unique()
+
+    idx = pd.MultiIndex.from_product([unique_file_ids, unique_keys], names=['file_id', 'key'])
+    ds = ds.reindex(idx, fill_value=0)
+    if len(unique_keys) < 2:
+        # a single key, nothing to compare it to
+        return pd.Series(np.nan, index=unique_keys)
+
+    key_index_values = idx.get_level_values('key')
+    values = {}
+    for key in unique_keys:
+        mask = key_index_values == key
+        values[key] = -np.log(mannwhitneyu(ds[mask], ds[~mask], alternative='greater').pvalue)
+    return pd.Series(values)
+
+
+def create_counts(rng: random.Random, n_files: int, n_keys: int, max_count: int) -> DataFrame:
+    rows = []
+    for file_id in range(n_files):
+        for key in range(n_keys):
+            if rng.random() < 0.4:
+                rows.append((file_id, f'key{key}', rng.randint(1, max_count)))
+    return DataFrame(rows, columns=['file_id', 'key', 'count'])
+
+
+def test_matches_scipy_per_key():
+    rng = random.Random(0)
+    for _ in range(100):
+        counts = create_counts(
+            rng, rng.randint(1, 30), rng.randint(2, 30), rng.choice([1, 3, 50]))
+        if counts.empty:
+            continue
+
+        expected = mann_whitney_u_per_key(counts)
+        values = mann_whitney_u_greater(counts)
+
+        assert list(values.index) == list(expected.index)
+        assert np.allclose(values, expected[values.index], equal_nan=True)
+
+
+def test_small_samples_without_ties_are_exact():
+    counts = DataFrame(
+        [(0, 'a', 5), (0, 'b', 1), (1, 'a', 4), (1, 'b', 2), (2, 'a', 6), (2, 'b', 3)],
+        columns=['file_id', 'key', 'count'])
+
+    values = mann_whitney_u_greater(counts)
+
+    assert np.allclose(values, mann_whitney_u_per_key(counts)[values.index])
+    # every count of a is above the counts of b
+    assert values['a'] > values['b']
+
+
+def test_a_single_key_has_no_value():
+    counts = DataFrame([(0, 'a', 5), (1, 'a', 4)], columns=['file_id', 'key', 'count'])
+
+    values = mann_whitney_u_greater(counts)
+
+    assert list(values.index) == ['a']
+    assert values.isna().all()
+    assert mann_whitney_u_per_key(counts).isna().all()
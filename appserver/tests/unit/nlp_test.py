@@ -0,0 +1,91 @@
+import pytest
+import requests
+
+from neo4japp.services.annotations.constants import EntityType
+from neo4japp.services.annotations.utils import nlp
+from neo4japp.services.annotations.utils.nlp import predict, split_text
+
+
+@pytest.fixture(scope='function')
+def nlp_service(monkeypatch):
+    """Fake NLP service that tags every occurrence of 'BRCA1' as a gene."""
+    requests = []
+
+    def post(model, text):
+        requests.append((model, text))
+        annotations = []
+        start = text.find('BRCA1')
+        while start != -1:
+            annotations.append({'start_pos': start, 'end_pos': start + 5})
+            start = text.find('BRCA1', start + 1)
+        return {'results': [{'model': 'bc2gm_v1_gene', 'annotations': annotations}]}
+
+    monkeypatch.setattr(nlp, '_get_cached_results', post)
+    return requests
+
+
+def test_split_text_ends_chunks_at_sentences():
+    text = 'First sentence. Second sentence. Third one'
+    chunks = split_text(text, chunk_size=20)
+
+    assert [chunk for _, chunk in chunks] == ['First sentence.', ' Second sentence.', ' Third one']
+    assert all(text[offset:offset + len(chunk)] == chunk for offset, chunk in chunks)
+
+
+def test_split_text_without_separators():
+    assert split_text('abcdefgh', chunk_size=3) == [(0, 'abc'), (3, 'def'), (6, 'gh')]
+
+
+def test_predict_offsets_are_relative_to_the_whole_text(nlp_service, monkeypatch):
+    monkeypatch.setattr(nlp, 'NLP_CHUNK_SIZE', 25)
+    text = 'BRCA1 is a gene. The gene BRCA1 again.'
+
+    results = predict(text=text, entities={EntityType.GENE.value})
+
+    assert len(nlp_service) == 2
+    assert results.genes == {(0, 4), (26, 30)}
+    assert all(text[lo:hi + 1] == 'BRCA1' for lo, hi in results.genes)
+
+
+def test_predict_drops_the_results_of_a_model_with_a_failed_request(app, monkeypatch):
+    monkeypatch.setattr(nlp, 'NLP_CHUNK_SIZE', 25)
+    text = 'BRCA1 is a gene. The gene BRCA1 again.'
+
+    def post(model, chunk):
+        if model == 'bc2gm_v1_gene' and chunk.startswith(' The gene'):
+            raise requests.exceptions.Timeout()
+        start = chunk.find('BRCA1')
+        annotations = [{'start_pos': start, 'end_pos': start + 5}] if start != -1 else []
+        return {'results': [{'model': model, 'annotations': annotations}]}
+
+    monkeypatch.setattr(nlp, '_get_cached_results', post)
+
+    results = predict(text=text, entities={EntityType.GENE.value, EntityType.CHEMICAL.value})
+
+    # an empty set does not veto the LMDB genes of the chunk that failed
+    assert results.genes == set()
+    assert results.chemicals == {(0, 4), (26, 30)}
+
+
+def test_malformed_responses_are_not_cached(monkeypatch):
+    cache = {}
+
+    class Redis:
+        def get(self, key):
+            return cache.get(key)
+
+        def set(self, key, value, ex=None):
+            cache[key] = value
+
+    monkeypatch.setattr(nlp, 'redis_server', Redis())
+    monkeypatch.setattr(nlp, '_post', lambda model, text: {'error': 'internal'})
+
+    with pytest.raises(ValueError):
+        nlp._get_cached_results('bc2gm_v1_gene', 'BRCA1')
+    assert cache == {}
+
+    resp = {'results': [{'model': 'bc2gm_v1_gene', 'annotations': []}]}
+    monkeypatch.setattr(nlp, '_post', lambda model, text: resp)
+
+    assert nlp._get_cached_results('bc2gm_v1_gene', 'BRCA1') == resp
+    assert len(cache) == 1
@@ -0,0 +1,109 @@
+import pytest
+
+from neo4japp.services.annotations import organism_match_cache
+from neo4japp.services.annotations.organism_match_cache import (
+    OrganismMatchCache,
+    get_organism_matches
+)
+
+
+GRAPH = {
+    ('IL7', '9606'): ['3574'],
+    ('IL7', '10090'): ['16196'],
+    ('ace', '9606'): ['1636', '1637'],
+}
+
+
+@pytest.fixture
+def graph_version(app, monkeypatch):
+    version = [0]
+    app.config['ANNOTATION_GRAPH_CACHE'] = True
+    monkeypatch.setattr(organism_match_cache, '_cache', OrganismMatchCache(100, 60))
+    monkeypatch.setattr(organism_match_cache, 'get_graph_version', lambda: version[0])
+    return version
+
+
+def fetch_from(queries):
+    def fetch(rows):
+        # one row per synonym
+        assert len({row['synonym'] for row in rows}) == len(rows)
+        pairs = [(row['synonym'], organism) for row in rows for organism in row['organisms']]
+        queries.append(pairs)
+        return [
+            (synonym, organism, match)
+            for synonym, organism in pairs
+            for match in GRAPH.get((synonym, organism), [])
+        ]
+    return fetch
+
+
+def test_only_misses_are_queried(graph_version):
+    queries = []
+    matches = get_organism_matches('Gene', ['IL7', 'ace'], ['9606'], fetch_from(queries))
+    assert sorted(matches) == [('IL7', '9606', '3574'), ('ace', '9606', '1636'), ('ace', '9606', '1637')]  # noqa
+    assert queries == [[('IL7', '9606'), ('ace', '9606')]]
+
+    queries.clear()
+    matches = get_organism_matches(
+        'Gene', ['IL7', 'ace', 'xyz'], ['9606', '10090'], fetch_from(queries))
+    assert sorted(matches) == [
+        ('IL7', '10090', '16196'),
+        ('IL7', '9606', '3574'),
+        ('ace', '9606', '1636'),
+        ('ace', '9606', '1637'),
+    ]
+    assert queries == [[('IL7', '10090'), ('ace', '10090'), ('xyz', '9606'), ('xyz', '10090')]]
+
+    # pairs without matches are cached too
+    queries.clear()
+    get_organism_matches('Gene', ['xyz'], ['9606', '10090'], fetch_from(queries))
+    assert queries == []
+
+    # entity types are cached separately
+    get_organism_matches('Protein', ['xyz'], ['9606'], fetch_from(queries))
+    assert queries == [[('xyz', '9606')]]
+
+
+def test_misses_are_queried_in_batches(graph_version, monkeypatch):
+    monkeypatch.setattr(organism_match_cache, 'ORGANISM_MATCH_BATCH_SIZE', 2)
+    queries = []
+    get_organism_matches('Gene', ['a', 'b', 'c'], ['9606'], fetch_from(queries))
+    assert [len(query) for query in queries] == [2, 1]
+
+
+def test_graph_version_invalidates_the_cache(graph_version):
+    queries = []
+    get_organism_matches('Gene', ['IL7'], ['9606'], fetch_from(queries))
+    graph_version[0] += 1
+    get_organism_matches('Gene', ['IL7'], ['9606'], fetch_from(queries))
+    assert len(queries) == 2
+
+
+def test_disabled_cache_queries_everything(app, monkeypatch):
+    monkeypatch.setattr(organism_match_cache, 'get_graph_version', lambda: 0)
+    queries = []
+    for _ in range(2):
+        get_organism_matches('Gene', ['IL7'], ['9606'], fetch_from(queries))
+    assert len(queries) == 2
+
+
+def test_cache_is_bounded_lru():
+    cache = OrganismMatchCache(max_size=2, ttl=60)
+    cache.get_many([], version=0)
+    cache.set_many({('Gene', 'a', '1'): ('x',), ('Gene', 'b', '1'): ()}, version=0)
+    cache.get_many([('Gene', 'a', '1')], version=0)
+    cache.set_many({('Gene', 'c', '1'): ()}, version=0)
+
+    assert cache.get_many(
+        [('Gene', 'a', '1'), ('Gene', 'b', '1'), ('Gene', 'c', '1')], version=0) == {
+        ('Gene', 'a', '1'): ('x',),
+        ('Gene', 'c', '1'): (),
+    }
+
+
+def test_cache_entries_expire():
+    cache = OrganismMatchCache(max_size=2, ttl=-1)
+    cache.get_many([], version=0)
+    cache.set_many({('Gene', 'a', '1'): ('x',)}, version=0)
+    assert cache.get_many([('Gene', 'a', '1')], version=0) == {}
+    assert len(cache) == 0
@@ -0,0 +1,74 @@
+import os
+import pytest
+
+from neo4japp.services.annotations import parsed_content_cache
+from neo4japp.services.annotations.data_transfer_objects import PDFWord
+from neo4japp.services.annotations.parsed_content_cache import (
+    deserialize,
+    get_parsed_content,
+    serialize,
+    set_parsed_content
+)
+
+
+@pytest.fixture(scope='function')
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(parsed_content_cache, 'PARSED_CONTENT_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def create_words():
+    return [
+        PDFWord(
+            keyword='BRCA1',
+            normalized_keyword='BRCA1',
+            page_number=1,
+            lo_location_offset=0,
+            hi_location_offset=4,
+            previous_words='',
+            heights=[10.0],
+            widths=[25.0],
+            coordinates=[[0.0, 100.0, 25.0, 110.0]]
+        ),
+        PDFWord(
+            keyword='(BC)',
+            normalized_keyword='(BC)',
+            page_number=2,
+            lo_location_offset=6,
+            hi_location_offset=9,
+            previous_words='breast cancer',
+        )
+    ]
+
+
+def test_serialize_round_trip():
+    words = create_words()
+    assert deserialize(serialize('BRCA1 (BC)', words)) == ('BRCA1 (BC)', words)
+
+
+def test_entries_are_keyed_by_checksum_and_exclude_references(app, cache_dir):
+    words = create_words()
+    set_parsed_content(b'\x01' * 32, True, 'BRCA1 (BC)', words)
+
+    assert get_parsed_content(b'\x01' * 32, True) == ('BRCA1 (BC)', words)
+    assert get_parsed_content(b'\x01' * 32, False) is None
+    assert get_parsed_content(b'\x02' * 32, True) is None
+
+
+def test_least_recently_used_entries_are_evicted(app, cache_dir, monkeypatch):
+    words = create_words()
+    entry_size = len(serialize('text', words))
+    monkeypatch.setattr(
+        parsed_content_cache, 'PARSED_CONTENT_CACHE_SIZE', entry_size * 2)
+
+    set_parsed_content(b'\x01' * 32, True, 'text', words)
+    set_parsed_content(b'\x02' * 32, True, 'text', words)
+    for i, path in enumerate(sorted(cache_dir.iterdir())):
+        os.utime(path, (i, i))
+    # the first entry becomes the most recently used
+    assert get_parsed_content(b'\x01' * 32, True) is not None
+    set_parsed_content(b'\x03' * 32, True, 'text', words)
+
+    assert get_parsed_content(b'\x01' * 32, True) is not None
+    assert get_parsed_content(b'\x02' * 32, True) is None
+    assert get_parsed_content(b'\x03' * 32, True) is not None
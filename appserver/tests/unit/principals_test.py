@@ -0,0 +1,23 @@
+from neo4japp.models import AppRole, AppUser
+from neo4japp.services.elastic.principals import get_principals, get_user_principals
+
+
+def test_readers_and_public_files_are_principals():
+    assert get_principals(False, [3, 1, 3]) == ['user:1', 'user:3']
+    assert get_principals(True, [2]) == ['public', 'user:2']
+    assert get_principals(False, []) == []
+
+
+def test_users_match_their_own_and_the_public_principals():
+    assert get_user_principals(AppUser(id=7)) == ['public', 'user:7']
+
+
+def test_users_without_private_data_access_are_filtered_by_principals(app):
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.blueprints.search import get_principals_filter
+
+    assert get_principals_filter(AppUser(id=7, roles=[])) == {
+        'terms': {'principals': ['public', 'user:7']}
+    }
+    assert get_principals_filter(
+        AppUser(id=7, roles=[AppRole(name='private-data-access')])) is None
@@ -0,0 +1,50 @@
+import random
+
+from bisect import bisect_left
+from math import inf
+
+from neo4japp.services.annotations.utils.proximity import ProximityIndex
+
+
+def closest_distance(positions, lo, hi, above_only=False):
+    """The linear scan the index replaces."""
+    if above_only:
+        positions = positions[:bisect_left(positions, (lo, hi))]
+
+    min_dist = inf
+    for position_lo, position_hi in positions:
+        if lo > position_hi:
+            dist = lo - position_hi
+        else:
+            dist = position_lo - hi
+        min_dist = min(min_dist, dist)
+    return min_dist
+
+
+def test_closest_distance():
+    index = ProximityIndex({'9606': [(100, 104), (10, 14)]})
+
+    # after the entity
+    assert index.closest_distance('9606', 80, 85) == 15
+    # before the entity
+    assert index.closest_distance('9606', 20, 25) == 6
+    assert index.closest_distance('9606', 20, 25, above_only=True) == 6
+    assert index.closest_distance('9606', 0, 5, above_only=True) == inf
+
+
+def test_closest_distance_matches_linear_scan():
+    rng = random.Random(0)
+    for _ in range(300):
+        positions = set()
+        for _ in range(rng.randint(0, 15)):
+            lo = rng.randint(0, 200)
+            positions.add((lo, lo + rng.randint(0, 20)))
+        positions = sorted(positions)
+        index = ProximityIndex({'1': positions})
+
+        for _ in range(30):
+            lo = rng.randint(0, 220)
+            hi = lo + rng.randint(0, 10)
+            for above_only in (False, True):
+                assert index.closest_distance('1', lo, hi, above_only) == \
+                    closest_distance(positions, lo, hi, above_only), (positions, lo, hi)
@@ -0,0 +1,39 @@
+from neo4japp.services.elastic import ElasticService
+from neo4japp.services.elastic.query_parser import (
+    build_query_parser,
+    get_grammar_key,
+    parse_query
+)
+from neo4japp.services.elastic.query_parser_benchmark import BENCHMARK_QUERIES
+
+TEXT_FIELDS = ['description', 'data.content', 'filename']
+TEXT_FIELD_BOOSTS = {'description': 1, 'data.content': 1, 'filename': 3}
+
+
+def test_query_grammar_is_built_once_per_fields_and_boosts(app):
+    elastic_service = ElasticService()
+
+    parser = elastic_service._get_query_parser(TEXT_FIELDS, TEXT_FIELD_BOOSTS)
+
+    assert elastic_service._get_query_parser(
+        TEXT_FIELDS, dict(reversed(list(TEXT_FIELD_BOOSTS.items())))) is parser
+    assert elastic_service._get_query_parser(
+        TEXT_FIELDS, {**TEXT_FIELD_BOOSTS, 'filename': 5}) is not parser
+
+
+def test_cached_queries_are_parsed_as_with_a_new_grammar(app):
+    elastic_service = ElasticService()
+    grammar_key = get_grammar_key(TEXT_FIELDS, TEXT_FIELD_BOOSTS)
+
+    for query in BENCHMARK_QUERIES:
+        if 'type:' in query:
+            # needs the file type service
+            continue
+        processed_query = elastic_service._pre_process_query(query)
+        expected = build_query_parser(*grammar_key).parseString(processed_query)[0].to_dict()
+
+        assert parse_query(processed_query, *grammar_key).to_dict() == expected
+        # the second time from the cache
+        assert parse_query(processed_query, *grammar_key).to_dict() == expected
+
+    assert parse_query.cache_info().hits >= 1
@@ -0,0 +1,37 @@
+import time
+
+from neo4japp.services.annotations.metrics import get_stage_seconds, registry
+from neo4japp.services.annotations.pipeline import Pipeline
+from neo4japp.services.annotations.reannotation import ReannotationProgress, read_checkpoint
+
+
+def test_read_checkpoint(tmp_path):
+    checkpoint = tmp_path / 'reannotate.checkpoint'
+    assert read_checkpoint(str(checkpoint)) == set()
+
+    checkpoint.write_text('abc\ndef\n\n')
+    assert read_checkpoint(str(checkpoint)) == {'abc', 'def'}
+
+
+def test_progress_averages_stage_timings():
+    progress = ReannotationProgress(total=3)
+    progress.add(True, {'nlp': 2.0, 'parse': 1.0})
+    progress.add(False, {'nlp': 4.0})
+
+    assert progress.done == 2
+    assert progress.failed == 1
+    report = progress.report()
+    assert 'Reannotated 2/3 files (1 failed)' in report
+    assert 'nlp 3.00s' in report
+    assert 'parse 0.50s' in report
+
+
+def test_pipeline_records_stage_timings():
+    registry.reset()
+    try:
+        Pipeline._record_timing('nlp', time.time() - 1)
+        Pipeline._record_timing('nlp', time.time() - 1)
+        assert get_stage_seconds()['nlp'] >= 2
+    finally:
+        registry.reset()
+    assert get_stage_seconds() == {}
@@ -0,0 +1,53 @@
+from neo4japp.services.elastic import outbox, reindex
+from neo4japp.services.elastic.reindex import ReindexCheckpoint, ReindexProgress, _finish_batch
+
+
+def test_checkpoint_waits_for_the_batches_before(tmp_path):
+    path = str(tmp_path / 'reindex.checkpoint')
+    checkpoint = ReindexCheckpoint(path)
+    assert checkpoint.read() is None
+
+    checkpoint.finish(1, 'b')
+    checkpoint.finish(2, 'c')
+    assert checkpoint.read() is None
+
+    checkpoint.finish(0, 'a')
+    assert checkpoint.read() == 'c'
+
+    checkpoint.finish(4, 'e')
+    checkpoint.finish(3, 'd')
+    assert ReindexCheckpoint(path).read() == 'e'
+
+
+class FakeSession:
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.commits = []
+
+    def connection(self):
+        return None
+
+    def commit(self):
+        self.commits.append(self.checkpoint.read())
+
+
+def test_failed_files_are_queued_before_the_checkpoint_moves(tmp_path, monkeypatch):
+    checkpoint = ReindexCheckpoint(str(tmp_path / 'reindex.checkpoint'))
+    session = FakeSession(checkpoint)
+    queued = []
+    monkeypatch.setattr(reindex.db, 'session', session)
+    monkeypatch.setattr(
+        outbox,
+        'enqueue_files',
+        lambda connection, hash_ids, operation: queued.append((hash_ids, checkpoint.read()))
+    )
+    progress = ReindexProgress(total=5)
+
+    _finish_batch(['a', 'b'], 0, [], progress, checkpoint)
+    _finish_batch(['c', 'd', 'e'], 1, ['d'], progress, checkpoint)
+
+    # queued and committed while the checkpoint was still before the batch
+    assert queued == [(['d'], 'b')]
+    assert session.commits == ['b']
+    assert checkpoint.read() == 'e'
+    assert (progress.indexed, progress.failed) == (4, 1)
@@ -0,0 +1,95 @@
+import pytest
+
+from neo4japp.exceptions import InvalidArgument
+from neo4japp.services import snippet_counts
+from neo4japp.services.snippet_counts import (
+    decode_cursor,
+    encode_cursor,
+    get_next_cursor,
+    get_page_offset,
+    get_snippet_counts,
+    plan_snippet_page
+)
+
+
+def test_plan_skips_the_associations_before_the_page():
+    counts = [
+        {'from_id': 1, 'to_id': 2, 'description': 'a', 'count': 30},
+        {'from_id': 1, 'to_id': 3, 'description': 'a', 'count': 20},
+        {'from_id': 1, 'to_id': 4, 'description': 'a', 'count': 10},
+    ]
+
+    assert [
+        (association['rank'], association['skip'])
+        for association in plan_snippet_page(counts, 45, 10)
+    ] == [(1, 15), (2, 0)]
+    assert plan_snippet_page(counts, 60, 10) == []
+
+
+def test_plan_starts_after_the_cursor_of_the_previous_page():
+    counts = [
+        {'from_id': 1, 'to_id': 2, 'description': 'a', 'count': 3},
+        {'from_id': 1, 'to_id': 3, 'description': 'a', 'count': 2},
+    ]
+    reference = {
+        'snippet': {'id': 's2', 'data': {}},
+        'publication': {'id': '7', 'data': {'pub_year': None}},
+    }
+    results = [{**counts[0], 'references': [reference]}]
+
+    cursor = get_next_cursor(counts, 1, results)
+    cursor_data = decode_cursor(cursor)
+    assert cursor == encode_cursor(1, reference, counts[0])
+    assert get_page_offset(2, cursor=cursor_data) == 2
+    assert plan_snippet_page(counts, 2, 2, cursor_data) == [
+        {
+            'rank': 0, 'from_id': 1, 'to_id': 2, 'description': 'a', 'skip': 0,
+            'after': {'pub_year': -1, 'snippet_id': 's2', 'pmid': '7'},
+        },
+        {
+            'rank': 1, 'from_id': 1, 'to_id': 3, 'description': 'a', 'skip': 0, 'after': None,
+        },
+    ]
+    # the last snippet has no next page
+    assert get_next_cursor(counts, 4, [{**counts[1], 'references': [reference]}]) is None
+
+
+def test_invalid_cursor():
+    with pytest.raises(InvalidArgument):
+        decode_cursor('not a cursor')
+
+
+def test_counts_are_cached_per_graph_version(app, monkeypatch):
+    class FakeRedis:
+        def __init__(self):
+            self.values = {}
+
+        def get(self, key):
+            return self.values.get(key)
+
+        def set(self, key, value, ex=None):
+            self.values[key] = value
+
+    version = [0]
+    app.config['SNIPPET_COUNT_CACHE'] = True
+    monkeypatch.setattr(snippet_counts, 'redis_server', FakeRedis())
+    monkeypatch.setattr(snippet_counts, 'get_graph_version', lambda: version[0])
+
+    queries = []
+
+    def fetch():
+        queries.append(1)
+        return [{'from_id': 1, 'to_id': 2, 'description': 'a', 'count': 3}]
+
+    params = {'from_ids': [1], 'to_ids': [2], 'description': 'a'}
+    assert get_snippet_counts('edges', params, fetch) == fetch()
+    queries.clear()
+
+    get_snippet_counts('edges', params, fetch)
+    assert len(queries) == 0
+    get_snippet_counts('edges', {**params, 'description': 'b'}, fetch)
+    assert len(queries) == 1
+
+    version[0] += 1
+    get_snippet_counts('edges', params, fetch)
+    assert len(queries) == 2
@@ -0,0 +1,130 @@
+import json
+import lmdb
+import os
+import pytest
+
+from neo4japp.services.annotations.constants import (
+    ANATOMY_LMDB,
+    CHEMICALS_LMDB,
+    COMPOUNDS_LMDB,
+    DISEASES_LMDB,
+    FOODS_LMDB,
+    GENES_LMDB,
+    PHENOMENAS_LMDB,
+    PHENOTYPES_LMDB,
+    PROTEINS_LMDB,
+    SPECIES_LMDB,
+    SYNONYM_INDEX_LMDB
+)
+from neo4japp.services.annotations.data_transfer_objects import (
+    GlobalExclusions,
+    GlobalInclusions,
+    NLPResults,
+    PDFWord
+)
+from neo4japp.services.annotations.entity_recognition import (
+    EntityRecognitionService,
+    IndexedEntityRecognitionService
+)
+from neo4japp.services.annotations.lmdb_connection import close_environments
+from neo4japp.services.annotations.lmdb_service import LMDBService
+from neo4japp.services.annotations.synonym_index import (
+    build_synonym_index,
+    is_synonym_index_current
+)
+
+
+def create_lmdb(dirpath: str, db_name: str, entities):
+    env = lmdb.open(dirpath, map_size=1048576 * 10, max_dbs=2)
+    db = env.open_db(db_name.encode('utf-8'), dupsort=True)
+    with env.begin(db=db, write=True) as txn:
+        for entity in entities:
+            txn.put(
+                entity['synonym'].lower().encode('utf-8'),
+                json.dumps(entity).encode('utf-8'))
+    env.close()
+
+
+def create_token(keyword: str, offset: int):
+    return PDFWord(
+        keyword=keyword,
+        normalized_keyword=keyword.lower(),
+        page_number=1,
+        lo_location_offset=offset,
+        hi_location_offset=offset + len(keyword) - 1,
+        previous_words=''
+    )
+
+
+@pytest.fixture(scope='function')
+def lmdb_service(tmp_path, request):
+    request.addfinalizer(close_environments)
+
+    data = {
+        CHEMICALS_LMDB: [
+            {'id': 'CHEBI:1', 'name': 'arginine', 'synonym': 'arginine'},
+            {'id': 'CHEBI:2', 'name': 'l-arginine', 'synonym': 'arginine'},
+            {'id': 'CHEBI:3', 'name': 'hyp27', 'synonym': 'hyp27'},
+        ],
+        GENES_LMDB: [
+            {'id': '1', 'name': 'hyp27', 'synonym': 'hyp27'},
+            {'id': '2', 'name': 'HYP27', 'synonym': 'HYP27'},
+        ],
+        SPECIES_LMDB: [
+            {'id': '9606', 'name': 'human', 'synonym': 'human'},
+        ],
+    }
+    configs = {
+        ANATOMY_LMDB: 'anatomy',
+        CHEMICALS_LMDB: 'chemicals',
+        COMPOUNDS_LMDB: 'compounds',
+        DISEASES_LMDB: 'diseases',
+        FOODS_LMDB: 'foods',
+        GENES_LMDB: 'genes',
+        PHENOMENAS_LMDB: 'phenomenas',
+        PHENOTYPES_LMDB: 'phenotypes',
+        PROTEINS_LMDB: 'proteins',
+        SPECIES_LMDB: 'species',
+    }
+    for db_name, subdir in configs.items():
+        create_lmdb(os.path.join(tmp_path, subdir), db_name, data.get(db_name, []))
+
+    return LMDBService(str(tmp_path), **configs, **{SYNONYM_INDEX_LMDB: 'synonym_index'})
+
+
+def test_index_is_only_current_after_build(lmdb_service, tmp_path):
+    assert not is_synonym_index_current(lmdb_service)
+    build_synonym_index(lmdb_service)
+    assert is_synonym_index_current(lmdb_service)
+
+    create_lmdb(os.path.join(tmp_path, 'species'), SPECIES_LMDB, [
+        {'id': '562', 'name': 'ecoli', 'synonym': 'ecoli'},
+    ])
+    assert not is_synonym_index_current(lmdb_service)
+
+
+def test_indexed_recognition_matches_lmdb_recognition(lmdb_service):
+    build_synonym_index(lmdb_service)
+
+    tokens = [
+        create_token('arginine', 0),
+        create_token('hyp27', 10),
+        create_token('HYP27', 20),
+        create_token('human', 30),
+        create_token('unknown', 40),
+    ]
+    inclusions = GlobalInclusions(
+        included_genes={'hyp27': [{'id': '3', 'name': 'hyp27', 'synonym': 'hyp27'}]})
+    exclusions = GlobalExclusions(excluded_chemicals={'hyp27'})
+
+    expected = EntityRecognitionService(
+        exclusions=exclusions, inclusions=inclusions, lmdb=lmdb_service
+    ).identify(tokens=tokens, nlp_results=NLPResults())
+    indexed = IndexedEntityRecognitionService(
+        exclusions=exclusions, inclusions=inclusions, lmdb=lmdb_service
+    ).identify(tokens=tokens, nlp_results=NLPResults())
+
+    assert indexed == expected
+    assert len(indexed.recognized_chemicals) == 1
+    assert len(indexed.recognized_genes) == 2
+    assert len(indexed.recognized_species) == 1
@@ -0,0 +1,69 @@
+from neo4japp.services.annotations.data_transfer_objects import PDFWord
+from neo4japp.services.annotations.tokenizer import Tokenizer
+
+
+def create_word(keyword: str, offset: int, lower_y: float):
+    return PDFWord(
+        keyword=keyword,
+        normalized_keyword=keyword,
+        page_number=1,
+        lo_location_offset=offset,
+        hi_location_offset=offset + len(keyword) - 1,
+        previous_words='',
+        heights=[10.0],
+        widths=[5.0],
+        coordinates=[[offset * 5.0, lower_y, offset * 5.0 + 5.0, lower_y + 10.0]]
+    )
+
+
+def test_create_n_grams_from_previous_n_gram():
+    words = [
+        create_word('Escherichia', 0, 100.0),
+        create_word('coli', 12, 100.0),
+        # new line
+        create_word('K-12', 17, 50.0),
+    ]
+
+    tokens = Tokenizer().create(words)
+
+    assert [token.keyword for token in tokens] == [
+        'Escherichia',
+        'Escherichia coli',
+        'Escherichia coli K-12',
+        'coli',
+        'coli K-12',
+        'K-12'
+    ]
+    assert [token.normalized_keyword for token in tokens] == [
+        'escherichia',
+        'escherichiacoli',
+        'escherichiacolik12',
+        'coli',
+        'colik12',
+        'k12'
+    ]
+
+    escherichia_coli_k12 = tokens[2]
+    assert escherichia_coli_k12.lo_location_offset == 0
+    assert escherichia_coli_k12.hi_location_offset == 20
+    assert escherichia_coli_k12.heights == [10.0, 10.0, 10.0]
+    assert escherichia_coli_k12.coordinates == [
+        [0.0, 100.0, 65.0, 110.0],
+        [85.0, 50.0, 90.0, 60.0]
+    ]
+
+
+def test_create_removes_common_words_after_merging():
+    words = [
+        create_word('the', 0, 100.0),
+        create_word('protein', 4, 100.0),
+        create_word('ab', 12, 100.0),
+    ]
+
+    tokens = Tokenizer().create(words)
+
+    assert [token.keyword for token in tokens] == [
+        'the protein',
+        'the protein ab',
+        'protein ab'
+    ]
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 import os
@@ -27,6 +28,12 @@ ERROR_INITIAL_SLEEP_TIME = 60  # if error occurs, try again sooner
 ERROR_SLEEP_TIME_MULTIPLIER = 2  # on subsequent errors, sleep longer
 ERROR_MAX_SLEEP_TIME = 3600 * 6  # but not longer than this
 
+# bumped when the graph changed, the appserver drops its cached graph matches
+GRAPH_VERSION_KEY = 'annotation_graph_version'
+# the statistics the graph was last compared with, kept without expiry so that
+# the expiry of kg_statistics does not look like a change of the graph
+GRAPH_STATISTICS_KEY = 'annotation_graph_statistics'
+
 
 logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger('cache-invalidator')
@@ -49,7 +56,9 @@ def main():
     next_error_sleep_time = ERROR_INITIAL_SLEEP_TIME
     while True:
         try:
-            cache_data('kg_statistics', get_kg_statistics())
+            statistics = get_kg_statistics()
+            invalidate_if_graph_changed(statistics)
+            cache_data('kg_statistics', statistics)
             next_error_sleep_time = ERROR_INITIAL_SLEEP_TIME
             logger.debug(f'Going to sleep for {SUCCESSFUL_SLEEP_TIME} seconds...')
         except Exception as err:
@@ -109,6 +118,15 @@ def get_kg_statistics():
     return statistics
 
 
+def invalidate_if_graph_changed(statistics):
+    current = json.dumps(statistics, sort_keys=True)
+    previous = redis_server.getset(GRAPH_STATISTICS_KEY, current)
+    # nothing to compare with the first time, the cached data is kept
+    if previous is not None and json.loads(previous) != json.loads(current):
+        logger.info('Kg Statistics changed, invalidating cached graph data')
+        redis_server.incr(GRAPH_VERSION_KEY)
+
+
 def precalculateGO():
     logger.debug('Precalculating GO...')
     graph = neo4j_driver.session()
@@ -143,10 +161,16 @@ def precalculateGO():
 
     for organism in organisms:
         logger.debug(f'Caching data for organism: {organism}')
+        go_terms = graph.read_transaction(fetch_organism_go_query, organism)
+        cache_data(f'GO_for_{organism["id"]}', go_terms)
+        # the statistical-enrichment compiles the terms once per version, written after
+        # the terms so that a new version always finds them
         cache_data(
-            f'GO_for_{organism["id"]}',
-            graph.read_transaction(fetch_organism_go_query, organism),
+            f'GO_version_for_{organism["id"]}',
+            hashlib.sha256(json.dumps(go_terms).encode('utf-8')).hexdigest()
         )
+        # the statistical-enrichment reads the count without parsing the terms
+        cache_data(f'GO_count_for_{organism["id"]}', len(go_terms))
     graph.close()
 
 
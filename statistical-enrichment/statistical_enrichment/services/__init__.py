@@ -1,3 +1,4 @@
 from .rcache import *
+from .result_cache import get_result_cache_key, get_result_cache_stats, result_cached
 from .enrichment import get_enrichment_visualisation_service
 from .graphdb import get_neo4j_db
@@ -1,13 +1,17 @@
+import json
+
 import numpy as np
 import pandas as pd
 from scipy.stats.distributions import hypergeom
 from statsmodels.stats.multitest import fdrcorrection
 
+from ..go_matrix import GOMatrix
+
 
 def add_q_value(df, related_go_terms_count, inplace=True):
     p_values = df["p-value"]
-    extended_p_values = p_values.append(
-        pd.Series(np.ones(related_go_terms_count - len(p_values)))
+    extended_p_values = np.concatenate(
+        [p_values, np.ones(related_go_terms_count - len(p_values))]
     )
     r = fdrcorrection(extended_p_values, method="indep")
     if inplace:
@@ -33,20 +37,40 @@ def fisher_p(k, M, n, N):
 def fisher(geneNames, GOterms, related_go_terms_count):
     """
     Run standard fisher's exact tests for each annotation term.
+    :param GOterms: GO term records or a GOMatrix
     """
-    df = pd.DataFrame(GOterms)
-    query = pd.unique(geneNames)
-    M = df["geneNames"].explode().nunique()
+    go = GOterms if isinstance(GOterms, GOMatrix) else GOMatrix.from_records(GOterms)
+    query = pd.unique(pd.Series(geneNames, dtype=object))
+    query_vector = go.query_vector(query)
+
+    # drawn genes of every GO term, all at once
+    overlap = go.matrix @ query_vector
+    M = len(np.unique(go.matrix.indices))
     N = len(query)
+    p_values = fisher_p(overlap, M, go.sizes, N)
 
-    def f(go):
-        matching_gene_names = list(set(go["geneNames"]).intersection(query))
-        go["p-value"] = fisher_p(len(matching_gene_names), M, len(go["geneNames"]), N)
-        go["gene"] = f"{go['goTerm']} ({go['goId']})"
-        go["geneNames"] = matching_gene_names
-        return go
+    # genes of each term that were drawn
+    matches = go.matrix.multiply(query_vector).tocsr()
+    matches.eliminate_zeros()
+    matching_gene_names = (
+        np.split(
+            np.asarray(go.genes, dtype=object)[matches.indices], matches.indptr[1:-1]
+        )
+        if len(go)
+        else []
+    )
 
-    df = df.apply(f, axis=1).sort_values(by="p-value")
+    df = pd.DataFrame(
+        {
+            "goId": go.go_ids,
+            "goTerm": go.go_terms,
+            "goLabel": [json.loads(labels) for labels in go.go_labels],
+            "geneNames": [list(names) for names in matching_gene_names],
+            "p-value": p_values,
+        }
+    )
+    df["gene"] = df["goTerm"] + " (" + df["goId"] + ")"
+    df = df.sort_values(by="p-value", kind="mergesort")
 
     add_q_value(df, related_go_terms_count)
     return df.to_json(orient="records")
@@ -1,11 +1,9 @@
-import json
-from functools import partial
 from typing import List
 
-import pandas as pd
-
-from ..rcache import redis_cached, redis_server
+from ..rcache import redis_cached
+from ..result_cache import get_result_cache_key, result_cached
 from .enrich_methods import fisher
+from .go_matrix import get_go_matrix
 
 
 class EnrichmentVisualisationService:
@@ -14,12 +12,10 @@ class EnrichmentVisualisationService:
 
     def enrich_go(self, gene_names: List[str], analysis, organism):
         if analysis == "fisher":
-            GO_terms = redis_server.get(f"GO_for_{organism.id}")
-            if GO_terms:
-                df = pd.read_json(GO_terms)
-                go_count = len(df)
-                mask = ~df.geneNames.map(set(gene_names).isdisjoint)
-                go = df[mask]
+            go_matrix = get_go_matrix(organism.id)
+            if go_matrix is not None:
+                go_count = len(go_matrix)
+                go = go_matrix.related(gene_names)
             else:
                 go = self.get_go_terms(organism, gene_names)
                 go_count = self.get_go_term_count(organism)
@@ -58,8 +54,8 @@ class EnrichmentVisualisationService:
         return r
 
     def get_go_terms(self, organism, gene_names):
-        return redis_cached(
-            f"get_go_terms_{organism}_{','.join(gene_names)}",
+        return result_cached(
+            get_result_cache_key("go_terms", gene_names, organism.id),
             lambda: self.query_go_term(organism.id, gene_names),
         )
 
@@ -86,6 +82,9 @@ class EnrichmentVisualisationService:
         return r[0]["go_count"]
 
     def get_go_term_count(self, organism):
+        # precalculated by the cache-invalidator along with the GO terms
         return redis_cached(
-            f"go_term_count_{organism}", lambda: self.query_go_term_count(organism.id)
+            f"GO_count_for_{organism.id}",
+            lambda: self.query_go_term_count(organism.id),
+            load=int,
         )
@@ -0,0 +1,164 @@
+"""Per organism GO term x gene incidence matrix.
+
+The GO terms of an organism (precalculated by the cache-invalidator as
+`GO_for_{tax_id}` JSON) are compiled once into a gene vocabulary and a sparse
+GO term x gene matrix, so the overlap of a gene list with every GO term is a
+single sparse matrix-vector product.
+
+The compiled matrix is kept in process and shared between the workers through
+redis as compressed npz (for GO_MATRIX_CACHE_TTL seconds), so the JSON is parsed
+once per organism rather than once per request. Both copies are keyed by the
+`GO_version_for_{tax_id}` digest the cache-invalidator writes with the GO terms,
+so they are replaced as soon as the GO terms are.
+"""
+import io
+import json
+import os
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from ..rcache import redis_server
+
+GO_MATRIX_CACHE_TTL = int(os.getenv("GO_MATRIX_CACHE_TTL", 600))
+
+
+@dataclass
+class GOMatrix:
+    go_ids: np.ndarray
+    go_terms: np.ndarray
+    # json encoded list of labels of every GO term
+    go_labels: np.ndarray
+    # number of gene names of every GO term, as listed
+    sizes: np.ndarray
+    genes: pd.Index
+    # GO term x gene, 1 where the gene is annotated with the term
+    matrix: csr_matrix
+
+    def __len__(self):
+        return len(self.go_ids)
+
+    @classmethod
+    def from_records(cls, records: List[dict]) -> "GOMatrix":
+        """
+        :param records: {goId, goTerm, goLabel, geneNames} of every GO term
+        """
+        gene_names = [record["geneNames"] for record in records]
+        sizes = np.fromiter(map(len, gene_names), dtype=np.int64, count=len(records))
+        codes, genes = pd.factorize(
+            pd.Series([name for names in gene_names for name in names], dtype=object)
+        )
+        rows = np.repeat(np.arange(len(records)), sizes)
+        matrix = csr_matrix(
+            (np.ones(len(codes), dtype=np.int32), (rows, codes)),
+            shape=(len(records), len(genes)),
+        )
+        # a gene listed twice under a term is still one gene
+        matrix.data[:] = 1
+        return cls(
+            go_ids=np.array([record["goId"] for record in records], dtype=str),
+            go_terms=np.array([record["goTerm"] for record in records], dtype=str),
+            go_labels=np.array(
+                [json.dumps(record["goLabel"]) for record in records], dtype=str
+            ),
+            sizes=sizes,
+            genes=pd.Index(genes),
+            matrix=matrix,
+        )
+
+    def to_npz(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            go_ids=self.go_ids,
+            go_terms=self.go_terms,
+            go_labels=self.go_labels,
+            sizes=self.sizes,
+            genes=np.array(self.genes, dtype=str),
+            indptr=self.matrix.indptr,
+            indices=self.matrix.indices,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_npz(cls, data: bytes) -> "GOMatrix":
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+        indices = arrays["indices"]
+        return cls(
+            go_ids=arrays["go_ids"],
+            go_terms=arrays["go_terms"],
+            go_labels=arrays["go_labels"],
+            sizes=arrays["sizes"],
+            genes=pd.Index(arrays["genes"], dtype=object),
+            matrix=csr_matrix(
+                (np.ones(len(indices), dtype=np.int32), indices, arrays["indptr"]),
+                shape=(len(arrays["go_ids"]), len(arrays["genes"])),
+            ),
+        )
+
+    def query_vector(self, gene_names: List[str]) -> np.ndarray:
+        """1 for every gene of the vocabulary that is in gene_names."""
+        vector = np.zeros(len(self.genes), dtype=np.int32)
+        indices = self.genes.get_indexer(pd.unique(pd.Series(gene_names, dtype=object)))
+        vector[indices[indices >= 0]] = 1
+        return vector
+
+    def take(self, rows: np.ndarray) -> "GOMatrix":
+        """The GO terms of the rows (indices or mask), over the same vocabulary."""
+        return GOMatrix(
+            go_ids=self.go_ids[rows],
+            go_terms=self.go_terms[rows],
+            go_labels=self.go_labels[rows],
+            sizes=self.sizes[rows],
+            genes=self.genes,
+            matrix=self.matrix[rows],
+        )
+
+    def related(self, gene_names: List[str]) -> "GOMatrix":
+        """The GO terms annotating at least one of the genes."""
+        return self.take(self.matrix @ self.query_vector(gene_names) > 0)
+
+
+# organism id -> version, GO matrix
+_cache: Dict[str, Tuple[str, GOMatrix]] = {}
+_cache_lock = Lock()
+
+
+def _load_go_matrix(organism_id, version: str) -> Optional[GOMatrix]:
+    key = f"GO_matrix_for_{organism_id}:{version}"
+    data = redis_server.get(key)
+    if data:
+        return GOMatrix.from_npz(data)
+
+    go_terms = redis_server.get(f"GO_for_{organism_id}")
+    if not go_terms:
+        return None
+    go_matrix = GOMatrix.from_records(json.loads(go_terms))
+    redis_server.set(key, go_matrix.to_npz(), ex=GO_MATRIX_CACHE_TTL)
+    return go_matrix
+
+
+def get_go_matrix(organism_id) -> Optional[GOMatrix]:
+    """
+    Returns the GO matrix of the organism, or None if its GO terms have not
+    been precalculated.
+    """
+    cached_version = redis_server.get(f"GO_version_for_{organism_id}")
+    if not cached_version:
+        return None
+    version: str = json.loads(cached_version)
+
+    with _cache_lock:
+        entry = _cache.get(str(organism_id))
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    go_matrix = _load_go_matrix(organism_id, version)
+    if go_matrix is not None:
+        with _cache_lock:
+            _cache[str(organism_id)] = (version, go_matrix)
+    return go_matrix
@@ -0,0 +1,156 @@
+"""Cache of the enrichment results.
+
+Results only depend on the set of genes, so they are cached under a digest of
+the sorted, deduplicated gene names rather than under the gene list itself:
+the keys stay short whatever the size of the list, and the same genes in
+another order hit the same entry.
+
+Values are stored as zlib compressed json. The cache keeps track of the size
+of every entry and evicts the least recently used entries once it holds more
+than RESULT_CACHE_MAX_BYTES, and counts its hits and misses.
+
+The bookkeeping is done in lua scripts, so that concurrent writers cannot
+count an entry twice. Entries expire RESULT_CACHE_TTL after their last use,
+which is their score in the index: the scripts prune the entries that expired
+from the index, sizes and total before accounting for new ones.
+"""
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable
+
+from redis.exceptions import RedisError
+
+from .rcache import DEFAULT_CACHE_SETTINGS, redis_server
+
+RESULT_CACHE_PREFIX = "enrichment_result"
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+RESULT_CACHE_TTL = DEFAULT_CACHE_SETTINGS["ex"]
+
+# key -> last use
+_INDEX_KEY = f"{RESULT_CACHE_PREFIX}:index"
+# key -> size in bytes
+_SIZES_KEY = f"{RESULT_CACHE_PREFIX}:sizes"
+_TOTAL_KEY = f"{RESULT_CACHE_PREFIX}:total"
+_STATS_KEY = f"{RESULT_CACHE_PREFIX}:stats"
+
+
+def gene_set_digest(gene_names: Iterable[str]) -> str:
+    genes = sorted(set(gene_names))
+    return hashlib.sha256("\n".join(genes).encode("utf-8")).hexdigest()
+
+
+def get_result_cache_key(name: str, gene_names: Iterable[str], *args) -> str:
+    """
+    :param name: what is cached
+    :param args: everything else the result depends on, e.g. the organism id
+    """
+    return ":".join(
+        [RESULT_CACHE_PREFIX, name, *map(str, args), gene_set_digest(gene_names)]
+    )
+
+
+# KEYS: index, sizes, total; ARGV: now, ttl
+_PRUNE = """
+local function remove(member)
+    local size = tonumber(redis.call("HGET", KEYS[2], member) or 0)
+    redis.call("HDEL", KEYS[2], member)
+    redis.call("ZREM", KEYS[1], member)
+    redis.call("DECRBY", KEYS[3], size)
+end
+
+local expired = tonumber(ARGV[1]) - tonumber(ARGV[2])
+for _, member in ipairs(redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", expired)) do
+    remove(member)
+end
+"""
+
+# KEYS: index, sizes, total, stats, key; ARGV: now, ttl, value, max bytes
+_STORE = _PRUNE + """
+local key = KEYS[5]
+local value = ARGV[3]
+remove(key)
+redis.call("SET", key, value, "EX", ARGV[2])
+redis.call("HSET", KEYS[2], key, #value)
+redis.call("ZADD", KEYS[1], ARGV[1], key)
+redis.call("INCRBY", KEYS[3], #value)
+redis.call("HINCRBY", KEYS[4], "misses", 1)
+
+while tonumber(redis.call("GET", KEYS[3]) or 0) > tonumber(ARGV[4]) do
+    local oldest = redis.call("ZRANGE", KEYS[1], 0, 0)
+    if #oldest == 0 then
+        redis.call("DEL", KEYS[3])
+        break
+    end
+    redis.call("DEL", oldest[1])
+    remove(oldest[1])
+end
+"""
+
+# KEYS: index, stats, key; ARGV: now, ttl
+_TOUCH = """
+if redis.call("ZSCORE", KEYS[1], KEYS[3]) then
+    redis.call("ZADD", KEYS[1], ARGV[1], KEYS[3])
+    redis.call("EXPIRE", KEYS[3], ARGV[2])
+end
+redis.call("HINCRBY", KEYS[2], "hits", 1)
+"""
+
+_prune_script = redis_server.register_script(_PRUNE)
+_store_script = redis_server.register_script(_STORE)
+_touch_script = redis_server.register_script(_TOUCH)
+
+
+def _store(key: str, value: bytes):
+    _store_script(
+        keys=[_INDEX_KEY, _SIZES_KEY, _TOTAL_KEY, _STATS_KEY, key],
+        args=[time.time(), RESULT_CACHE_TTL, value, RESULT_CACHE_MAX_BYTES],
+    )
+
+
+def _touch(key: str):
+    _touch_script(
+        keys=[_INDEX_KEY, _STATS_KEY, key], args=[time.time(), RESULT_CACHE_TTL]
+    )
+
+
+def result_cached(key: str, result_provider: Callable[[], Any]) -> Any:
+    """
+    Returns the cached result of the key, or caches and returns the result of
+    result_provider, which must be json serializable.
+    """
+    try:
+        cached = redis_server.get(key)
+        if cached is not None:
+            _touch(key)
+            return json.loads(zlib.decompress(cached))
+    except RedisError:
+        return result_provider()
+
+    result = result_provider()
+    try:
+        _store(key, zlib.compress(json.dumps(result).encode("utf-8")))
+    except RedisError:
+        pass
+    return result
+
+
+def get_result_cache_stats() -> Dict[str, int]:
+    pipe = redis_server.pipeline()
+    _prune_script(
+        keys=[_INDEX_KEY, _SIZES_KEY, _TOTAL_KEY],
+        args=[time.time(), RESULT_CACHE_TTL],
+        client=pipe,
+    )
+    pipe.hgetall(_STATS_KEY)
+    pipe.zcard(_INDEX_KEY)
+    pipe.get(_TOTAL_KEY)
+    _, stats, entries, total = pipe.execute()
+    return {
+        "hits": int(stats.get(b"hits", 0)),
+        "misses": int(stats.get(b"misses", 0)),
+        "entries": entries,
+        "bytes": int(total or 0),
+    }
@@ -2,7 +2,12 @@ from flask import Blueprint, jsonify
 from webargs.flaskparser import use_args
 
 from .schemas import EnrichmentSchema
-from .services import get_enrichment_visualisation_service, redis_cached
+from .services import (
+    get_enrichment_visualisation_service,
+    get_result_cache_key,
+    get_result_cache_stats,
+    result_cached,
+)
 
 bp = Blueprint("statistical_enrichment", __name__, url_prefix="/")
 
@@ -15,10 +20,15 @@ def enrich_go(args):
     analysis = args["analysis"]
 
     return jsonify(
-        redis_cached(
-            f'enrich_go_{",".join(gene_names)}_{analysis}_{organism}',
+        result_cached(
+            get_result_cache_key("enrich_go", gene_names, analysis, organism.id),
             lambda: get_enrichment_visualisation_service().enrich_go(
                 gene_names, analysis, organism
             ),
         )
     )
+
+
+@bp.get("/cache-stats")
+def cache_stats():
+    return jsonify(get_result_cache_stats())
@@ -0,0 +1,23 @@
+import pytest
+
+from statistical_enrichment import create_app
+from statistical_enrichment.services.rcache import redis_server
+
+
+@pytest.fixture(scope="function")
+def app():
+    return create_app({"TESTING": True})
+
+
+@pytest.fixture(scope="function")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="function")
+def redis():
+    """Returns the Redis server of the REDIS_* environment.
+    IMPORTANT: Its database is cleared before every test!
+    """
+    redis_server.flushdb()
+    return redis_server
@@ -0,0 +1,152 @@
+import json
+import random
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.stats.multitest import fdrcorrection
+
+from statistical_enrichment.services.enrichment import go_matrix
+from statistical_enrichment.services.enrichment.enrich_methods.fisher import (
+    fisher,
+    fisher_p,
+)
+from statistical_enrichment.services.enrichment.go_matrix import GOMatrix, get_go_matrix
+
+
+def legacy_enrich_go(gene_names, go_terms):
+    """The enrichment before the GO matrix: the GO terms filtered and tested row by row."""
+    df = pd.DataFrame(go_terms)
+    related_go_terms_count = len(df)
+    df = df[~df.geneNames.map(set(gene_names).isdisjoint)]
+
+    query = pd.unique(pd.Series(gene_names, dtype=object))
+    M = df["geneNames"].explode().nunique()
+    N = len(query)
+
+    def f(go):
+        matching_gene_names = list(set(go["geneNames"]).intersection(query))
+        go["p-value"] = fisher_p(len(matching_gene_names), M, len(go["geneNames"]), N)
+        go["gene"] = f"{go['goTerm']} ({go['goId']})"
+        go["geneNames"] = matching_gene_names
+        return go
+
+    df = df.apply(f, axis=1).sort_values(by="p-value")
+
+    p_values = df["p-value"]
+    r = fdrcorrection(
+        np.concatenate([p_values, np.ones(related_go_terms_count - len(p_values))]),
+        method="indep",
+    )
+    df["rejected"] = r[0][: len(p_values)]
+    df["q-value"] = r[1][: len(p_values)]
+    return json.loads(df.to_json(orient="records"))
+
+
+def enrich_go(gene_names, go_terms):
+    go = GOMatrix.from_records(go_terms)
+    return json.loads(fisher(gene_names, go.related(gene_names), len(go)))
+
+
+def create_go_terms(rng: random.Random):
+    genes = [f"gene{i}" for i in range(60)]
+    go_terms = []
+    for i in range(80):
+        if i % 7:
+            # the first genes are annotated more often
+            annotated = genes[: rng.randint(12, 60)]
+            gene_names = rng.sample(annotated, rng.randint(1, 12))
+        else:
+            # some terms share their genes, and so their p-values
+            gene_names = ["gene1", "gene2", "gene3"]
+        go_terms.append({
+            "goId": f"GO:{i:07}",
+            "goTerm": f"term {i}",
+            "goLabel": rng.sample(["BiologicalProcess", "MolecularFunction"], 1),
+            "geneNames": gene_names,
+        })
+    return go_terms
+
+
+def get_results(results):
+    """The results grouped by p-value, in order: the order of GO terms of equal p-value is
+    not defined."""
+    return [
+        (
+            p_value,
+            sorted(
+                (
+                    row["goId"],
+                    row["goTerm"],
+                    row["goLabel"],
+                    row["gene"],
+                    sorted(row["geneNames"]),
+                    row["q-value"],
+                    row["rejected"],
+                )
+                for row in rows
+            ),
+        )
+        for p_value, rows in groupby(results, key=lambda row: row["p-value"])
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_enrichment_is_unchanged(seed):
+    rng = random.Random(seed)
+    go_terms = create_go_terms(rng)
+    gene_names = rng.sample([f"gene{i}" for i in range(80)], 15) + ["gene1", "gene1"]
+
+    expected = legacy_enrich_go(gene_names, go_terms)
+    results = enrich_go(gene_names, go_terms)
+
+    assert len(results) == len(expected)
+    assert [row["p-value"] for row in results] == pytest.approx(
+        [row["p-value"] for row in expected]
+    )
+    assert get_results(results) == get_results(expected)
+
+
+def test_go_matrix_survives_npz():
+    go = GOMatrix.from_records(create_go_terms(random.Random(0)))
+    loaded = GOMatrix.from_npz(go.to_npz())
+
+    gene_names = ["gene1", "gene5", "gene40"]
+    assert fisher(gene_names, loaded.related(gene_names), len(loaded)) == fisher(
+        gene_names, go.related(gene_names), len(go)
+    )
+
+
+class FakeRedis:
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+def test_go_matrix_is_replaced_with_a_new_version(monkeypatch):
+    go_terms = create_go_terms(random.Random(0))
+    values = {
+        "GO_for_9606": json.dumps(go_terms[:10]),
+        "GO_version_for_9606": json.dumps("1"),
+    }
+    monkeypatch.setattr(go_matrix, "redis_server", FakeRedis(values))
+    monkeypatch.setattr(go_matrix, "_cache", {})
+
+    assert len(get_go_matrix(9606)) == 10
+    assert "GO_matrix_for_9606:1" in values
+
+    values["GO_for_9606"] = json.dumps(go_terms)
+    # the cached matrix of the version is used
+    assert len(get_go_matrix(9606)) == 10
+
+    values["GO_version_for_9606"] = json.dumps("2")
+    assert len(get_go_matrix(9606)) == len(go_terms)
+
+    del values["GO_version_for_9606"]
+    assert get_go_matrix(9606) is None
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from statistical_enrichment.services import result_cache
+from statistical_enrichment.services.result_cache import (
+    get_result_cache_key,
+    get_result_cache_stats,
+    result_cached,
+)
+
+
+def cache(key, result):
+    return result_cached(key, lambda: result)
+
+
+def test_gene_sets_share_a_key_whatever_their_order():
+    assert get_result_cache_key("enrich_go", ["b", "a", "b"], "fisher", 1) == \
+        get_result_cache_key("enrich_go", ["a", "b"], "fisher", 1)
+    assert get_result_cache_key("enrich_go", ["a", "b"], "fisher", 1) != \
+        get_result_cache_key("enrich_go", ["a", "b"], "fisher", 2)
+
+
+def test_results_are_stored_once(redis):
+    calls = []
+
+    def provider():
+        calls.append(1)
+        return {"p": [0.1, 0.2]}
+
+    assert result_cached("enrichment_result:a", provider) == {"p": [0.1, 0.2]}
+    assert result_cached("enrichment_result:a", provider) == {"p": [0.1, 0.2]}
+    assert len(calls) == 1
+
+    stats = get_result_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len(redis.get("enrichment_result:a"))
+
+
+def test_storing_an_entry_again_replaces_its_size(redis):
+    cache("enrichment_result:a", "x" * 100)
+    result_cache._store("enrichment_result:a", b"small")
+
+    assert get_result_cache_stats()["bytes"] == len(b"small")
+
+
+def test_least_recently_used_entries_are_evicted(redis, monkeypatch):
+    for key in "abc":
+        cache(f"enrichment_result:{key}", key * 1000)
+    size = get_result_cache_stats()["bytes"] // 3
+    # a is used again, so b is the least recently used
+    cache("enrichment_result:a", None)
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_MAX_BYTES", size * 3)
+
+    cache("enrichment_result:d", "d" * 1000)
+
+    assert redis.get("enrichment_result:b") is None
+    assert all(redis.get(f"enrichment_result:{key}") for key in "acd")
+    assert get_result_cache_stats()["entries"] == 3
+    assert get_result_cache_stats()["bytes"] == sum(
+        len(redis.get(f"enrichment_result:{key}")) for key in "acd"
+    )
+
+
+def test_expired_entries_are_pruned(redis, monkeypatch):
+    cache("enrichment_result:a", "a")
+    cache("enrichment_result:b", "b")
+    # a expired, b was used since
+    redis.zadd(result_cache._INDEX_KEY, {
+        "enrichment_result:a": time.time() - result_cache.RESULT_CACHE_TTL - 1
+    })
+    redis.delete("enrichment_result:a")
+
+    stats = get_result_cache_stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len(redis.get("enrichment_result:b"))
+    assert redis.hkeys(result_cache._SIZES_KEY) == [b"enrichment_result:b"]
+
+
+@pytest.mark.parametrize("result", [[], {"terms": ["GO:1"]}])
+def test_cache_stats_view(redis, client, result):
+    cache("enrichment_result:a", result)
+    cache("enrichment_result:a", result)
+
+    response = client.get("/cache-stats")
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "hits": 1,
+        "misses": 1,
+        "entries": 1,
+        "bytes": len(redis.get("enrichment_result:a")),
+    }